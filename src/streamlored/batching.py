@@ -0,0 +1,84 @@
+"""Micro-batching helper for bursty chat workloads."""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class MicroBatcher(Generic[T]):
+    """Collect items for a short window and hand them to a handler as one batch.
+
+    The first item of a batch arms a timer; everything submitted before it
+    fires (or before the batch reaches max_size) is flushed together. During
+    a chat burst this turns N expensive evaluations into one.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[T]], Awaitable[None]],
+        window: float = 0.25,
+        max_size: int = 16,
+    ) -> None:
+        """Initialize the batcher.
+
+        Args:
+            handler: Coroutine function called with each flushed batch
+            window: Seconds to wait for more items after the first one arrives
+            max_size: Flush immediately once this many items are pending
+        """
+        self.handler = handler
+        self.window = max(0.0, window)
+        self.max_size = max(1, max_size)
+        self._pending: list[T] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def pending_count(self) -> int:
+        """Number of items waiting for the current window to close."""
+        return len(self._pending)
+
+    def submit(self, item: T) -> None:
+        """Add an item to the current batch.
+
+        Args:
+            item: Item to evaluate in the next batch
+        """
+        self._pending.append(item)
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.window, self._flush)
+
+    def _flush(self) -> None:
+        """Hand the pending items to the handler in a background task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[T]) -> None:
+        """Run the handler for one batch, logging instead of raising."""
+        try:
+            await self.handler(batch)
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(batch)} items: {e}")
+
+    async def close(self) -> None:
+        """Flush anything still pending and wait for in-flight batches."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,179 @@
+"""Per-channel state for the multi-channel Twitch bot."""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from streamlored.rag import DocumentStore
+from streamlored.twitch_api import GameContext
+
+logger = logging.getLogger(__name__)
+
+# Max game sessions kept in stream history
+MAX_STREAM_SESSIONS = 50
+
+
+def _format_duration(started: datetime, ended: datetime) -> str:
+    """Format a session duration like "1hr 5min" or "42min"."""
+    minutes = int((ended - started).total_seconds() / 60)
+    if minutes >= 60:
+        hours = minutes // 60
+        mins = minutes % 60
+        return f"{hours}hr {mins}min" if mins else f"{hours}hr"
+    return f"{minutes}min"
+
+
+@dataclass
+class ChannelState:
+    """Everything the bot tracks for one joined channel.
+
+    Model backends and the document index are shared between channels; only
+    chat, stream and game state (plus an optional KB namespace) live here.
+    """
+
+    name: str
+    primary: bool = False
+    # KB this channel searches (None if the KB is disabled) and, when loaded
+    # in this process, its document store
+    kb_path: str | None = None
+    doc_store: DocumentStore | None = None
+    current_game: GameContext | None = None
+    # Chat history for context (last 10 messages)
+    chat_history: deque = field(default_factory=lambda: deque(maxlen=10))
+    # Stream history - tracks games played during this session
+    # Format: [{"game": "Game Name", "title": "Stream Title", "started": datetime, "ended": datetime|None}]
+    stream_history: list[dict] = field(default_factory=list)
+    stream_start_time: datetime | None = None
+    game_poll_task: asyncio.Task | None = None
+    # Cached prompt fragments, rebuilt only after the events that change them
+    _chat_context: str | None = field(default=None, repr=False)
+    _stream_context: tuple[int, str] | None = field(default=None, repr=False)
+
+    @property
+    def game_name(self) -> str | None:
+        """Name of the game currently being played, if known."""
+        return self.current_game.game_name if self.current_game else None
+
+    def update_game(self, new_context: GameContext | None) -> bool:
+        """Record the latest polled stream info and track game switches.
+
+        Args:
+            new_context: Stream info from the Twitch API, or None if offline
+
+        Returns:
+            True if the game changed since the last poll
+        """
+        old_game = self.current_game.game_name if self.current_game else None
+        new_game = new_context.game_name if new_context else None
+        changed = old_game != new_game
+
+        if changed:
+            now = datetime.now()
+
+            # End previous game session
+            if self.stream_history and self.stream_history[-1]["ended"] is None:
+                self.stream_history[-1]["ended"] = now
+
+            if new_game:
+                # Start new game session
+                self.stream_history.append({
+                    "game": new_game,
+                    "title": new_context.title if new_context else None,
+                    "started": now,
+                    "ended": None,
+                })
+
+                # Set stream start time on first game
+                if self.stream_start_time is None:
+                    self.stream_start_time = now
+
+        # Clear old history if it gets too large
+        if len(self.stream_history) > MAX_STREAM_SESSIONS:
+            removed = len(self.stream_history) - MAX_STREAM_SESSIONS
+            self.stream_history = self.stream_history[-MAX_STREAM_SESSIONS:]
+            logger.info(f"[{self.name}] Trimmed stream history (removed {removed} old sessions)")
+
+        self.current_game = new_context
+        self._stream_context = None
+        return changed
+
+    def add_chat_message(self, user: str, content: str) -> None:
+        """Record a chat message for context.
+
+        Args:
+            user: Chatter display name
+            content: Message text
+        """
+        self.chat_history.append({
+            "user": user,
+            "content": content,
+        })
+        self._chat_context = None
+
+    def chat_history_string(self) -> str:
+        """Get formatted chat history for context.
+
+        Returns:
+            Formatted string of recent chat messages
+        """
+        if self._chat_context is None:
+            self._chat_context = "\n".join(
+                f"{msg['user']}: {msg['content']}" for msg in self.chat_history
+            )
+        return self._chat_context
+
+    def stream_context_string(self) -> str:
+        """Get the current game and stream history as one context fragment.
+
+        Cached until the next game poll; the running session's duration only
+        changes once a minute, so the fragment is rebuilt at most that often.
+
+        Returns:
+            Context string, or empty string if there is no stream info
+        """
+        minute = 0
+        if self.stream_history and self.stream_history[-1]["ended"] is None:
+            minute = int((datetime.now() - self.stream_history[-1]["started"]).total_seconds() // 60)
+
+        if self._stream_context is None or self._stream_context[0] != minute:
+            parts = []
+            if self.current_game:
+                context = self.current_game.to_context_string()
+                if context:
+                    parts.append(context)
+
+            history = self.stream_history_string()
+            if history:
+                parts.append(history)
+
+            self._stream_context = (minute, " ".join(parts))
+
+        return self._stream_context[1]
+
+    def stream_history_string(self) -> str:
+        """Get a formatted string describing games played during this stream.
+
+        Returns:
+            History string like "Tonight's stream: Dead Space (1hr), then RE2 (current)"
+        """
+        if not self.stream_history:
+            return ""
+
+        parts = []
+        for session in self.stream_history:
+            game = session["game"]
+            ended = session["ended"]
+
+            if ended:
+                parts.append(f"{game} ({_format_duration(session['started'], ended)})")
+            else:
+                # Current game
+                duration_str = _format_duration(session["started"], datetime.now())
+                parts.append(f"{game} ({duration_str}, current)")
+
+        if not parts:
+            return ""
+
+        return "Tonight's stream: " + ", then ".join(parts)
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     twitch_bot_nick: str
     twitch_oauth_token: str
     twitch_channel: str
+    twitch_channels: str = ""  # comma-separated partner channels joined alongside twitch_channel
+    twitch_channel_kb_paths: str = ""  # optional per-channel KB namespaces: "channel=path,channel=path"
     twitch_client_id: str = ""
     twitch_client_secret: str = ""
     twitch_bot_id: int = 0  # Bot's Twitch user ID
@@ -26,13 +28,41 @@ class Settings(BaseSettings):
     ollama_port: int = 11434
     ollama_model: str = "llama3.2"
     ollama_embed_model: str = "nomic-embed-text"
+    embed_cache_size: int = 512  # recent query embeddings kept in memory (0 disables)
+    ollama_backends: str = ""  # optional pool: "http://a:11434=text+embed,http://b:11434=vision"
+    ollama_probe_interval: float = 15.0  # seconds between backend health checks
+    ollama_circuit_failures: int = 3  # consecutive failures before a backend is skipped
+    ollama_circuit_cooldown: float = 30.0  # seconds a failing backend is skipped for
+    ollama_warmup: bool = True  # load models at startup instead of on the first request
+    ollama_keep_alive: str = "30m"  # how long the chat model stays loaded ("-1" = forever)
+    ollama_embed_keep_alive: str = "30m"
+    ollama_vision_keep_alive: str = "5m"
+    ollama_residency: str = "chat"  # "chat" reloads the chat model after vision requests, "none"
 
     # Bot Configuration
     bot_prefix: str = "!"
+    auto_respond_batch_window: float = 0.25  # seconds to collect chat before scoring against KB
+    auto_respond_batch_size: int = 16  # score immediately once this many candidates are waiting
 
     # Knowledge Base Configuration
     kb_path: str = "data/knowledge_base.json"
     kb_enabled: bool = True
+    kb_store: str = "json"  # "json" or "sqlite" (KB_PATH is then a database, e.g. data/knowledge_base.sqlite3)
+    kb_retrieval: str = "hybrid"  # "vector" or "hybrid" (vector + BM25 keyword search)
+    kb_lexical_shortcut: bool = True  # answer short exact-term queries without embedding them
+    kb_vector_precision: str = "float32"  # in-memory embeddings: "float32", "float16" or "int8"
+    kb_rescore: bool = True  # with float16/int8, rescore top candidates exactly from disk
+    kb_diversity: float = 0.0  # MMR weight against near-identical results (0 = plain top-k, e.g. 0.3)
+    kb_reranker: str = "none"  # "none" or "overlap" (blend in query-term coverage)
+    kb_rerank_candidates: int = 20  # candidates per query for KB_RERANKER and KB_DIVERSITY
+    ingest_workers: int = 0  # processes chunking files during --ingest (0 = one per CPU)
+    chunk_max_tokens: int = 0  # size chunks by estimated tokens (0 = by characters, 1000 per chunk)
+    chunk_overlap_tokens: int = 0  # with CHUNK_MAX_TOKENS, tokens each chunk repeats from the previous one
+    kb_watch: bool = False  # re-ingest files changed under KB_DOCS_PATH while the bot runs
+    kb_docs_path: str = "docs"  # docs folder the KB was ingested from
+    kb_watch_interval: float = 5.0  # seconds between checks of KB_DOCS_PATH
+    ingest_dedup_threshold: float = 0.85  # skip chunks this similar (MinHash Jaccard) to an ingested one (0 = keep all)
+    context_token_budget: int = 1500  # estimated tokens of KB, chat and game context per prompt (0 = unlimited)
 
     # OBS WebSocket Configuration
     obs_host: str = "localhost"
@@ -48,12 +78,56 @@ class Settings(BaseSettings):
     livesplit_host: str = "localhost"
     livesplit_port: int = 16834
 
+    # Inference Workers
+    inference_mode: str = "local"  # "local" (in the bot process) or "queue" (separate workers)
+    job_queue_path: str = "data/jobs.sqlite3"
+    job_poll_interval: float = 0.1  # seconds between queue polls
+    job_timeout: float = 120.0  # seconds before a claimed job is handed to another worker
+    worker_concurrency: int = 4  # jobs one worker process runs at once
+
+    # Latency Tracing
+    trace_buffer_size: int = 1000  # recent reply traces kept for latency percentiles (0 disables tracing)
+    trace_report_interval: float = 300.0  # seconds between [TRACE] percentile log lines (0 = off)
+
+    # Metrics
+    metrics_port: int = 0  # serve Prometheus metrics at http://METRICS_HOST:METRICS_PORT/metrics (0 = off)
+    metrics_host: str = "127.0.0.1"  # "0.0.0.0" to let Prometheus scrape from another machine or container
+
     # Run Mode
-    run_mode: str = "bot"  # "bot", "local-chat", or "ingest"
+    run_mode: str = "bot"  # "bot", "local-chat", "worker", or "ingest"
 
     # Personality (for future tuning)
     personality_snark_level: int = 2  # 0-3 scale
 
+    @property
+    def channel_names(self) -> list[str]:
+        """Get all channels to join, primary channel first."""
+        names = [self.twitch_channel] + self.twitch_channels.split(",")
+        channels: list[str] = []
+        for name in names:
+            name = name.strip().lstrip("#").lower()
+            if name and name not in channels:
+                channels.append(name)
+        return channels
+
+    @property
+    def channel_kb_paths(self) -> dict[str, str]:
+        """Get per-channel KB paths for channels that don't use the shared KB."""
+        paths: dict[str, str] = {}
+        for entry in self.twitch_channel_kb_paths.split(","):
+            channel, sep, path = entry.partition("=")
+            if sep and channel.strip() and path.strip():
+                paths[channel.strip().lstrip("#").lower()] = path.strip()
+        return paths
+
+    @property
+    def ollama_keep_alive_by_model(self) -> dict[str, str]:
+        """Get keep_alive durations for the chat and vision models."""
+        keep_alive = {self.ollama_vision_model: self.ollama_vision_keep_alive}
+        # The chat setting wins if both roles use the same model
+        keep_alive[self.ollama_model] = self.ollama_keep_alive
+        return keep_alive
+
     @property
     def ollama_base_url(self) -> str:
         """Get the full Ollama API base URL."""
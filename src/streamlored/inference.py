@@ -0,0 +1,486 @@
+"""Retrieval and generation for chat replies.
+
+The same service runs in-process inside the Twitch bot, or inside worker
+processes that pull jobs off the job queue (see ``run_worker`` in main.py).
+Everything it needs from the chat side - game context, chat history, a
+screenshot - arrives in the job payload, so it never touches Twitch, OBS or
+LiveSplit itself.
+"""
+
+import logging
+from typing import Any
+
+from streamlored import metrics
+from streamlored.config import Settings
+from streamlored.llm import ModelResidency, OllamaClient
+from streamlored.persona import build_system_prompt, build_user_prompt
+from streamlored.rag import DocumentStore, best_score
+from streamlored.rag.json_store import JsonDocumentStore
+from streamlored.rag.sqlite_store import SQLiteDocumentStore
+from streamlored.rag.ollama_embeddings import OllamaEmbeddingProvider
+from streamlored.rag.packing import PackedContext, pack_context
+from streamlored.rag.rerank import make_reranker
+from streamlored.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# KB_STORE values: JSON file with a write-ahead log, or a SQLite database
+KB_STORES = ("json", "sqlite")
+
+# Minimum top KB similarity for an unprompted auto-response
+# 0.65 allows split-enhanced queries to match, 0.75 was too strict
+AUTO_RESPOND_MIN_SCORE = 0.65
+
+# Strict vision prompt for !screenshot - prevent hallucination
+SCREENSHOT_SYSTEM_PROMPT = """Analyze this stream screenshot.
+
+RULES:
+- Answer in 1 sentence MAX (under 150 characters)
+- Only describe what you literally see
+- Be direct and factual
+- No speculation or predictions
+
+If asked a question, answer it briefly. Otherwise, state the key visible element."""
+
+# Vision-specific guidance appended to the ask prompt for !look
+LOOK_GUIDANCE = """
+
+When analyzing the image:
+- Base your answer on what you can see
+- You can use your game knowledge to provide context
+- Stay in character with your usual tone
+- Don't make up things that aren't visible"""
+
+# Appended to the lore prompt when an auto-response includes a screenshot
+AUTO_SCREENSHOT_NOTE = "\n\nYou can see a screenshot of what's on screen. Use it to give specific context about what's happening."
+
+
+def open_document_store(
+    settings: Settings,
+    kb_path: str,
+    embedding_provider: OllamaEmbeddingProvider | None,
+) -> DocumentStore:
+    """Open the configured kind of document store for a KB path.
+
+    Args:
+        settings: Application settings (KB_STORE and retrieval options)
+        kb_path: Path to the knowledge base file
+        embedding_provider: Provider for KB embeddings (None if only reading stored vectors)
+
+    Returns:
+        A JSON or SQLite document store
+    """
+    if settings.kb_store not in KB_STORES:
+        raise ValueError(f"Unknown KB store: {settings.kb_store}")
+    store_class = SQLiteDocumentStore if settings.kb_store == "sqlite" else JsonDocumentStore
+    return store_class(
+        kb_path=kb_path,
+        embedding_provider=embedding_provider,
+        retrieval=settings.kb_retrieval,
+        lexical_shortcut=settings.kb_lexical_shortcut,
+        precision=settings.kb_vector_precision,
+        rescore=settings.kb_rescore,
+        diversity=settings.kb_diversity,
+        reranker=make_reranker(settings.kb_reranker),
+        rerank_candidates=settings.kb_rerank_candidates,
+    )
+
+
+class InferenceService:
+    """Runs KB retrieval and LLM generation for every reply type."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        ollama: OllamaClient,
+        embedding_provider: OllamaEmbeddingProvider | None,
+        residency: ModelResidency | None = None,
+    ) -> None:
+        """Initialize the inference service.
+
+        Args:
+            settings: Application settings
+            ollama: Client for text and vision generation
+            embedding_provider: Provider for KB embeddings, or None if the KB is disabled
+            residency: Optional model residency manager, told about vision requests
+        """
+        self.settings = settings
+        self.ollama = ollama
+        self.embedding_provider = embedding_provider
+        self.residency = residency
+        self._doc_stores: dict[str, DocumentStore] = {}
+
+    def get_doc_store(self, kb_path: str | None) -> DocumentStore | None:
+        """Get the document store for a KB path, loading it once per process.
+
+        Args:
+            kb_path: Path to the knowledge base file (None means no KB)
+
+        Returns:
+            Shared document store for that path, or None if the KB is disabled
+        """
+        if not kb_path or self.embedding_provider is None:
+            return None
+        if kb_path not in self._doc_stores:
+            self._doc_stores[kb_path] = open_document_store(self.settings, kb_path, self.embedding_provider)
+        return self._doc_stores[kb_path]
+
+    async def run(self, kind: str, payload: dict[str, Any]) -> str | None:
+        """Run one job and return its reply.
+
+        Args:
+            kind: Job type ("ask", "mention", "lore", "look", "screenshot" or "auto")
+            payload: Job parameters (see the matching answer_* method)
+
+        Returns:
+            Reply text, or None if the job decided not to reply
+        """
+        if kind == "ask":
+            return await self.answer_ask(payload["question"], payload.get("game_context", ""))
+        if kind == "mention":
+            return await self.answer_mention(
+                payload["author"],
+                payload["content"],
+                payload.get("game_context", ""),
+                payload.get("chat_context", ""),
+            )
+        if kind == "lore":
+            return await self.answer_lore(
+                payload["question"],
+                payload.get("game_context", ""),
+                payload.get("kb_path"),
+                payload.get("game"),
+            )
+        if kind == "look":
+            return await self.answer_look(
+                payload["question"],
+                payload.get("game_context", ""),
+                payload["screenshot"],
+            )
+        if kind == "screenshot":
+            return await self.answer_screenshot(payload["question"], payload["screenshot"])
+        if kind == "auto":
+            results = payload.get("results")
+            if results is None:
+                doc_store = self.get_doc_store(payload.get("kb_path"))
+                if not doc_store:
+                    return None
+                if payload.get("require_match"):
+                    results = (await self.score_candidates(doc_store, [payload["query"]], [payload.get("game")]))[0]
+                else:
+                    with span("kb_search"), metrics.kb_query_seconds.labels("auto").time():
+                        results = await doc_store.query_knowledge_base(
+                            payload["query"],
+                            top_k=5,
+                            filters=doc_store.filters_for_game(payload.get("game")),
+                        )
+                    top_score = best_score(results)
+                    if top_score is not None:
+                        metrics.kb_top_score.labels("auto").observe(top_score)
+            return await self.answer_auto(
+                payload["content"],
+                payload.get("game_context", ""),
+                payload.get("chat_context", ""),
+                results,
+                payload.get("screenshot"),
+            )
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    async def score_candidates(
+        self,
+        doc_store: DocumentStore,
+        queries: list[str],
+        games: list[str | None] | None = None,
+    ) -> list[list[dict[str, Any]] | None]:
+        """Decide which auto-response candidates the KB can answer.
+
+        Args:
+            doc_store: Store to search
+            queries: KB queries, one per candidate message
+            games: Game being played in each candidate's channel, to search that
+                game's series first
+
+        Returns:
+            Per query, the KB results if the top match clears the threshold, else None
+        """
+        # One query_many call per game, since filters apply to the whole call.
+        # The lexical shortcut is off: every candidate needs a cosine score to
+        # be checked against the threshold.
+        by_game: dict[str | None, list[int]] = {}
+        for i, game in enumerate(games or [None] * len(queries)):
+            by_game.setdefault(game, []).append(i)
+
+        batch_results: list[list[dict[str, Any]]] = [[] for _ in queries]
+        for game, indexes in by_game.items():
+            with span("kb_search"), metrics.kb_query_seconds.labels("auto_batch").time():
+                group_results = await doc_store.query_many(
+                    [queries[i] for i in indexes],
+                    top_k=5,
+                    filters=doc_store.filters_for_game(game),
+                    lexical_shortcut=False,
+                )
+            for i, results in zip(indexes, group_results):
+                batch_results[i] = results
+
+        decisions: list[list[dict[str, Any]] | None] = []
+        for query, results in zip(queries, batch_results):
+            if not results:
+                logger.info(f"[AUTO] No KB results for: {query[:50]}")
+                metrics.auto_respond_decisions.labels("ignore", "no_results").inc()
+                decisions.append(None)
+                continue
+
+            # Check similarity - only respond if we have good matches. Hybrid
+            # results are in fusion order, so take the best cosine of any of them.
+            similarity_score = best_score(results) or 0.0
+            metrics.kb_top_score.labels("auto").observe(similarity_score)
+            if similarity_score < AUTO_RESPOND_MIN_SCORE:
+                logger.info(f"[AUTO] KB match too weak ({similarity_score:.2f} < {AUTO_RESPOND_MIN_SCORE}) for: {query[:50]}")
+                metrics.auto_respond_decisions.labels("ignore", "weak_match").inc()
+                decisions.append(None)
+                continue
+
+            logger.info(f"[AUTO] KB match found ({similarity_score:.2f}) - will respond to: {query[:50]}")
+            metrics.auto_respond_decisions.labels("respond", "kb_match").inc()
+            decisions.append(results)
+
+        return decisions
+
+    def pack(
+        self,
+        results: list[dict[str, Any]] | None,
+        chat_context: str,
+        *reserved: str,
+    ) -> PackedContext:
+        """Fit KB results and chat history into the configured token budget.
+
+        Args:
+            results: KB query results, best first
+            chat_context: Formatted recent chat history
+            *reserved: Text always sent with the context (question, game context)
+
+        Returns:
+            The packed context
+        """
+        packed = pack_context(
+            results,
+            chat_context,
+            budget=self.settings.context_token_budget,
+            reserved="\n".join(reserved),
+        )
+        logger.info(f"[CONTEXT] {packed.summary()}")
+        return packed
+
+    def _after_vision(self) -> None:
+        """Let the residency manager bring the chat model back after a vision request."""
+        if self.residency:
+            self.residency.note_vision_use()
+
+    async def answer_ask(self, question: str, game_context: str) -> str:
+        """Answer a general question with persona and game context (no KB).
+
+        Args:
+            question: The chatter's question
+            game_context: Current game/stream context string
+
+        Returns:
+            Reply text
+        """
+        return await self.ollama.generate(
+            prompt=build_user_prompt(question, game_context=game_context),
+            system_prompt=build_system_prompt("ask"),
+        )
+
+    async def answer_mention(
+        self,
+        author: str,
+        content: str,
+        game_context: str,
+        chat_context: str,
+    ) -> str:
+        """Respond to a chat message that mentions the bot.
+
+        Args:
+            author: Chatter who mentioned the bot
+            content: Their message
+            game_context: Current game/stream context string
+            chat_context: Formatted recent chat history
+
+        Returns:
+            Reply text
+        """
+        # Build the prompt with full context
+        prompt = f"{author} said: '{content}'\n\nRespond naturally to what they said."
+
+        # Combine game and chat context
+        chat_context = self.pack(None, chat_context, prompt, game_context).chat_context
+        extra_context = ""
+        if chat_context:
+            extra_context = f"Recent chat history:\n{chat_context}"
+
+        response = await self.ollama.generate(
+            prompt=build_user_prompt(
+                prompt,
+                game_context=game_context,
+                extra_context=extra_context if extra_context else None,
+            ),
+            system_prompt=build_system_prompt("ask"),
+        )
+
+        logger.info(f"Mention response to {author}: {content[:80]}")
+        logger.info(f"  Game context: {game_context if game_context else 'None'}")
+        if chat_context:
+            logger.info(f"  Chat history:\n{chat_context}")
+        logger.info(f"  Response: {response[:100]}...")
+
+        return response
+
+    async def answer_lore(
+        self,
+        question: str,
+        game_context: str,
+        kb_path: str | None,
+        game: str | None = None,
+    ) -> str:
+        """Answer a question using the knowledge base (RAG).
+
+        Args:
+            question: The chatter's question
+            game_context: Current game/stream context string
+            kb_path: Knowledge base to search
+            game: Game being played, to search that game's series first
+
+        Returns:
+            Reply text
+        """
+        doc_store = self.get_doc_store(kb_path)
+        if not doc_store:
+            return "Knowledge base is not enabled."
+        if doc_store.document_count() == 0:
+            return "Knowledge base is empty. No lore available yet!"
+
+        with span("kb_search"), metrics.kb_query_seconds.labels("lore").time():
+            results = await doc_store.query_knowledge_base(
+                question,
+                top_k=5,
+                filters=doc_store.filters_for_game(game),
+            )
+        if not results:
+            return "No relevant information found in the knowledge base."
+        top_score = best_score(results)
+        if top_score is not None:
+            metrics.kb_top_score.labels("lore").observe(top_score)
+
+        # Generate response with RAG context, persona, and game context
+        context = self.pack(results, "", question, game_context).kb_context
+
+        return await self.ollama.generate(
+            prompt=build_user_prompt(question, extra_context=context, game_context=game_context),
+            system_prompt=build_system_prompt("lore"),
+        )
+
+    async def answer_look(self, question: str, game_context: str, screenshot: str) -> str:
+        """Answer a question about a screenshot with persona and game context.
+
+        Args:
+            question: The chatter's question
+            game_context: Current game/stream context string
+            screenshot: Base64 encoded screenshot
+
+        Returns:
+            Reply text
+        """
+        # Add vision-specific guidance
+        system_prompt = build_system_prompt("ask") + LOOK_GUIDANCE
+
+        try:
+            return await self.ollama.generate(
+                prompt=build_user_prompt(question, game_context=game_context),
+                system_prompt=system_prompt,
+                images=[screenshot],
+                model_override=self.settings.ollama_vision_model,
+            )
+        finally:
+            self._after_vision()
+
+    async def answer_screenshot(self, question: str, screenshot: str) -> str:
+        """Describe a screenshot factually with the vision model.
+
+        Args:
+            question: The chatter's question
+            screenshot: Base64 encoded screenshot
+
+        Returns:
+            Reply text
+        """
+        try:
+            return await self.ollama.generate(
+                prompt=question,
+                system_prompt=SCREENSHOT_SYSTEM_PROMPT,
+                images=[screenshot],
+                model_override=self.settings.ollama_vision_model,
+            )
+        finally:
+            self._after_vision()
+
+    async def answer_auto(
+        self,
+        content: str,
+        game_context: str,
+        chat_context: str,
+        results: list[dict[str, Any]] | None,
+        screenshot: str | None = None,
+    ) -> str | None:
+        """Answer an unprompted chat question from KB results.
+
+        Args:
+            content: The chat message
+            game_context: Current game/stream context string
+            chat_context: Formatted recent chat history
+            results: KB results for the message
+            screenshot: Optional base64 screenshot for vague questions
+
+        Returns:
+            Reply text, or None if there is nothing to answer from
+        """
+        if not results:
+            return None
+
+        packed = self.pack(results, chat_context, content, game_context)
+        results = packed.results
+        kb_context = packed.kb_context
+        chat_context = packed.chat_context
+
+        # Combine all context
+        full_context = kb_context
+        if chat_context:
+            full_context = f"Recent chat:\n{chat_context}\n\nKnowledge base:\n{kb_context}"
+
+        system_prompt = build_system_prompt("lore")
+
+        if screenshot:
+            system_prompt += AUTO_SCREENSHOT_NOTE
+
+        try:
+            response = await self.ollama.generate(
+                prompt=build_user_prompt(content, game_context=game_context, extra_context=full_context),
+                system_prompt=system_prompt,
+                images=[screenshot] if screenshot else None,
+                model_override=self.settings.ollama_vision_model if screenshot else None,
+            )
+        finally:
+            if screenshot:
+                self._after_vision()
+
+        # Log detailed context
+        logger.info(f"Auto-response to: {content[:80]}")
+        logger.info(f"  Game context: {game_context if game_context else 'None'}")
+        logger.info(f"  KB sources: {[doc.get('metadata', {}).get('source', '?') for doc in results]}")
+        top_score = best_score(results)
+        logger.info(f"  Top score: {f'{top_score:.2f}' if top_score is not None else 'lexical match'}")
+        if chat_context:
+            logger.info(f"  Chat history:\n{chat_context}")
+        logger.info(f"  KB context preview: {kb_context[:300]}...")
+        logger.info(f"  Response: {response[:100]}...")
+
+        return response
@@ -0,0 +1,286 @@
+"""SQLite-backed job queue between the chat bot and inference workers."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Jobs that keep failing (e.g. a worker crashing on them) are given up after this many tries
+MAX_ATTEMPTS = 3
+
+
+@dataclass
+class Job:
+    """One inference job and, once finished, its reply."""
+
+    id: int
+    kind: str
+    channel: str
+    author: str
+    payload: dict[str, Any]
+    status: str = "pending"
+    reply: str | None = None
+    error: str | None = None
+    created: float = 0.0
+
+
+class SQLiteJobQueue:
+    """Durable job queue shared by one bot process and any number of workers.
+
+    The bot enqueues jobs and collects finished ones; workers claim pending
+    jobs, run them and store the reply. WAL mode lets every process read and
+    write the same file concurrently on one machine. All methods block, so
+    async callers should run them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open (and create if needed) the queue database.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path,
+            timeout=30.0,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.row_factory = sqlite3.Row
+        # One connection is shared by asyncio.to_thread calls; keep transactions from interleaving
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                author TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                reply TEXT,
+                error TEXT,
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, kind: str, channel: str, author: str, payload: dict[str, Any]) -> int:
+        """Add a job for the workers.
+
+        Args:
+            kind: Job type ("ask", "lore", "look", "mention" or "auto")
+            channel: Channel the reply goes to
+            author: Chatter the reply is addressed to
+            payload: JSON-serializable job parameters
+
+        Returns:
+            The job ID
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (kind, channel, author, payload, created) VALUES (?, ?, ?, ?, ?)",
+                (kind, channel, author, json.dumps(payload), time.time()),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str, limit: int = 1, kind: str | None = None) -> list[Job]:
+        """Atomically take pending jobs for a worker.
+
+        Args:
+            worker: Worker identifier recorded on the claimed jobs
+            limit: Maximum number of jobs to claim
+            kind: Only claim jobs of this type, if given
+
+        Returns:
+            Claimed jobs, oldest first (empty if nothing is pending)
+        """
+        query = "SELECT * FROM jobs WHERE status = 'pending'"
+        params: list[Any] = []
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can't claim the same job
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(query, params).fetchall()
+                if rows:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE jobs SET status = 'running', worker = ?, started = ?, "
+                        "attempts = attempts + 1 WHERE id = ?",
+                        [(worker, now, row["id"]) for row in rows],
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        jobs = [self._to_job(row) for row in rows]
+        for job in jobs:
+            job.status = "running"
+        return jobs
+
+    def complete(self, job_id: int, worker: str, reply: str | None) -> bool:
+        """Store a finished job's reply.
+
+        Args:
+            job_id: The job ID
+            worker: Worker that claimed the job
+            reply: Reply text, or None if the job decided not to reply
+
+        Returns:
+            False if the job was requeued and claimed by another worker meanwhile
+            (the reply is dropped)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'done', reply = ?, finished = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (reply, time.time(), job_id, worker),
+            ).rowcount > 0
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """Mark a job as failed.
+
+        Args:
+            job_id: The job ID
+            worker: Worker that claimed the job
+            error: Error description
+
+        Returns:
+            False if the job was requeued and claimed by another worker meanwhile
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (error, time.time(), job_id, worker),
+            ).rowcount > 0
+
+    def accept(self, job_id: int, worker: str, payload: dict[str, Any]) -> bool:
+        """Hand an accepted auto-response candidate back to the bot.
+
+        Used when the bot still has to add something only it can get (a
+        screenshot) before the reply is generated.
+
+        Args:
+            job_id: The job ID
+            worker: Worker that claimed the job
+            payload: Job parameters with the KB results filled in
+
+        Returns:
+            False if the job was requeued and claimed by another worker meanwhile
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = 'accepted', payload = ?, finished = ? "
+                "WHERE id = ? AND status = 'running' AND worker = ?",
+                (json.dumps(payload), time.time(), job_id, worker),
+            ).rowcount > 0
+
+    def collect_finished(self, limit: int = 50) -> list[Job]:
+        """Take finished jobs off the queue for delivery.
+
+        Collected jobs are deleted, so each reply is delivered once.
+
+        Args:
+            limit: Maximum number of jobs to collect
+
+        Returns:
+            Finished (done, failed or accepted) jobs, oldest first
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status IN ('done', 'failed', 'accepted') ORDER BY id LIMIT ?",
+                    (limit,),
+                ).fetchall()
+                self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return [self._to_job(row) for row in rows]
+
+    def requeue_stale(self, timeout: float) -> int:
+        """Return jobs held too long by a worker (e.g. one that crashed) to the queue.
+
+        Args:
+            timeout: Seconds a job may stay running before it counts as stale
+
+        Returns:
+            Number of jobs requeued or failed
+        """
+        cutoff = time.time() - timeout
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'worker timed out', finished = ? "
+                    "WHERE status = 'running' AND started < ? AND attempts >= ?",
+                    (time.time(), cutoff, MAX_ATTEMPTS),
+                ).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE jobs SET status = 'pending', worker = NULL "
+                    "WHERE status = 'running' AND started < ?",
+                    (cutoff,),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if failed or requeued:
+            logger.warning(f"Recovered stale jobs: {requeued} requeued, {failed} failed")
+        return failed + requeued
+
+    def depth(self) -> dict[str, int]:
+        """Count jobs by status.
+
+        Returns:
+            Mapping of status to number of jobs
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row) -> Job:
+        """Convert a database row to a Job."""
+        return Job(
+            id=row["id"],
+            kind=row["kind"],
+            channel=row["channel"],
+            author=row["author"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            reply=row["reply"],
+            error=row["error"],
+            created=row["created"],
+        )
@@ -1,5 +1,7 @@
 """LLM client modules."""
 
+from streamlored.llm.backend_pool import OllamaBackend, OllamaBackendPool
 from streamlored.llm.ollama_client import OllamaClient
+from streamlored.llm.residency import ModelResidency
 
-__all__ = ["OllamaClient"]
+__all__ = ["ModelResidency", "OllamaBackend", "OllamaBackendPool", "OllamaClient"]
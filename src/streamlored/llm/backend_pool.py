@@ -0,0 +1,343 @@
+"""Pool of Ollama servers with health-aware, least-loaded routing."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Traffic types a backend can serve
+BACKEND_ROLES = frozenset({"text", "vision", "embed"})
+
+
+@dataclass
+class OllamaBackend:
+    """One Ollama server and its routing state."""
+
+    url: str
+    roles: frozenset[str] = BACKEND_ROLES
+    in_flight: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+    # Circuit breaker: no traffic is routed here until this monotonic time
+    open_until: float = 0.0
+    # Smoothed request latency in seconds, used to break ties between idle backends
+    latency: float = 0.0
+    client: httpx.AsyncClient | None = field(default=None, repr=False)
+
+    def available(self, now: float) -> bool:
+        """Whether requests may be routed to this backend right now."""
+        return self.healthy and now >= self.open_until
+
+
+def parse_backends(spec: str) -> list[OllamaBackend]:
+    """Parse a backend list like "http://a:11434=text+embed,http://b:11434=vision".
+
+    Entries without "=roles" serve every role.
+
+    Args:
+        spec: Comma-separated backend URLs with optional "+"-separated roles
+
+    Returns:
+        Parsed backends
+
+    Raises:
+        ValueError: If an entry names an unknown role
+    """
+    backends = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, sep, roles_spec = entry.partition("=")
+        roles = BACKEND_ROLES
+        if sep:
+            roles = frozenset(role.strip() for role in roles_spec.split("+") if role.strip())
+            unknown = roles - BACKEND_ROLES
+            if unknown:
+                raise ValueError(f"Unknown Ollama backend role(s) for {url}: {', '.join(sorted(unknown))}")
+        backends.append(OllamaBackend(url=url.strip().rstrip("/"), roles=roles))
+    return backends
+
+
+class OllamaBackendPool:
+    """Routes Ollama requests to the least-loaded healthy backend for a role.
+
+    Each backend keeps its own pooled HTTP client. Repeated connection
+    failures or server errors open a circuit breaker for that backend, and
+    a background probe marks backends healthy or unhealthy between requests.
+    """
+
+    def __init__(
+        self,
+        backends: list[OllamaBackend],
+        timeout: float = 60.0,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        probe_interval: float = 15.0,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            backends: Backends to route between
+            timeout: Default request timeout in seconds
+            failure_threshold: Consecutive failures that open a backend's circuit
+            cooldown: Seconds a backend's circuit stays open
+            probe_interval: Seconds between background health probes
+        """
+        if not backends:
+            raise ValueError("At least one Ollama backend is required")
+        self.backends = backends
+        self.timeout = timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self._probe_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls, settings: Any, timeout: float = 60.0) -> "OllamaBackendPool":
+        """Build a pool from OLLAMA_BACKENDS, or the single OLLAMA_HOST server.
+
+        Args:
+            settings: Application settings
+            timeout: Default request timeout in seconds
+
+        Returns:
+            Configured pool
+        """
+        backends = parse_backends(settings.ollama_backends)
+        if not backends:
+            backends = [OllamaBackend(url=settings.ollama_base_url)]
+        return cls(
+            backends,
+            timeout=timeout,
+            failure_threshold=settings.ollama_circuit_failures,
+            cooldown=settings.ollama_circuit_cooldown,
+            probe_interval=settings.ollama_probe_interval,
+        )
+
+    @classmethod
+    def single(cls, base_url: str, timeout: float = 60.0) -> "OllamaBackendPool":
+        """Build a pool with one backend serving every role.
+
+        Args:
+            base_url: Base URL of the Ollama server
+            timeout: Default request timeout in seconds
+
+        Returns:
+            Single-backend pool
+        """
+        return cls([OllamaBackend(url=base_url.rstrip("/"))], timeout=timeout)
+
+    def describe(self) -> str:
+        """Short human-readable summary of the backends, for logging."""
+        return ", ".join(f"{b.url} ({'+'.join(sorted(b.roles))})" for b in self.backends)
+
+    def _client(self, backend: OllamaBackend) -> httpx.AsyncClient:
+        """Get a backend's pooled HTTP client, creating it on first use."""
+        if backend.client is None or backend.client.is_closed:
+            backend.client = httpx.AsyncClient(timeout=self.timeout)
+        return backend.client
+
+    def candidates(self, role: str) -> list[OllamaBackend]:
+        """Backends that can take a request for a role, best first.
+
+        Healthy backends with a closed circuit are ordered by in-flight requests,
+        then latency. If none are available, every backend serving the role is
+        returned so a request can still try (and a recovered server is noticed).
+
+        Args:
+            role: "text", "vision" or "embed"
+
+        Returns:
+            Ordered backends
+
+        Raises:
+            RuntimeError: If no backend serves the role
+        """
+        serving = [b for b in self.backends if role in b.roles]
+        if not serving:
+            raise RuntimeError(f"No Ollama backend configured for {role} requests")
+
+        now = time.monotonic()
+        available = [b for b in serving if b.available(now)]
+        if not available:
+            available = sorted(serving, key=lambda b: b.open_until)
+            return available
+        return sorted(available, key=lambda b: (b.in_flight, b.latency))
+
+    async def post(
+        self,
+        role: str,
+        path: str,
+        payload: dict[str, Any],
+        timeout: float | None = None,
+    ) -> httpx.Response:
+        """POST to the best backend for a role, failing over on connection errors.
+
+        Only connection failures are retried on another backend; a request that
+        reached a server is never replayed, so slow generations aren't doubled.
+
+        Args:
+            role: "text", "vision" or "embed"
+            path: API path, e.g. "/api/generate"
+            payload: JSON body
+            timeout: Optional per-request timeout override
+
+        Returns:
+            The HTTP response (4xx responses are returned, not raised)
+        """
+        last_error: Exception | None = None
+
+        for backend in self.candidates(role):
+            backend.in_flight += 1
+            started = time.monotonic()
+            try:
+                response = await self._client(backend).post(
+                    f"{backend.url}{path}",
+                    json=payload,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                self._record_failure(backend, e)
+                last_error = e
+                continue
+            except httpx.TransportError as e:
+                self._record_failure(backend, e)
+                raise
+            finally:
+                backend.in_flight -= 1
+
+            if response.status_code >= 500:
+                self._record_failure(backend, f"HTTP {response.status_code}")
+            else:
+                self._record_success(backend, time.monotonic() - started)
+            return response
+
+        raise last_error or RuntimeError(f"No Ollama backend reachable for {role} requests")
+
+    async def broadcast(
+        self,
+        role: str,
+        path: str,
+        payload: dict[str, Any],
+        timeout: float | None = None,
+    ) -> int:
+        """POST the same request to every available backend serving a role.
+
+        Used for requests that change per-server state, like loading a model.
+
+        Args:
+            role: "text", "vision" or "embed"
+            path: API path, e.g. "/api/generate"
+            payload: JSON body
+            timeout: Optional per-request timeout override
+
+        Returns:
+            Number of backends that accepted the request
+        """
+        now = time.monotonic()
+        targets = [b for b in self.backends if role in b.roles and b.available(now)]
+
+        async def send(backend: OllamaBackend) -> bool:
+            try:
+                response = await self._client(backend).post(
+                    f"{backend.url}{path}",
+                    json=payload,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+            except httpx.HTTPError as e:
+                self._record_failure(backend, e)
+                return False
+            if response.status_code >= 400:
+                logger.warning(f"Ollama backend {backend.url} rejected {path}: HTTP {response.status_code}")
+                return False
+            return True
+
+        results = await asyncio.gather(*(send(b) for b in targets))
+        return sum(results)
+
+    def _record_success(self, backend: OllamaBackend, elapsed: float) -> None:
+        """Close a backend's circuit and update its latency estimate."""
+        if not backend.healthy or backend.consecutive_failures >= self.failure_threshold:
+            logger.info(f"Ollama backend {backend.url} recovered")
+        backend.healthy = True
+        backend.consecutive_failures = 0
+        backend.open_until = 0.0
+        backend.latency = elapsed if backend.latency == 0 else 0.8 * backend.latency + 0.2 * elapsed
+
+    def _record_failure(self, backend: OllamaBackend, error: Any) -> None:
+        """Count a failure and open the backend's circuit past the threshold."""
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.failure_threshold:
+            backend.open_until = time.monotonic() + self.cooldown
+            logger.warning(
+                f"Ollama backend {backend.url} failed {backend.consecutive_failures} times "
+                f"({error}) - routing around it for {self.cooldown:.0f}s"
+            )
+        else:
+            logger.debug(f"Ollama backend {backend.url} request failed: {error}")
+
+    async def probe(self, backend: OllamaBackend) -> bool:
+        """Check whether one backend is reachable via /api/tags.
+
+        Args:
+            backend: Backend to probe
+
+        Returns:
+            True if the backend answered
+        """
+        try:
+            response = await self._client(backend).get(f"{backend.url}/api/tags", timeout=5.0)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+
+        if ok and not backend.healthy:
+            logger.info(f"Ollama backend {backend.url} is healthy again")
+        elif not ok and backend.healthy:
+            logger.warning(f"Ollama backend {backend.url} failed its health check")
+
+        # Only reachability; an open circuit closes when its cooldown ends and a
+        # real request succeeds, since /api/tags answers even when models fail
+        backend.healthy = ok
+        return ok
+
+    async def probe_all(self) -> bool:
+        """Probe every backend concurrently.
+
+        Returns:
+            True if at least one backend is healthy
+        """
+        results = await asyncio.gather(*(self.probe(b) for b in self.backends))
+        return any(results)
+
+    def start_health_probes(self) -> None:
+        """Start the background health probe loop (idempotent)."""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        """Probe all backends every probe_interval seconds."""
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self.probe_all()
+
+    async def close(self) -> None:
+        """Stop health probes and close every backend's connections."""
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+        for backend in self.backends:
+            if backend.client is not None:
+                await backend.client.aclose()
+                backend.client = None
@@ -0,0 +1,194 @@
+"""Stand-in Ollama HTTP server for load tests without a GPU.
+
+Answers the endpoints the bot uses (/api/chat, /api/generate, /api/embed,
+/api/embeddings, /api/tags) after a configurable delay. Generations hold one
+of a fixed number of slots, like OLLAMA_NUM_PARALLEL, so requests queue the
+way they do on a real server, and are refused with a 503 once too many are
+waiting, like OLLAMA_MAX_QUEUE. Embeddings come from the deterministic
+hashing embedder, so a KB ingested through this server can be searched.
+
+The server runs on its own event loop in a background thread, so its
+bookkeeping doesn't compete with the bot's loop for scheduling.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+from typing import Any
+
+from streamlored.rag.benchmark import HashingEmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+# Canned reply; its word count stands in for the generated token count
+FAKE_REPLY = (
+    "That one's a classic - the answer is in the knowledge base, and honestly "
+    "chat, you should have read the docs before asking. Stay frosty."
+)
+
+
+class FakeOllamaServer:
+    """Local HTTP server that imitates Ollama's latency and queueing."""
+
+    def __init__(
+        self,
+        generate_latency: float = 2.0,
+        embed_latency: float = 0.05,
+        jitter: float = 0.25,
+        parallel: int = 1,
+        max_queue: int = 512,
+        dim: int = 384,
+        seed: int = 0,
+    ) -> None:
+        """Configure the server (call start() to listen).
+
+        Args:
+            generate_latency: Mean seconds per chat generation once it has a slot
+            embed_latency: Mean seconds per embedding request
+            jitter: Uniform +/- fraction applied to each delay
+            parallel: Generations served at once (OLLAMA_NUM_PARALLEL)
+            max_queue: Generations allowed to wait for a slot before 503s (OLLAMA_MAX_QUEUE)
+            dim: Embedding dimensions
+            seed: Random seed for the jitter
+        """
+        self.generate_latency = generate_latency
+        self.embed_latency = embed_latency
+        self.jitter = jitter
+        self.parallel = max(1, parallel)
+        self.max_queue = max_queue
+        self.embedder = HashingEmbeddingProvider(dim)
+        self._rng = random.Random(seed)
+        self.url = ""
+        # Counters read by the load generator; plain ints, updated on the server thread
+        self.requests: dict[str, int] = {}
+        self.rejected = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.Server | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+
+    def start(self) -> str:
+        """Start serving on a free localhost port in a background thread.
+
+        Returns:
+            Base URL of the server
+        """
+        self._thread = threading.Thread(target=self._serve, name="fake-ollama", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        logger.info(f"Fake Ollama server listening at {self.url}")
+        return self.url
+
+    def stop(self) -> None:
+        """Stop the server and its thread."""
+        if self._loop and self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def _serve(self) -> None:
+        """Thread body: run the server's event loop until stop()."""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(self.parallel)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle_connection, "127.0.0.1", 0)
+        )
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, response = await self._route(method, path, json.loads(body) if body else {})
+                data = json.dumps(response).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _delay(self, mean: float) -> float:
+        """Jittered delay around a mean."""
+        return max(0.0, mean * (1 + self._rng.uniform(-self.jitter, self.jitter)))
+
+    async def _route(self, method: str, path: str, payload: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        """Answer one request like Ollama would."""
+        self.requests[path] = self.requests.get(path, 0) + 1
+
+        if method == "GET" and path == "/api/tags":
+            return "200 OK", {"models": []}
+
+        if path in ("/api/embed", "/api/embeddings"):
+            texts = payload.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            if path == "/api/embeddings":
+                texts = [payload.get("prompt", "")]
+            await asyncio.sleep(self._delay(self.embed_latency))
+            embeddings = await self.embedder.embed(texts)
+            if path == "/api/embeddings":
+                return "200 OK", {"embedding": embeddings[0]}
+            return "200 OK", {"model": payload.get("model"), "embeddings": embeddings}
+
+        if path == "/api/generate" and not payload.get("prompt"):
+            # Model load request (warm-up)
+            return "200 OK", {"model": payload.get("model"), "response": "", "done": True}
+
+        if path in ("/api/chat", "/api/generate"):
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                return "503 Service Unavailable", {"error": "server busy, please try again. maximum pending requests exceeded"}
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                await self._slots.acquire()
+            finally:
+                self.waiting -= 1
+            try:
+                duration = self._delay(self.generate_latency)
+                await asyncio.sleep(duration)
+            finally:
+                self._slots.release()
+
+            prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+            stats = {
+                "done": True,
+                "total_duration": int(duration * 1e9),
+                "prompt_eval_count": prompt_chars // 4,
+                "eval_count": len(FAKE_REPLY.split()),
+            }
+            if path == "/api/chat":
+                return "200 OK", {"model": payload.get("model"), "message": {"role": "assistant", "content": FAKE_REPLY}, **stats}
+            return "200 OK", {"model": payload.get("model"), "response": FAKE_REPLY, **stats}
+
+        return "404 Not Found", {"error": f"unknown endpoint {path}"}
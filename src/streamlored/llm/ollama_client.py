@@ -1,23 +1,97 @@
 """Ollama API client for LLM interactions."""
 
-import httpx
 from typing import Any
 
+from streamlored import metrics
+from streamlored.llm.backend_pool import OllamaBackendPool
+from streamlored.tracing import span
+
+
+def keep_alive_value(keep_alive: str) -> str | int:
+    """Convert a keep_alive setting to what Ollama expects.
+
+    Durations like "30m" are passed through; bare numbers such as "-1"
+    (keep loaded forever) or "0" (unload right away) must be sent as numbers.
+
+    Args:
+        keep_alive: Duration string or number of seconds
+
+    Returns:
+        Value for the request's "keep_alive" field
+    """
+    try:
+        return int(keep_alive)
+    except ValueError:
+        return keep_alive
+
 
 class OllamaClient:
     """HTTP client for Ollama API."""
 
-    def __init__(self, base_url: str, model: str, timeout: float = 60.0):
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        timeout: float = 60.0,
+        pool: OllamaBackendPool | None = None,
+        keep_alive: dict[str, str] | None = None,
+    ):
         """Initialize the Ollama client.
 
         Args:
             base_url: Base URL of the Ollama server (e.g., http://localhost:11434)
             model: Model name to use for generation
             timeout: Request timeout in seconds
+            pool: Optional backend pool to route requests through; defaults to
+                a single backend at base_url
+            keep_alive: Optional per-model keep_alive durations (model name -> "30m");
+                models not listed use Ollama's default
         """
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.timeout = timeout
+        self.pool = pool or OllamaBackendPool.single(self.base_url, timeout=timeout)
+        self.keep_alive = keep_alive or {}
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.pool.close()
+
+    async def chat(
+        self,
+        messages: list[dict[str, Any]],
+        model_override: str | None = None,
+    ) -> str:
+        """Generate a reply to a conversation via /api/chat.
+
+        Ollama reuses its cached evaluation of the longest unchanged message
+        prefix, so keep the system message identical between calls.
+
+        Args:
+            messages: Chat messages ({"role", "content"} and optional "images")
+            model_override: Optional model to use instead of default
+
+        Returns:
+            The generated text response
+        """
+        payload: dict[str, Any] = {
+            "model": model_override or self.model,
+            "messages": messages,
+            "stream": False,
+        }
+
+        if payload["model"] in self.keep_alive:
+            payload["keep_alive"] = keep_alive_value(self.keep_alive[payload["model"]])
+
+        # Vision requests can live on a different box from chat generation
+        role = "vision" if any(message.get("images") for message in messages) else "text"
+        with span("vision" if role == "vision" else "generate"), metrics.ollama_request("chat", payload["model"]):
+            response = await self.pool.post(role, "/api/chat", payload)
+            response.raise_for_status()
+            data = response.json()
+        metrics.ollama_tokens.labels(payload["model"], "prompt").inc(data.get("prompt_eval_count", 0))
+        metrics.ollama_tokens.labels(payload["model"], "generated").inc(data.get("eval_count", 0))
+        return data.get("message", {}).get("content", "")
 
     async def generate(
         self,
@@ -29,6 +103,9 @@ class OllamaClient:
     ) -> str:
         """Generate a response from the LLM.
 
+        Sent as a system + user chat so the system prompt is a reusable prefix;
+        put per-message context in the prompt, not the system prompt.
+
         Args:
             prompt: The user prompt to send
             system_prompt: Optional system prompt to set context
@@ -39,36 +116,42 @@ class OllamaClient:
         Returns:
             The generated text response
         """
-        payload: dict[str, Any] = {
-            "model": model_override or self.model,
-            "prompt": prompt,
-            "stream": False,
-        }
-
+        messages: list[dict[str, Any]] = []
         if system_prompt:
-            payload["system"] = system_prompt
+            messages.append({"role": "system", "content": system_prompt})
 
+        user_message: dict[str, Any] = {"role": "user", "content": prompt}
         if images:
-            payload["images"] = images
+            user_message["images"] = images
+        messages.append(user_message)
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(
-                f"{self.base_url}/api/generate",
-                json=payload,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data.get("response", "")
+        return await self.chat(messages, model_override=model_override)
+
+    async def warm_up(self, model: str | None = None, role: str = "text") -> bool:
+        """Load a model on every backend serving a role without generating.
+
+        Ollama loads the model for an empty prompt and keeps it for keep_alive.
+
+        Args:
+            model: Model to load (defaults to the chat model)
+            role: Backend role the model is served under ("text" or "vision")
+
+        Returns:
+            True if at least one backend loaded the model
+        """
+        model = model or self.model
+        payload: dict[str, Any] = {"model": model}
+        if model in self.keep_alive:
+            payload["keep_alive"] = keep_alive_value(self.keep_alive[model])
+        return await self.pool.broadcast(role, "/api/generate", payload) > 0
 
     async def health_check(self) -> bool:
-        """Check if the Ollama server is accessible.
+        """Check if the Ollama servers are accessible.
 
         Returns:
-            True if server is healthy, False otherwise
+            True if at least one backend is healthy, False otherwise
         """
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            return await self.pool.probe_all()
         except Exception:
             return False
@@ -0,0 +1,92 @@
+"""Keep the models StreamLored uses loaded in Ollama across a stream."""
+
+import asyncio
+import logging
+
+from streamlored.llm.ollama_client import OllamaClient
+
+logger = logging.getLogger(__name__)
+
+# Residency policies: "chat" reloads the chat model after a vision request
+# (for GPUs that only fit one model), "none" leaves eviction to Ollama
+RESIDENCY_POLICIES = ("chat", "none")
+
+
+class ModelResidency:
+    """Warms models up front and reloads them when they get evicted.
+
+    Loading a model costs seconds, so the chat, embedding and vision models
+    are loaded before the first request. On small GPUs a vision request evicts
+    the chat model; with the "chat" policy the chat model is reloaded in the
+    background right after, so the next !ask doesn't pay for it.
+    """
+
+    def __init__(
+        self,
+        ollama: OllamaClient,
+        embedding_provider=None,
+        vision_model: str | None = None,
+        policy: str = "chat",
+    ) -> None:
+        """Initialize residency management.
+
+        Args:
+            ollama: Client for the chat and vision models
+            embedding_provider: Optional embedding provider with a warm_up() method
+            vision_model: Vision model name, if vision features are used
+            policy: "chat" or "none" (see RESIDENCY_POLICIES)
+        """
+        if policy not in RESIDENCY_POLICIES:
+            raise ValueError(f"Unknown model residency policy: {policy}")
+        self.ollama = ollama
+        self.embedding_provider = embedding_provider
+        self.vision_model = vision_model if vision_model != ollama.model else None
+        self.policy = policy
+        self._reload_task: asyncio.Task | None = None
+
+    async def warm_up(self) -> None:
+        """Load every model. The chat model goes last so it's the one left resident."""
+        if self.vision_model:
+            await self._warm(self.ollama.warm_up(self.vision_model, role="vision"), self.vision_model)
+        if self.embedding_provider:
+            await self._warm(self.embedding_provider.warm_up(), self.embedding_provider.model)
+        await self._warm(self.ollama.warm_up(), self.ollama.model)
+
+    async def refresh(self) -> None:
+        """Reload the chat and embedding models, e.g. when the game changes.
+
+        Cheap when they're already loaded; it also restarts their keep_alive timers.
+        """
+        if self.embedding_provider:
+            await self._warm(self.embedding_provider.warm_up(), self.embedding_provider.model)
+        await self._warm(self.ollama.warm_up(), self.ollama.model)
+
+    def note_vision_use(self) -> None:
+        """Schedule a background chat model reload after a vision request."""
+        if self.policy != "chat" or not self.vision_model:
+            return
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.create_task(
+                self._warm(self.ollama.warm_up(), self.ollama.model)
+            )
+
+    async def close(self) -> None:
+        """Cancel any pending background reload."""
+        if self._reload_task:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
+
+    @staticmethod
+    async def _warm(request, model: str) -> None:
+        """Run one warm-up request, logging instead of raising."""
+        try:
+            if await request:
+                logger.info(f"Model loaded: {model}")
+            else:
+                logger.warning(f"Could not load model {model}")
+        except Exception as e:
+            logger.warning(f"Error loading model {model}: {e}")
@@ -2,16 +2,29 @@
 
 import argparse
 import asyncio
+import json
 import logging
 import sys
+from datetime import datetime
 from pathlib import Path
 
 from streamlored.config import Settings, get_settings
-from streamlored.llm import OllamaClient
+from streamlored.inference import open_document_store
+from streamlored.llm import ModelResidency, OllamaBackendPool, OllamaClient
+from streamlored.rag import DocumentStore
 from streamlored.rag.ollama_embeddings import OllamaEmbeddingProvider
-from streamlored.rag.json_store import JsonDocumentStore
-from streamlored.rag.chunking import chunk_markdown, chunk_plain_text
-from streamlored.persona import build_system_prompt
+from streamlored.rag.benchmark import (
+    CachedEmbeddingProvider,
+    HashingEmbeddingProvider,
+    format_quantization_results,
+    format_retrieval_results,
+    load_questions,
+    run_quantization_benchmark,
+    run_retrieval_benchmark,
+)
+from streamlored.rag.ingest import find_documents, ingest_files
+from streamlored.rag.packing import pack_context
+from streamlored.persona import build_system_prompt, build_user_prompt
 
 
 def setup_logging() -> None:
@@ -44,7 +57,7 @@ async def run_ingest(settings: Settings, docs_dir: str) -> None:
         sys.exit(1)
 
     # Find all .txt and .md files
-    files = list(docs_path.glob("**/*.txt")) + list(docs_path.glob("**/*.md"))
+    files = await asyncio.to_thread(find_documents, docs_path)
 
     if not files:
         logger.warning(f"No .txt or .md files found in {docs_dir}")
@@ -54,7 +67,8 @@ async def run_ingest(settings: Settings, docs_dir: str) -> None:
 
     # Check if knowledge base exists and prompt for confirmation
     kb_path = Path(settings.kb_path)
-    if kb_path.exists():
+    replace_existing = False
+    if kb_path.exists() or kb_path.with_suffix(".log.jsonl").exists():
         print(f"\nWarning: Knowledge base already exists at {settings.kb_path}")
         print("Ingesting will REPLACE the existing knowledge base.\n")
         try:
@@ -62,9 +76,7 @@ async def run_ingest(settings: Settings, docs_dir: str) -> None:
             if response != 'y':
                 logger.info("Ingest cancelled by user")
                 return
-            # Delete the old knowledge base
-            kb_path.unlink()
-            logger.info(f"Deleted existing knowledge base: {settings.kb_path}")
+            replace_existing = True
         except (KeyboardInterrupt, EOFError):
             print("\nIngest cancelled")
             return
@@ -73,40 +85,39 @@ async def run_ingest(settings: Settings, docs_dir: str) -> None:
     embedding_provider = OllamaEmbeddingProvider(
         base_url=settings.ollama_base_url,
         model=settings.ollama_embed_model,
+        pool=OllamaBackendPool.from_settings(settings),
     )
 
-    doc_store = JsonDocumentStore(
-        kb_path=settings.kb_path,
-        embedding_provider=embedding_provider,
-    )
-
-    # Read and chunk documents
-    all_chunks = []
-    for file_path in files:
-        try:
-            content = file_path.read_text(encoding="utf-8")
-            if not content.strip():
-                continue
-
-            # Chunk based on file type
-            if file_path.suffix.lower() == ".md":
-                chunks = chunk_markdown(content, file_path.name)
-            else:
-                chunks = chunk_plain_text(content, file_path.name)
-
-            all_chunks.extend(chunks)
-            logger.info(f"Read: {file_path.name} -> {len(chunks)} chunks")
+    doc_store = open_document_store(settings, settings.kb_path, embedding_provider)
+    if replace_existing:
+        doc_store.clear()
+        logger.info(f"Cleared existing knowledge base: {settings.kb_path}")
 
-        except Exception as e:
-            logger.error(f"Failed to read {file_path}: {e}")
+    # Chunk files in worker processes while earlier chunks are embedded
+    try:
+        stats = await ingest_files(
+            doc_store,
+            files,
+            docs_path,
+            workers=settings.ingest_workers,
+            max_tokens=settings.chunk_max_tokens,
+            overlap_tokens=settings.chunk_overlap_tokens,
+            dedup_threshold=settings.ingest_dedup_threshold,
+        )
+        # Leave a single up-to-date snapshot instead of a long log
+        await doc_store.compact()
+    finally:
+        await embedding_provider.close()
 
-    if not all_chunks:
+    if not stats.chunks:
         logger.warning("No documents to ingest")
         return
+    logger.info(f"Successfully ingested {stats.summary()} into {settings.kb_path}")
 
-    # Ingest all chunks
-    await doc_store.ingest_documents(all_chunks)
-    logger.info(f"Successfully ingested {len(all_chunks)} chunks into {settings.kb_path}")
+    if stats.duplicates:
+        report_path = kb_path.with_suffix(".duplicates.json")
+        report_path.write_text(json.dumps(stats.duplicates, indent=2, ensure_ascii=False), encoding="utf-8")
+        logger.info(f"Wrote near-duplicate report to {report_path}")
 
 
 async def run_local_chat(settings: Settings) -> None:
@@ -118,29 +129,32 @@ async def run_local_chat(settings: Settings) -> None:
     logger = logging.getLogger(__name__)
 
     # Initialize Ollama client
+    pool = OllamaBackendPool.from_settings(settings)
     ollama = OllamaClient(
         base_url=settings.ollama_base_url,
         model=settings.ollama_model,
+        pool=pool,
+        keep_alive=settings.ollama_keep_alive_by_model,
     )
 
     # Check Ollama health
     if not await ollama.health_check():
-        logger.error(f"Ollama not available at {settings.ollama_base_url}")
+        logger.error(f"Ollama not available at {pool.describe()}")
         sys.exit(1)
 
-    logger.info(f"Connected to Ollama at {settings.ollama_base_url}")
+    logger.info(f"Connected to Ollama at {pool.describe()}")
 
     # Initialize RAG components if enabled
-    doc_store: JsonDocumentStore | None = None
+    doc_store: DocumentStore | None = None
+    embedding_provider: OllamaEmbeddingProvider | None = None
     if settings.kb_enabled:
         embedding_provider = OllamaEmbeddingProvider(
             base_url=settings.ollama_base_url,
             model=settings.ollama_embed_model,
+            pool=pool,
+            keep_alive=settings.ollama_embed_keep_alive,
         )
-        doc_store = JsonDocumentStore(
-            kb_path=settings.kb_path,
-            embedding_provider=embedding_provider,
-        )
+        doc_store = open_document_store(settings, settings.kb_path, embedding_provider)
         doc_count = doc_store.document_count()
         if doc_count > 0:
             logger.info(f"Knowledge base loaded: {doc_count} documents")
@@ -167,6 +181,16 @@ async def run_local_chat(settings: Settings) -> None:
     else:
         logger.info("OBS disabled")
 
+    # Load models up front so the first question doesn't wait on them
+    residency = ModelResidency(
+        ollama,
+        embedding_provider,
+        vision_model=settings.ollama_vision_model if obs_client else None,
+        policy=settings.ollama_residency,
+    )
+    if settings.ollama_warmup:
+        await residency.warm_up()
+
     # Initialize LiveSplit plugin if enabled
     livesplit = None
     if settings.livesplit_enabled:
@@ -266,15 +290,16 @@ async def run_local_chat(settings: Settings) -> None:
                             if timer_context:
                                 game_context = timer_context
 
-                        system_prompt = build_system_prompt("local_chat", game_context=game_context)
+                        system_prompt = build_system_prompt("local_chat")
                         system_prompt += "\n\nAnalyze the image and answer based on what you see."
 
                         response = await ollama.generate(
-                            prompt=question,
+                            prompt=build_user_prompt(question, game_context=game_context),
                             system_prompt=system_prompt,
                             images=[screenshot],
                             model_override=settings.ollama_vision_model,
                         )
+                        residency.note_vision_use()
                         print(f"\nbot> {response}")
                     else:
                         print("\nbot> Failed to capture screenshot")
@@ -310,25 +335,27 @@ async def run_local_chat(settings: Settings) -> None:
                     results = await doc_store.query_knowledge_base(kb_query, top_k=5)
                     if results:
                         logger.info(f"KB returned {len(results)} results")
-                        context_parts = []
                         for doc in results:
                             source = doc.get("metadata", {}).get("source", "unknown")
-                            section = doc.get("metadata", {}).get("section_title", "")
-                            score = doc.get("score", 0)
-                            logger.debug(f"  - {source} ({score:.2f})")
-                            if section:
-                                context_parts.append(f"[{source} - {section}]:\n{doc['content']}")
-                            else:
-                                context_parts.append(f"[{source}]:\n{doc['content']}")
-                        context = "\n\n---\n\n".join(context_parts)
+                            score = doc.get("score")
+                            logger.debug(f"  - {source} ({f'{score:.2f}' if score is not None else 'lexical match'})")
+                        # Fit the chunks into the prompt budget
+                        packed = pack_context(
+                            results,
+                            budget=settings.context_token_budget,
+                            reserved=f"{user_input}\n{game_context}",
+                        )
+                        logger.info(f"Context: {packed.summary()}")
+                        context = packed.kb_context
                     else:
                         logger.info("KB returned no results")
                 except Exception as e:
                     logger.warning(f"KB query failed: {e}")
 
-            # Build prompt with persona
-            system_prompt = build_system_prompt(
-                "local_chat",
+            # Build prompt with persona (static) and context (per message)
+            system_prompt = build_system_prompt("local_chat")
+            prompt = build_user_prompt(
+                user_input,
                 extra_context=context if context else None,
                 game_context=game_context if game_context else None,
             )
@@ -336,7 +363,7 @@ async def run_local_chat(settings: Settings) -> None:
             # Generate response
             logger.info("Generating LLM response...")
             response = await ollama.generate(
-                prompt=user_input,
+                prompt=prompt,
                 system_prompt=system_prompt,
             )
             logger.info(f"Response generated ({len(response)} chars)")
@@ -354,12 +381,218 @@ async def run_local_chat(settings: Settings) -> None:
             print(f"\nbot> Sorry, an error occurred: {e}")
 
     # Cleanup
+    await residency.close()
+    await ollama.close()
     if obs_client:
         await obs_client.disconnect()
     if livesplit:
         await livesplit.disconnect()
 
 
+async def run_worker(settings: Settings) -> None:
+    """Run an inference worker that answers jobs queued by the Twitch bot.
+
+    Args:
+        settings: Application settings
+    """
+    logger = logging.getLogger(__name__)
+
+    from streamlored.inference import InferenceService
+    from streamlored.job_queue import SQLiteJobQueue
+    from streamlored.worker import InferenceWorker
+
+    # Initialize Ollama client
+    pool = OllamaBackendPool.from_settings(settings)
+    ollama = OllamaClient(
+        base_url=settings.ollama_base_url,
+        model=settings.ollama_model,
+        pool=pool,
+        keep_alive=settings.ollama_keep_alive_by_model,
+    )
+
+    # Check Ollama health
+    if not await ollama.health_check():
+        logger.error(f"Ollama not available at {pool.describe()}")
+        sys.exit(1)
+
+    logger.info(f"Connected to Ollama at {pool.describe()}")
+
+    # Initialize RAG components if enabled
+    embedding_provider: OllamaEmbeddingProvider | None = None
+    if settings.kb_enabled:
+        embedding_provider = OllamaEmbeddingProvider(
+            base_url=settings.ollama_base_url,
+            model=settings.ollama_embed_model,
+            cache_size=settings.embed_cache_size,
+            pool=pool,
+            keep_alive=settings.ollama_embed_keep_alive,
+        )
+
+    residency = ModelResidency(
+        ollama,
+        embedding_provider,
+        # Screenshots only come from a bot with OBS enabled
+        vision_model=settings.ollama_vision_model if settings.obs_enabled else None,
+        policy=settings.ollama_residency,
+    )
+    if settings.ollama_warmup:
+        await residency.warm_up()
+
+    service = InferenceService(settings, ollama, embedding_provider, residency)
+
+    # Load every KB the bot's channels may ask for up front
+    for kb_path in {settings.kb_path, *settings.channel_kb_paths.values()}:
+        doc_store = service.get_doc_store(kb_path)
+        if doc_store:
+            logger.info(f"Knowledge base loaded: {kb_path} ({doc_store.document_count()} documents)")
+
+    queue = SQLiteJobQueue(settings.job_queue_path)
+    logger.info(f"Pulling jobs from {settings.job_queue_path}")
+
+    pool.start_health_probes()
+    try:
+        await InferenceWorker(settings, queue, service).run()
+    finally:
+        queue.close()
+        await residency.close()
+        await pool.close()
+
+
+def run_bench_quantization(settings: Settings) -> None:
+    """Compare embedding precisions on the ingested knowledge base.
+
+    Args:
+        settings: Application settings
+    """
+    store = open_document_store(settings, settings.kb_path, None)
+    if store.document_count() == 0:
+        raise FileNotFoundError(f"Knowledge base at {settings.kb_path} is missing or empty, run --ingest first")
+
+    print(f"Benchmarking vector precisions on {settings.kb_path}...")
+    results = run_quantization_benchmark(store.embeddings())
+    print(format_quantization_results(results))
+
+
+async def run_bench_retrieval(settings: Settings, questions_file: str, embedder: str, output: str | None) -> None:
+    """Score KB retrieval on a labelled question set and save the results.
+
+    Args:
+        settings: Application settings (KB store, chunking and retrieval options)
+        questions_file: JSON Lines question set (see load_questions)
+        embedder: "hashing" for the offline stand-in, "ollama" for the real
+            embedding model with embeddings cached on disk
+        output: Results file (default: timestamped file in data/benchmarks)
+    """
+    docs_path = Path(settings.kb_docs_path)
+    if not docs_path.is_dir():
+        raise FileNotFoundError(f"Docs folder not found: {docs_path}")
+    questions = load_questions(Path(questions_file))
+
+    if embedder == "ollama":
+        embedding_provider = CachedEmbeddingProvider(
+            OllamaEmbeddingProvider(
+                base_url=settings.ollama_base_url,
+                model=settings.ollama_embed_model,
+                pool=OllamaBackendPool.from_settings(settings),
+            ),
+            Path("data") / "bench_embeddings.sqlite3",
+        )
+    else:
+        embedding_provider = HashingEmbeddingProvider()
+
+    print(f"Benchmarking retrieval on {docs_path} with {len(questions)} questions ({embedder} embeddings)...")
+    try:
+        results = await run_retrieval_benchmark(
+            questions,
+            docs_path,
+            lambda kb_path: open_document_store(settings, kb_path, embedding_provider),
+            top_k=5,
+            workers=settings.ingest_workers,
+            max_tokens=settings.chunk_max_tokens,
+            overlap_tokens=settings.chunk_overlap_tokens,
+            dedup_threshold=settings.ingest_dedup_threshold,
+        )
+    finally:
+        await embedding_provider.close()
+
+    started = datetime.now()
+    results["timestamp"] = started.isoformat(timespec="seconds")
+    results["config"] = {
+        "questions_file": questions_file,
+        "embedder": embedder,
+        "embed_model": settings.ollama_embed_model if embedder == "ollama" else "hashing",
+        "kb_store": settings.kb_store,
+        "kb_retrieval": settings.kb_retrieval,
+        "kb_vector_precision": settings.kb_vector_precision,
+        "kb_rescore": settings.kb_rescore,
+        "kb_diversity": settings.kb_diversity,
+        "kb_reranker": settings.kb_reranker,
+        "chunk_max_tokens": settings.chunk_max_tokens,
+        "chunk_overlap_tokens": settings.chunk_overlap_tokens,
+        "ingest_dedup_threshold": settings.ingest_dedup_threshold,
+    }
+    output_path = Path(output or Path("data") / "benchmarks" / f"retrieval-{started:%Y%m%d-%H%M%S}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(format_retrieval_results(results))
+    print(f"Results written to {output_path}")
+
+
+async def run_chat_replay(settings: Settings, args: argparse.Namespace) -> None:
+    """Replay a chat log through the bot against a fake Ollama server and save the results.
+
+    Args:
+        settings: Application settings
+        args: Parsed --replay options
+    """
+    from streamlored.replay import format_replay_results, load_chat_log, run_replay
+
+    lines = load_chat_log(Path(args.replay))
+    speeds = [float(speed) for speed in args.replay_speed.split(",") if speed.strip()]
+    span = lines[-1].time if lines else 0.0
+    print(f"Replaying {len(lines)} messages ({span:.0f}s of chat) at {', '.join(f'{s:g}x' for s in speeds)}...")
+
+    # Per-message INFO logs would drown the report and slow the replay
+    logging.getLogger("streamlored").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = await run_replay(
+        settings,
+        lines,
+        speeds,
+        stale_after=args.replay_stale_after,
+        generate_latency=args.fake_generate_latency,
+        embed_latency=args.fake_embed_latency,
+        parallel=args.fake_parallel,
+        max_queue=args.fake_max_queue,
+    )
+
+    started = datetime.now()
+    report = {
+        "timestamp": started.isoformat(timespec="seconds"),
+        "config": {
+            "chat_log": args.replay,
+            "stale_after_s": args.replay_stale_after,
+            "fake_generate_latency_s": args.fake_generate_latency,
+            "fake_embed_latency_s": args.fake_embed_latency,
+            "fake_parallel": args.fake_parallel,
+            "fake_max_queue": args.fake_max_queue,
+            "auto_respond_batch_window": settings.auto_respond_batch_window,
+            "auto_respond_batch_size": settings.auto_respond_batch_size,
+            "kb_store": settings.kb_store,
+            "kb_retrieval": settings.kb_retrieval,
+        },
+        "runs": results,
+    }
+    output_path = Path(args.replay_output or Path("data") / "benchmarks" / f"replay-{started:%Y%m%d-%H%M%S}.json")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(format_replay_results(results, args.replay_stale_after))
+    print(f"Results written to {output_path}")
+
+
 def run_twitch_bot(settings: Settings) -> None:
     """Run the Twitch bot.
 
@@ -374,7 +607,7 @@ def run_twitch_bot(settings: Settings) -> None:
     from streamlored.plugins.livesplit_plugin import LiveSplitPlugin
 
     logger.info("Starting StreamLored Twitch Bot...")
-    logger.info(f"Channel: {settings.twitch_channel}")
+    logger.info(f"Channels: {', '.join(settings.channel_names)}")
 
     # Create and configure bot
     bot = TwitchBot(settings)
@@ -407,6 +640,12 @@ Examples:
   streamlored                    Start the Twitch bot
   streamlored --ingest docs/     Ingest documents into knowledge base
   streamlored --local-chat       Start local chat REPL (no Twitch)
+  streamlored --worker           Run an inference worker for INFERENCE_MODE=queue
+  streamlored --bench-quantization
+                                 Compare KB vector precisions (memory/speed/recall)
+  streamlored --bench-retrieval  Score KB recall@k, MRR and latency on labelled questions
+  streamlored --replay data/chat.log --replay-speed 1,10,50
+                                 Load-test the bot with a recorded chat log (no Twitch/GPU)
         """,
     )
     parser.add_argument(
@@ -420,6 +659,92 @@ Examples:
         help="Start local interactive chat (no Twitch connection)",
     )
 
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run an inference worker that answers jobs queued by the bot",
+    )
+
+    parser.add_argument(
+        "--bench-quantization",
+        action="store_true",
+        help="Benchmark float32/float16/int8 KB vectors on the ingested knowledge base",
+    )
+
+    parser.add_argument(
+        "--bench-retrieval",
+        nargs="?",
+        const="benchmarks/retrieval_questions.jsonl",
+        metavar="QUESTIONS",
+        help="Benchmark KB retrieval quality and latency on a labelled question set "
+             "(default: benchmarks/retrieval_questions.jsonl)",
+    )
+    parser.add_argument(
+        "--bench-embedder",
+        choices=["hashing", "ollama"],
+        default="hashing",
+        help="Embeddings for --bench-retrieval: offline hashing stand-in or cached Ollama (default: hashing)",
+    )
+    parser.add_argument(
+        "--bench-output",
+        metavar="FILE",
+        help="Where --bench-retrieval writes its JSON results (default: data/benchmarks/retrieval-<time>.json)",
+    )
+
+    replay = parser.add_argument_group("chat replay (load testing)")
+    replay.add_argument(
+        "--replay",
+        metavar="CHATLOG",
+        help="Replay a chat log (JSON Lines or \"[HH:MM:SS] nick: message\" lines) through the bot "
+             "against a fake Ollama server",
+    )
+    replay.add_argument(
+        "--replay-speed",
+        default="1",
+        metavar="SPEEDS",
+        help="Comma-separated pace multipliers, one run each (default: 1)",
+    )
+    replay.add_argument(
+        "--replay-stale-after",
+        type=float,
+        default=15.0,
+        metavar="SECONDS",
+        help="Replies slower than this count as stale (default: 15)",
+    )
+    replay.add_argument(
+        "--replay-output",
+        metavar="FILE",
+        help="Where --replay writes its JSON results (default: data/benchmarks/replay-<time>.json)",
+    )
+    replay.add_argument(
+        "--fake-generate-latency",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Mean seconds the fake server takes per generation (default: 2.0)",
+    )
+    replay.add_argument(
+        "--fake-embed-latency",
+        type=float,
+        default=0.05,
+        metavar="SECONDS",
+        help="Mean seconds the fake server takes per embedding request (default: 0.05)",
+    )
+    replay.add_argument(
+        "--fake-parallel",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Generations the fake server runs at once, like OLLAMA_NUM_PARALLEL (default: 1)",
+    )
+    replay.add_argument(
+        "--fake-max-queue",
+        type=int,
+        default=512,
+        metavar="N",
+        help="Generations the fake server queues before answering 503, like OLLAMA_MAX_QUEUE (default: 512)",
+    )
+
     args = parser.parse_args()
 
     try:
@@ -430,9 +755,18 @@ Examples:
         if args.ingest:
             # Ingest mode
             asyncio.run(run_ingest(settings, args.ingest))
+        elif args.bench_quantization:
+            run_bench_quantization(settings)
+        elif args.replay:
+            asyncio.run(run_chat_replay(settings, args))
+        elif args.bench_retrieval:
+            asyncio.run(run_bench_retrieval(settings, args.bench_retrieval, args.bench_embedder, args.bench_output))
         elif args.local_chat or settings.run_mode == "local-chat":
             # Local chat mode
             asyncio.run(run_local_chat(settings))
+        elif args.worker or settings.run_mode == "worker":
+            # Inference worker mode
+            asyncio.run(run_worker(settings))
         elif settings.run_mode == "bot" or not args.local_chat:
             # Twitch bot mode (default)
             run_twitch_bot(settings)
@@ -0,0 +1,417 @@
+"""Prometheus-style metrics for the bot process.
+
+Counters, gauges and histograms live in process memory and are rendered in
+the Prometheus text exposition format by a small HTTP server (METRICS_PORT).
+Updating a metric is a dict lookup and an addition, cheap enough for the
+message path; anything that needs a query (queue depths, cache sizes) is a
+gauge function read only when the endpoint is scraped. Metrics are updated
+from the event loop only, so they take no locks.
+
+Unlike tracing, which follows single requests, metrics are aggregates meant
+for dashboards and alerts.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets in seconds, from a LiveSplit round trip to a cold generation
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# KB similarity buckets; 0.65 is the auto-response threshold (AUTO_RESPOND_MIN_SCORE)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.65, 0.7, 0.8, 0.9, 1.0)
+
+# Event loop lag buckets in seconds
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Seconds between event loop lag measurements
+LOOP_LAG_INTERVAL = 0.5
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way Prometheus expects."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Escape a label value (backslash, double quote and newline)."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    """Format a label set, e.g. {model="llama3.2",status="ok"}."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base for metrics with optional labels."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        """Create the metric and add it to the registry.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names; values are given to labels() in this order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], "_Metric"] = {}
+        self._init_value()
+        registry.register(self)
+
+    def labels(self, *values: str):
+        """Get the child metric for a set of label values (created on first use).
+
+        Args:
+            *values: One value per label name
+
+        Returns:
+            Child metric to update
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self) -> "_Metric":
+        """Create an unregistered, unlabeled metric of the same kind."""
+        child = object.__new__(type(self))
+        child._init_value()
+        return child
+
+    def _init_value(self) -> None:
+        """Reset the metric's own value."""
+
+    def _samples(self) -> Iterator[tuple[tuple[str, ...], "_Metric"]]:
+        """Label values and metric for every series (just self if unlabeled)."""
+        if self.labelnames:
+            yield from self._children.items()
+        else:
+            yield (), self
+
+    def render(self) -> list[str]:
+        """Exposition lines for this metric, including HELP and TYPE."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for values, metric in self._samples():
+            lines.extend(metric._render_series(self.name, self.labelnames, values))
+        return lines
+
+    def _render_series(self, name: str, labelnames: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        """Exposition lines for one series."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _init_value(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add to the count.
+
+        Args:
+            amount: Non-negative amount to add
+        """
+        self.value += amount
+
+    def _render_series(self, name: str, labelnames: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly or read from a function at scrape time."""
+
+    type_name = "gauge"
+
+    def _init_value(self) -> None:
+        self.value = 0.0
+        self._function: Callable[[], float | dict[tuple[str, ...], float]] | None = None
+
+    def set(self, value: float) -> None:
+        """Set the current value."""
+        self.value = value
+
+    def set_function(self, function: Callable[[], float | dict[tuple[str, ...], float]] | None) -> None:
+        """Read the gauge from a function whenever metrics are rendered.
+
+        Args:
+            function: Returns the value, or for a labeled gauge a mapping of
+                label values to value (None stops reading it)
+        """
+        self._function = function
+
+    def _samples(self) -> Iterator[tuple[tuple[str, ...], "_Metric"]]:
+        if self._function is None:
+            yield from super()._samples()
+            return
+        try:
+            result = self._function()
+        except Exception as e:
+            logger.debug(f"Error reading gauge {self.name}: {e}")
+            return
+        items = result.items() if isinstance(result, dict) else [((), result)]
+        for values, value in items:
+            sample = self._new_child()
+            sample.value = value
+            yield values, sample
+
+    def _render_series(self, name: str, labelnames: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        """Create the histogram and add it to the registry.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names; values are given to labels() in this order
+            buckets: Upper bounds of the buckets (+Inf is added)
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> "_Metric":
+        child = object.__new__(type(self))
+        child.buckets = self.buckets
+        child._init_value()
+        return child
+
+    def _init_value(self) -> None:
+        # Per-bucket (not cumulative) counts; the last one is +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation.
+
+        Args:
+            value: Observed value (seconds for latencies)
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the seconds spent in the with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def _render_series(self, name: str, labelnames: tuple[str, ...], values: tuple[str, ...]) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            labels = _format_labels(labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics of this process, in registration order."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        """Add a metric (names must be unique)."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of this process
+registry = Registry()
+
+# Chat
+chat_messages = Counter(
+    "streamlored_chat_messages_total", "Chat messages received", ("channel",)
+)
+auto_respond_decisions = Counter(
+    "streamlored_auto_respond_decisions_total",
+    "Auto-response decisions for chat messages, by outcome and reason",
+    ("decision", "reason"),
+)
+
+# Knowledge base
+kb_query_seconds = Histogram(
+    "streamlored_kb_query_seconds", "KB search latency, including query embedding", ("kind",)
+)
+kb_top_score = Histogram(
+    "streamlored_kb_top_score", "Similarity of the best KB match per query", ("kind",), buckets=SCORE_BUCKETS
+)
+
+# Ollama
+ollama_request_seconds = Histogram(
+    "streamlored_ollama_request_seconds", "Ollama request latency", ("endpoint", "model")
+)
+ollama_requests = Counter(
+    "streamlored_ollama_requests_total", "Ollama requests by result", ("endpoint", "model", "status")
+)
+ollama_tokens = Counter(
+    "streamlored_ollama_tokens_total", "Tokens evaluated by Ollama generations", ("model", "type")
+)
+ollama_in_flight = Gauge(
+    "streamlored_ollama_in_flight", "Requests waiting on each Ollama backend", ("backend",)
+)
+embed_cache_lookups = Counter(
+    "streamlored_embed_cache_lookups_total", "Embedding cache lookups by result", ("result",)
+)
+embed_cache_hit_ratio = Gauge(
+    "streamlored_embed_cache_hit_ratio", "Share of embedding cache lookups served from the cache since start"
+)
+
+# Stream integrations
+livesplit_seconds = Histogram(
+    "streamlored_livesplit_rtt_seconds", "LiveSplit Server command round trip", ("command",)
+)
+obs_screenshot_seconds = Histogram(
+    "streamlored_obs_screenshot_seconds", "OBS screenshot round trip"
+)
+
+# Queues and the event loop
+queue_depth = Gauge(
+    "streamlored_queue_depth", "Items waiting in the bot's queues", ("queue",)
+)
+event_loop_lag_seconds = Histogram(
+    "streamlored_event_loop_lag_seconds", "How late the event loop ran a timer", buckets=LAG_BUCKETS
+)
+
+embed_cache_hit_ratio.set_function(
+    lambda: embed_cache_lookups.labels("hit").value
+    / max(1.0, embed_cache_lookups.labels("hit").value + embed_cache_lookups.labels("miss").value)
+)
+
+
+@contextmanager
+def ollama_request(endpoint: str, model: str) -> Iterator[None]:
+    """Time an Ollama request and count it as ok or error.
+
+    Args:
+        endpoint: "chat" or "embed"
+        model: Model the request is for
+    """
+    started = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        ollama_request_seconds.labels(endpoint, model).observe(time.perf_counter() - started)
+        ollama_requests.labels(endpoint, model, status).inc()
+
+
+async def monitor_event_loop_lag(interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Measure how late the event loop wakes a sleeping task, forever.
+
+    A handler that blocks the loop (sync I/O, heavy scoring) delays every
+    other message, and shows up here as lag.
+
+    Args:
+        interval: Seconds between measurements
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag_seconds.observe(max(0.0, loop.time() - started - interval))
+
+
+class MetricsServer:
+    """Minimal HTTP server answering GET /metrics on the bot's event loop."""
+
+    def __init__(self, host: str, port: int) -> None:
+        """Configure the server (call start() to listen).
+
+        Args:
+            host: Interface to bind
+            port: Port to listen on
+        """
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    async def close(self) -> None:
+        """Stop listening."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer one request and close the connection."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5.0)
+            # Headers are not needed; read them so the client sees a clean close
+            while (await asyncio.wait_for(reader.readline(), timeout=5.0)) not in (b"\r\n", b"\n", b""):
+                pass
+
+            method, path = (request_line.decode("latin-1").split(" ") + ["", ""])[:2]
+            if method == "GET" and path.split("?", 1)[0] == "/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, registry.render().encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found, try /metrics\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
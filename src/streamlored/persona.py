@@ -2,6 +2,11 @@
 
 This module centralizes the AI co-host personality to ensure consistent
 voice across all interaction modes (Twitch chat, local testing, etc.).
+
+Prompts are split in two so Ollama can reuse its prompt cache: the system
+prompt is fixed per mode and byte-identical between calls, and everything
+that changes per message (game context, LiveSplit timer, chat history, KB
+results) goes in the user message after it.
 """
 
 from typing import Literal
@@ -9,24 +14,8 @@ from typing import Literal
 PersonalityMode = Literal["generic", "ask", "lore", "local_chat"]
 
 
-def build_system_prompt(
-    mode: PersonalityMode,
-    *,
-    extra_context: str | None = None,
-    game_context: str | None = None,
-) -> str:
-    """Build a system prompt with StreamLored's personality for the given mode.
-
-    Args:
-        mode: The interaction context ("ask", "lore", "local_chat", or "generic")
-        extra_context: Optional RAG context to include for the model
-        game_context: Optional current game/stream context string
-
-    Returns:
-        Complete system prompt string
-    """
-    # Base identity - applies to all modes
-    base_identity = """You are StreamLored, an AI co-host for Twitch streams.
+# Base identity - applies to all modes
+BASE_IDENTITY = """You are StreamLored, an AI co-host for Twitch streams.
 
 Personality:
 - Snarky but never cruel or mean-spirited
@@ -42,56 +31,103 @@ Tone rules:
 - Light "copium" energy is fine, but stay helpful
 - Get to the point immediately - no preamble or lengthy explanations"""
 
-    # Mode-specific instructions
-    mode_instructions = {
-        "generic": """
+# Mode-specific instructions
+MODE_INSTRUCTIONS: dict[str, str] = {
+    "generic": """
 Answer questions directly while staying in character.""",
 
-        "ask": """
+    "ask": """
 This is general Q&A - games, dev stuff, random chat questions.
 Be helpful but feel free to add a playful jab or observation.
 If someone asks something obvious, a little gentle ribbing is fine.""",
 
-        "lore": """
+    "lore": """
 You have access to a knowledge base with specific information.
 Reference it naturally - "from what I've got here..." or "according to my notes..."
 Be confident when the context clearly supports your answer.
 If the context doesn't cover something, say so rather than making stuff up.""",
 
-        "local_chat": """
+    "local_chat": """
 This is a dev console / offline test environment.
 Same energy as regular chat, but you can be slightly more meta.
 Feel free to reference that you're pulling from the knowledge base if relevant.""",
-    }
+}
 
-    # Build the prompt
-    prompt_parts = [base_identity]
-
-    # Add game context if provided
-    if game_context:
-        prompt_parts.append(f"\n{game_context}")
-
-    # Add mode-specific instructions
-    if mode in mode_instructions:
-        prompt_parts.append(mode_instructions[mode])
-
-    # Add extra context if provided (RAG results + chat history)
-    if extra_context:
-        context_instruction = f"""
-Here is background context you may use in your answer:
-
-{extra_context}
+# How to use the per-message context that arrives with the user message
+CONTEXT_GUIDELINES = """
+Messages may start with background context before the chat message itself.
 
 Important context guidelines:
 - If "Recent chat" is provided, use it to understand what the conversation is about. Questions like "is there a remake?" refer to whatever game/topic chat was just discussing.
 - If "Knowledge base" is provided, use it as your source of facts. Reference it naturally - "from what I've got here..."
 - Always prioritize the current game context when interpreting ambiguous questions.
 - Don't mention "the context" or "the provided text" explicitly - just incorporate what's relevant."""
-        prompt_parts.append(context_instruction)
 
+
+def _compile_system_prompt(mode: str) -> str:
+    """Join the identity, mode instructions and context guidelines for a mode."""
+    prompt_parts = [BASE_IDENTITY]
+    if mode in MODE_INSTRUCTIONS:
+        prompt_parts.append(MODE_INSTRUCTIONS[mode])
+    prompt_parts.append(CONTEXT_GUIDELINES)
     return "\n".join(prompt_parts)
 
 
+# System prompts are fixed per mode, so build each one once at import
+_SYSTEM_PROMPTS: dict[str, str] = {mode: _compile_system_prompt(mode) for mode in MODE_INSTRUCTIONS}
+
+
+def build_system_prompt(mode: PersonalityMode) -> str:
+    """Get the static system prompt with StreamLored's personality for a mode.
+
+    The result depends only on the mode, so repeated calls send Ollama the
+    same prefix and it skips re-processing it. Prompts are precompiled; this
+    is a dictionary lookup.
+
+    Args:
+        mode: The interaction context ("ask", "lore", "local_chat", or "generic")
+
+    Returns:
+        Complete system prompt string
+    """
+    prompt = _SYSTEM_PROMPTS.get(mode)
+    if prompt is None:
+        prompt = _SYSTEM_PROMPTS[mode] = _compile_system_prompt(mode)
+    return prompt
+
+
+def build_user_prompt(
+    message: str,
+    *,
+    extra_context: str | None = None,
+    game_context: str | None = None,
+) -> str:
+    """Build the user message: volatile context first, then the chat message.
+
+    Args:
+        message: The chat message or question to answer
+        extra_context: Optional RAG context and chat history
+        game_context: Optional current game/stream context string
+
+    Returns:
+        User message string
+    """
+    context_parts = []
+
+    # Add game context if provided
+    if game_context:
+        context_parts.append(game_context)
+
+    # Add extra context if provided (RAG results + chat history)
+    if extra_context:
+        context_parts.append(f"Here is background context you may use in your answer:\n\n{extra_context}")
+
+    if not context_parts:
+        return message
+
+    return "\n\n".join(context_parts) + f"\n\n---\n\n{message}"
+
+
 def get_persona_description() -> str:
     """Get a short description of StreamLored's personality for documentation.
 
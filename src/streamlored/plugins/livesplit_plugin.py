@@ -6,7 +6,9 @@ from typing import Any
 
 from twitchio.ext import commands
 
+from streamlored import metrics
 from streamlored.plugins import BasePlugin
+from streamlored.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -105,15 +107,16 @@ class LiveSplitPlugin(BasePlugin):
                 return None
 
         try:
-            # LiveSplit Server uses newline-terminated commands
-            self._writer.write(f"{command}\r\n".encode())
-            await self._writer.drain()
-
-            # Read response (terminated by newline)
-            response = await asyncio.wait_for(
-                self._reader.readline(),
-                timeout=5.0
-            )
+            with span("livesplit"), metrics.livesplit_seconds.labels(command).time():
+                # LiveSplit Server uses newline-terminated commands
+                self._writer.write(f"{command}\r\n".encode())
+                await self._writer.drain()
+
+                # Read response (terminated by newline)
+                response = await asyncio.wait_for(
+                    self._reader.readline(),
+                    timeout=5.0
+                )
             return response.decode().strip()
         except Exception as e:
             logger.error(f"LiveSplit command failed: {e}")
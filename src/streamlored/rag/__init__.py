@@ -11,6 +11,22 @@ from abc import ABC, abstractmethod
 from typing import Any
 
 
+def best_score(results: list[dict[str, Any]]) -> float | None:
+    """Highest cosine similarity among query results.
+
+    Hybrid results are ordered by rank fusion, so the first result is not
+    necessarily the closest match; lexical shortcut hits have no cosine.
+
+    Args:
+        results: Results of one query
+
+    Returns:
+        The best "score", or None if no result has one
+    """
+    scores = [result["score"] for result in results if result.get("score") is not None]
+    return max(scores) if scores else None
+
+
 class DocumentStore(ABC):
     """Abstract base class for document storage."""
 
@@ -28,18 +44,48 @@ class DocumentStore(ABC):
         self,
         query: str,
         top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
     ) -> list[dict[str, Any]]:
         """Query the knowledge base for relevant documents.
 
         Args:
             query: The search query
             top_k: Number of results to return
+            filters: Optional metadata filters (field -> accepted value or values)
 
         Returns:
             List of relevant document chunks with scores
         """
         pass
 
+    @abstractmethod
+    async def query_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
+        lexical_shortcut: bool | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Query the knowledge base with several queries at once.
+
+        Implementations embed all queries in one backend call and score them
+        together in one pass over the documents, so batches cost little more
+        than a single query.
+
+        Args:
+            queries: The search queries
+            top_k: Number of results to return per query
+            filters: Optional metadata filters applied to every query
+            lexical_shortcut: Whether short exact-term queries may skip the
+                embedding (None = the store's setting); pass False when every
+                result needs a cosine score
+
+        Returns:
+            One list of relevant document chunks with scores per query, in order.
+            "score" is the cosine similarity, or None for lexical shortcut hits.
+        """
+        pass
+
 
 class EmbeddingProvider(ABC):
     """Abstract base class for embedding generation."""
@@ -56,6 +102,20 @@ class EmbeddingProvider(ABC):
         """
         pass
 
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for documents being ingested.
+
+        Providers with a query cache override this to keep document texts,
+        which are rarely embedded twice, from evicting recent queries.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        return await self.embed(texts)
+
 
 # Placeholder implementations for future development
 class PlaceholderDocumentStore(DocumentStore):
@@ -68,17 +128,30 @@ class PlaceholderDocumentStore(DocumentStore):
         self,
         query: str,
         top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
     ) -> list[dict[str, Any]]:
         raise NotImplementedError("RAG query not yet implemented")
 
+    async def query_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
+        lexical_shortcut: bool | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        raise NotImplementedError("RAG query not yet implemented")
+
 
 from streamlored.rag.ollama_embeddings import OllamaEmbeddingProvider
 from streamlored.rag.json_store import JsonDocumentStore
+from streamlored.rag.sqlite_store import SQLiteDocumentStore
 
 __all__ = [
+    "best_score",
     "DocumentStore",
     "EmbeddingProvider",
     "PlaceholderDocumentStore",
     "OllamaEmbeddingProvider",
     "JsonDocumentStore",
+    "SQLiteDocumentStore",
 ]
@@ -0,0 +1,372 @@
+"""Benchmarks for knowledge base retrieval."""
+
+import hashlib
+import heapq
+import json
+import math
+import random
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable
+
+from streamlored.rag import DocumentStore, EmbeddingProvider
+from streamlored.rag.ingest import find_documents, ingest_files
+from streamlored.rag.lexical import tokenize
+from streamlored.rag.vectors import VectorIndex
+from streamlored.tracing import percentile
+
+# Precision/rescore combinations compared by the quantization benchmark
+QUANTIZATION_VARIANTS = [
+    ("float32", False),
+    ("float16", False),
+    ("float16", True),
+    ("int8", False),
+    ("int8", True),
+]
+
+
+def _noisy_queries(vectors: list[list[float]], count: int, noise: float, rng: random.Random) -> list[list[float]]:
+    """Make unit query vectors near randomly chosen KB vectors."""
+    queries = []
+    for _ in range(count):
+        base = rng.choice(vectors)
+        scale = noise * (sum(v * v for v in base) ** 0.5) / (len(base) ** 0.5)
+        vec = [v + rng.gauss(0.0, scale) for v in base]
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        queries.append([v / norm for v in vec])
+    return queries
+
+
+def run_quantization_benchmark(
+    embeddings: list[list[float]],
+    queries: int = 200,
+    top_k: int = 5,
+    noise: float = 0.5,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Compare memory, speed and recall of embedding precisions on a KB.
+
+    Queries are KB embeddings with Gaussian noise added, so no embedding
+    server is needed. Recall@k is measured against exact float32 search.
+
+    Args:
+        embeddings: Unit-length KB embeddings (see JsonDocumentStore.embeddings)
+        queries: Number of queries to run
+        top_k: Results per query
+        noise: Noise standard deviation relative to the per-dimension magnitude
+        seed: Random seed
+
+    Returns:
+        One result dict per variant
+    """
+    if not embeddings:
+        raise ValueError("No embeddings to benchmark")
+
+    rng = random.Random(seed)
+    query_vectors = _noisy_queries(embeddings, queries, noise, rng)
+    dim = len(embeddings[0])
+    doc_range = range(len(embeddings))
+
+    # Lists of Python floats, as the store used to hold them
+    list_bytes = len(embeddings) * (sys.getsizeof([0.0] * dim) + dim * sys.getsizeof(1.0))
+
+    results = []
+    truth: list[list[int]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for precision, rescore in QUANTIZATION_VARIANTS:
+            started = time.perf_counter()
+            index = VectorIndex(precision, rescore)
+            for vec in embeddings:
+                index.add(vec)
+            index.attach_sidecar(Path(tmp))
+            build_s = time.perf_counter() - started
+
+            latencies = []
+            found: list[list[int]] = []
+            for query in query_vectors:
+                started = time.perf_counter()
+                row = index.scores([query], doc_range)[0]
+                found.append(heapq.nlargest(top_k, doc_range, key=row.__getitem__))
+                latencies.append((time.perf_counter() - started) * 1000)
+            index.close()
+
+            if not truth:
+                truth = found
+            recall = statistics.mean(
+                len(set(hit) & set(expected)) / len(expected)
+                for hit, expected in zip(found, truth)
+            )
+
+            results.append({
+                "precision": precision,
+                "rescore": rescore,
+                "documents": len(embeddings),
+                "dimensions": dim,
+                "memory_bytes": index.nbytes,
+                "list_memory_bytes": list_bytes,
+                "build_s": build_s,
+                "latency_ms_mean": statistics.mean(latencies),
+                "latency_ms_p95": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0],
+                f"recall_at_{top_k}": recall,
+            })
+    return results
+
+
+def format_quantization_results(results: list[dict[str, Any]]) -> str:
+    """Render quantization benchmark results as a text table.
+
+    Args:
+        results: Output of run_quantization_benchmark
+
+    Returns:
+        Table text
+    """
+    if not results:
+        return ""
+    first = results[0]
+    recall_key = next(key for key in first if key.startswith("recall_at_"))
+    lines = [
+        f"{first['documents']} vectors x {first['dimensions']} dims "
+        f"(as Python float lists: {first['list_memory_bytes'] / 1e6:.1f} MB)",
+        "",
+        f"{'precision':<10} {'rescore':<8} {'memory MB':>10} {'mean ms':>8} {'p95 ms':>8} {recall_key:>12}",
+    ]
+    for result in results:
+        lines.append(
+            f"{result['precision']:<10} {'yes' if result['rescore'] else 'no':<8} "
+            f"{result['memory_bytes'] / 1e6:>10.2f} {result['latency_ms_mean']:>8.2f} "
+            f"{result['latency_ms_p95']:>8.2f} {result[recall_key]:>12.3f}"
+        )
+    return "\n".join(lines)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic stand-in embedder: hashed bag of words and word pairs.
+
+    Needs no model server and gives the same vectors on every run, so the
+    retrieval benchmark can compare chunking and scoring changes offline.
+    It only captures word overlap, so its recall is not the real model's.
+    """
+
+    def __init__(self, dim: int = 384) -> None:
+        """Create the embedder.
+
+        Args:
+            dim: Embedding dimensions
+        """
+        self.model = f"hashing-{dim}"
+        self.dim = dim
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> list[float]:
+        """Hash each term and adjacent term pair into a signed bucket."""
+        vec = [0.0] * self.dim
+        terms = tokenize(text)
+        for feature in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if h >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    async def close(self) -> None:
+        pass
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """Keeps another provider's embeddings in a SQLite file across runs.
+
+    Re-running the retrieval benchmark after a chunking or scoring change
+    then only embeds the chunks that changed.
+    """
+
+    def __init__(self, provider: Any, path: Path) -> None:
+        """Wrap a provider.
+
+        Args:
+            provider: Embedding provider with a "model" attribute
+            path: Cache database file
+        """
+        self.provider = provider
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.provider.model}\0{text}".encode("utf-8")).hexdigest()
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(text) for text in texts]
+        found: dict[str, list[float]] = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            found.update((key, array("f", vector).tolist()) for key, vector in rows)
+
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+        if missing:
+            embeddings = await self.provider.embed(missing)
+            with self._conn:
+                for text, embedding in zip(missing, embeddings):
+                    key = self._key(text)
+                    found[key] = embedding
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        (key, array("f", embedding).tobytes()),
+                    )
+        return [found[key] for key in keys]
+
+    async def close(self) -> None:
+        self._conn.close()
+        await self.provider.close()
+
+
+def load_questions(path: Path) -> list[dict[str, Any]]:
+    """Read a labelled question set.
+
+    Each line is a JSON object: {"question": "...", "relevant": [{"path":
+    "series/file.md", "section": "Section Title"}, ...]}. A result is relevant
+    if it comes from one of the listed files and, where a section is given,
+    that section (or a subsection of it).
+
+    Args:
+        path: JSON Lines file
+
+    Returns:
+        Questions with their relevant sections
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                questions.append(json.loads(line))
+    return questions
+
+
+def _matches(metadata: dict[str, Any], label: dict[str, str]) -> bool:
+    """Whether a chunk belongs to a labelled file or section."""
+    if metadata.get("path") != label["path"]:
+        return False
+    section = label.get("section")
+    if not section:
+        return True
+    return section == metadata.get("section_title") or section in metadata.get("header_path", "").split(" > ")
+
+
+async def run_retrieval_benchmark(
+    questions: list[dict[str, Any]],
+    docs_path: Path,
+    open_store: Callable[[str], DocumentStore],
+    top_k: int = 5,
+    **ingest_options: Any,
+) -> dict[str, Any]:
+    """Ingest a docs folder into a scratch KB and score retrieval on labelled questions.
+
+    Args:
+        questions: Output of load_questions
+        docs_path: Docs folder to ingest
+        open_store: Opens a document store at a given KB path
+        top_k: Results per question
+        **ingest_options: Passed to ingest_files (workers, max_tokens, ...)
+
+    Returns:
+        Machine-readable results: quality (recall@k, MRR), query latency
+        percentiles, ingest throughput and peak memory
+    """
+    if not questions:
+        raise ValueError("No questions to benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_store(str(Path(tmp) / "knowledge_base"))
+        try:
+            files = find_documents(docs_path)
+            stats = await ingest_files(store, files, docs_path, **ingest_options)
+
+            latencies = []
+            recalls = []
+            reciprocal_ranks = []
+            misses = []
+            for item in questions:
+                labels = item["relevant"]
+                started = time.perf_counter()
+                results = await store.query_knowledge_base(item["question"], top_k=top_k)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+                found = [any(_matches(r["metadata"], label) for r in results) for label in labels]
+                recalls.append(sum(found) / len(labels))
+                rank = next(
+                    (n for n, r in enumerate(results, 1) if any(_matches(r["metadata"], label) for label in labels)),
+                    None,
+                )
+                reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+                if rank is None:
+                    misses.append(item["question"])
+
+            # The same questions as one batch, to measure throughput
+            started = time.perf_counter()
+            await store.query_many([item["question"] for item in questions], top_k=top_k)
+            batch_s = time.perf_counter() - started
+        finally:
+            close = getattr(store, "close", None)
+            if close:
+                close()
+
+    return {
+        "questions": len(questions),
+        "top_k": top_k,
+        f"recall_at_{top_k}": statistics.mean(recalls),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "latency_ms": {
+            "mean": statistics.mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+        "batch_queries_per_s": len(questions) / batch_s if batch_s else 0.0,
+        "ingest": {
+            "files": stats.files,
+            "chunks": stats.chunks,
+            "near_duplicates": len(stats.duplicates),
+            "seconds": stats.seconds,
+            "chunks_per_s": stats.chunks / stats.seconds if stats.seconds else 0.0,
+        },
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "misses": misses,
+    }
+
+
+def format_retrieval_results(results: dict[str, Any]) -> str:
+    """Render retrieval benchmark results as text.
+
+    Args:
+        results: Output of run_retrieval_benchmark
+
+    Returns:
+        Summary text
+    """
+    top_k = results["top_k"]
+    latency = results["latency_ms"]
+    ingest = results["ingest"]
+    lines = [
+        f"{results['questions']} questions, top {top_k}",
+        f"recall@{top_k} {results[f'recall_at_{top_k}']:.3f}   MRR {results['mrr']:.3f}",
+        f"latency ms: p50 {latency['p50']:.2f}  p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}"
+        f"   batch {results['batch_queries_per_s']:.1f} queries/s",
+        f"ingest: {ingest['chunks']} chunks from {ingest['files']} files in {ingest['seconds']:.1f}s"
+        f" ({ingest['chunks_per_s']:.1f} chunks/s)",
+        f"peak RSS {results['peak_rss_mb']:.1f} MB",
+    ]
+    if results["misses"]:
+        lines.append(f"no relevant result for {len(results['misses'])} questions:")
+        lines.extend(f"  {question}" for question in results["misses"])
+    return "\n".join(lines)
@@ -1,13 +1,52 @@
-"""Markdown-aware document chunking for RAG ingestion."""
+"""Markdown-aware document chunking for RAG ingestion.
 
+The chunkers read lines one at a time and yield chunks as soon as they are
+complete, so multi-MB wiki exports and transcripts are chunked without
+holding the whole file (or large intermediate strings) in memory.
+
+Chunks are sized by characters by default. With max_tokens they are instead
+filled up to an estimated token count, split at line, sentence and word
+boundaries as needed, optionally overlap, and start with their header path.
+"""
+
+import io
+import itertools
 import re
-from typing import Any
+from typing import Any, Iterable, Iterator
+
+from streamlored.rag.packing import CHARS_PER_TOKEN
+
+# Markdown ATX header line: "# Title" to "###### Title"
+HEADER_PATTERN = re.compile(r"#{1,6}\s+.+$")
+
+# A line of just "#"s: the header continues over blank lines to the next
+# non-blank line, which becomes its title ("###\n\nGrab the key" -> "Grab the key")
+BARE_HEADER_PATTERN = re.compile(r"#{1,6}\s*$")
+
+# Opening or closing fence of a code block: ``` or ~~~ (up to 3 spaces indented)
+FENCE_PATTERN = re.compile(r" {0,3}(`{3,}|~{3,})")
+
+# Paragraphs (or unbroken text such as transcripts) longer than this many times
+# max_chars are cut at a line break, which bounds memory for any input
+MAX_PARAGRAPH_FACTOR = 8
+
+# Where over-long lines are split in token mode
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+# Joins header titles in the "header_path" metadata and token-mode chunk prefix
+HEADER_PATH_SEPARATOR = " > "
+
+# A token-mode chunk is cut at a paragraph break rather than mid-paragraph
+# once it is at least this full
+MIN_FILL_AT_PARAGRAPH_BREAK = 0.5
 
 
 def chunk_markdown(
     content: str,
     source: str,
     max_chars: int = 1000,
+    max_tokens: int = 0,
+    overlap_tokens: int = 0,
 ) -> list[dict[str, Any]]:
     """Split markdown content into smaller, semantically coherent chunks.
 
@@ -17,150 +56,460 @@ def chunk_markdown(
         content: Full markdown text
         source: File path or logical name for metadata
         max_chars: Soft character limit per chunk
+        max_tokens: Size chunks by estimated tokens instead (0 = use max_chars)
+        overlap_tokens: Estimated tokens repeated from the previous chunk (token mode)
 
     Returns:
         List of document dicts with 'content' and 'metadata' keys
     """
-    # Split content into sections based on markdown headers
-    sections = _split_by_headers(content)
+    return _with_totals(
+        iter_markdown_chunks(io.StringIO(content), source, max_chars, max_tokens, overlap_tokens)
+    )
 
-    chunks = []
-    chunk_index = 0
 
-    for section_title, section_content in sections:
-        # Get the full section text (title + content)
-        if section_title:
-            full_section = f"{section_title}\n{section_content}".strip()
-        else:
-            full_section = section_content.strip()
+def chunk_plain_text(
+    content: str,
+    source: str,
+    max_chars: int = 1000,
+    max_tokens: int = 0,
+    overlap_tokens: int = 0,
+) -> list[dict[str, Any]]:
+    """Chunk plain text files by paragraphs.
 
-        if not full_section:
-            continue
+    Args:
+        content: Full text content
+        source: File path or logical name
+        max_chars: Soft character limit per chunk
+        max_tokens: Size chunks by estimated tokens instead (0 = use max_chars)
+        overlap_tokens: Estimated tokens repeated from the previous chunk (token mode)
 
-        # If section is small enough, keep it as one chunk
-        if len(full_section) <= max_chars:
-            chunks.append({
-                "content": full_section,
-                "metadata": {
-                    "source": source,
-                    "section_title": _extract_title_text(section_title),
-                    "chunk_index": chunk_index,
-                },
-            })
-            chunk_index += 1
-        else:
-            # Split large sections by paragraphs
-            section_chunks = _split_by_paragraphs(
-                full_section,
-                section_title,
-                max_chars,
-            )
-            for chunk_content in section_chunks:
-                chunks.append({
-                    "content": chunk_content,
-                    "metadata": {
-                        "source": source,
-                        "section_title": _extract_title_text(section_title),
-                        "chunk_index": chunk_index,
-                    },
-                })
-                chunk_index += 1
+    Returns:
+        List of document dicts
+    """
+    return _with_totals(
+        iter_text_chunks(io.StringIO(content), source, max_chars, max_tokens, overlap_tokens)
+    )
 
-    # Add total_chunks to all metadata
-    total_chunks = len(chunks)
-    for chunk in chunks:
-        chunk["metadata"]["total_chunks"] = total_chunks
 
+def _with_totals(chunks: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Collect chunks and add total_chunks to their metadata."""
+    chunks = list(chunks)
+    for chunk in chunks:
+        chunk["metadata"]["total_chunks"] = len(chunks)
     return chunks
 
 
-def _split_by_headers(content: str) -> list[tuple[str, str]]:
-    """Split markdown content by headers (# ## ###).
+def iter_markdown_chunks(
+    lines: Iterable[str],
+    source: str,
+    max_chars: int = 1000,
+    max_tokens: int = 0,
+    overlap_tokens: int = 0,
+) -> Iterator[dict[str, Any]]:
+    """Chunk markdown lazily, in a single pass over its lines.
+
+    A section (a header and the text up to the next header) that fits in
+    max_chars becomes one chunk as written. Longer sections are packed
+    paragraph by paragraph, repeating the section title on each follow-up
+    chunk. Fenced code blocks are never split at blank lines, and "#" lines
+    inside them are not headers.
+
+    With max_tokens, every chunk of a section instead starts with its header
+    path ("[Game > Route > Boss]") and is filled to about max_tokens estimated
+    tokens, the last overlap_tokens of each chunk starting the next one.
+
+    Chunks carry "source", "section_title", "header_path" and "chunk_index"
+    metadata; use chunk_markdown if "total_chunks" is needed too.
 
     Args:
-        content: Full markdown text
+        lines: Lines of markdown, e.g. an open text file
+        source: File path or logical name for metadata
+        max_chars: Soft character limit per chunk
+        max_tokens: Size chunks by estimated tokens instead (0 = use max_chars)
+        overlap_tokens: Estimated tokens repeated from the previous chunk (token mode)
 
-    Returns:
-        List of (header_line, section_content) tuples.
-        First section may have empty header if content starts without one.
+    Yields:
+        Document dicts with 'content' and 'metadata' keys
     """
-    # Pattern matches lines starting with 1-6 # characters followed by space
-    header_pattern = re.compile(r'^(#{1,6}\s+.+)$', re.MULTILINE)
 
-    sections = []
-    last_end = 0
-    last_header = ""
+    def new_section(header: str) -> "_Section | _TokenSection":
+        if max_tokens:
+            return _TokenSection(header_path, max_tokens, overlap_tokens)
+        return _Section(header, max_chars)
 
-    for match in header_pattern.finditer(content):
-        # Get content before this header
-        if match.start() > last_end:
-            section_content = content[last_end:match.start()].strip()
-            if section_content or last_header:
-                sections.append((last_header, section_content))
+    # (level, title) of the enclosing headers, outermost first
+    headers: list[tuple[int, str]] = []
+    header_path: list[str] = []
+    section = new_section("")
+    chunk_index = 0
+    # Lines of a bare "#" header still waiting for its title line
+    bare_header: list[str] | None = None
+
+    # None marks the end of the file, where a pending bare header is settled
+    for line in itertools.chain((line.rstrip("\n") for line in lines), [None]):
+        if line is None:
+            if bare_header is None:
+                break
+            if not _ends_bare_header(bare_header):
+                # Nothing after the "#" that could be a title: it is just text
+                for text_line in bare_header:
+                    for text in section.add_line(text_line):
+                        yield _chunk(text, source, section.title, chunk_index, header_path)
+                        chunk_index += 1
+                break
+            header = "\n".join(bare_header)
+        elif bare_header is not None:
+            bare_header.append(line)
+            if not line.strip():
+                continue
+            header, bare_header = "\n".join(bare_header), None
+        elif section.fence is None and BARE_HEADER_PATTERN.match(line):
+            bare_header = [line]
+            continue
+        elif section.fence is None and HEADER_PATTERN.match(line):
+            header = line
+        else:
+            for text in section.add_line(line):
+                yield _chunk(text, source, section.title, chunk_index, header_path)
+                chunk_index += 1
+            continue
 
-        last_header = match.group(1)
-        last_end = match.end()
+        for text in section.finish():
+            yield _chunk(text, source, section.title, chunk_index, header_path)
+            chunk_index += 1
 
-    # Get remaining content after last header
-    remaining = content[last_end:].strip()
-    if remaining or last_header:
-        sections.append((last_header, remaining))
+        level = len(header) - len(header.lstrip("#"))
+        while headers and headers[-1][0] >= level:
+            headers.pop()
+        headers.append((level, _extract_title_text(header)))
+        header_path = [title for _, title in headers if title]
+        section = new_section(header)
 
-    # Handle case where content has no headers
-    if not sections and content.strip():
-        sections.append(("", content.strip()))
+    for text in section.finish():
+        yield _chunk(text, source, section.title, chunk_index, header_path)
+        chunk_index += 1
 
-    return sections
 
+def iter_text_chunks(
+    lines: Iterable[str],
+    source: str,
+    max_chars: int = 1000,
+    max_tokens: int = 0,
+    overlap_tokens: int = 0,
+) -> Iterator[dict[str, Any]]:
+    """Chunk plain text lazily by paragraphs.
+
+    Args:
+        lines: Lines of text, e.g. an open text file
+        source: File path or logical name
+        max_chars: Soft character limit per chunk
+        max_tokens: Size chunks by estimated tokens instead (0 = use max_chars)
+        overlap_tokens: Estimated tokens repeated from the previous chunk (token mode)
 
-def _split_by_paragraphs(
+    Yields:
+        Document dicts with 'content' and 'metadata' keys
+    """
+    if max_tokens:
+        section = _TokenSection([], max_tokens, overlap_tokens, markdown=False)
+    else:
+        section = _Section("", max_chars, markdown=False)
+    chunk_index = 0
+    for line in lines:
+        for text in section.add_line(line.rstrip("\n")):
+            yield _chunk(text, source, "", chunk_index)
+            chunk_index += 1
+    for text in section.finish():
+        yield _chunk(text, source, "", chunk_index)
+        chunk_index += 1
+
+
+def _chunk(
     content: str,
+    source: str,
     section_title: str,
-    max_chars: int,
-) -> list[str]:
-    """Split content by paragraphs to stay under max_chars.
+    chunk_index: int,
+    header_path: list[str] | None = None,
+) -> dict[str, Any]:
+    """Build a chunk dict."""
+    return {
+        "content": content,
+        "metadata": {
+            "source": source,
+            "section_title": section_title,
+            "header_path": HEADER_PATH_SEPARATOR.join(header_path or []),
+            "chunk_index": chunk_index,
+        },
+    }
+
+
+class _Section:
+    """Streaming state for one section: its raw text while it may fit in one
+    chunk, the paragraph being read, and the chunk being packed."""
+
+    def __init__(self, header: str, max_chars: int, markdown: bool = True) -> None:
+        self.header = header
+        self.title = _extract_title_text(header)
+        self.max_chars = max_chars
+        self.markdown = markdown
+        # Open code fence marker (e.g. "```"), or None outside code blocks
+        self.fence: str | None = None
+        # Raw lines, kept until the section is known not to fit in one chunk
+        self.raw: list[str] | None = [] if markdown else None
+        # Length of the stripped section so far, plus the raw lines' trailing whitespace
+        self.raw_chars = len(header.strip()) + 1 if header else 0
+        # Chunk being packed from paragraphs
+        self.current = ""
+        # Lines of the current paragraph; the header's (last) line belongs to the first one
+        header_lines = header.split("\n") if header else []
+        self.paragraph: list[str] = header_lines
+        if len(header_lines) > 2:
+            # A bare "#" header line followed by blank lines is a paragraph of its own
+            self.current = header_lines[0].strip()
+            self.paragraph = header_lines[-1:]
+        self.paragraph_chars = sum(len(line) + 1 for line in self.paragraph)
+        self.paragraph_has_text = False
+        self.has_body = False
+
+    def add_line(self, line: str) -> Iterator[str]:
+        """Consume one line, yielding any chunks it completes."""
+        # Leading blank lines are stripped anyway
+        if self.raw is not None and (self.raw or line.strip()):
+            if not self.raw:
+                self.raw_chars -= len(line) - len(line.lstrip())
+            self.raw.append(line)
+            # Trailing whitespace is stripped as well, so only lines with text can overflow
+            if line.strip() and self.raw_chars + len(line.rstrip()) > self.max_chars:
+                self.raw = None
+            else:
+                self.raw_chars += len(line) + 1
+                if self.raw_chars > self.max_chars * MAX_PARAGRAPH_FACTOR:
+                    self.raw = None
+
+        if self.markdown:
+            self.fence = _track_fence(self.fence, line)
+
+        if not line.strip() and self.fence is None:
+            # Blank lines right after the header don't end its paragraph
+            if self.paragraph_has_text:
+                yield from self._end_paragraph()
+            return
+
+        if not self.has_body:
+            # The section text is stripped, so its first line joins the header unindented
+            line = line.lstrip()
+            self.has_body = True
+        self.paragraph.append(line)
+        self.paragraph_chars += len(line) + 1
+        self.paragraph_has_text = True
+        if self.paragraph_chars > self.max_chars * MAX_PARAGRAPH_FACTOR:
+            yield from self._end_paragraph()
+
+    def finish(self) -> Iterator[str]:
+        """Yield the section's remaining chunks."""
+        if self.raw is not None:
+            content = "\n".join(self.raw).strip()
+            full = f"{self.header}\n{content}".strip() if self.header else content
+            if len(full) <= self.max_chars:
+                # Fits: keep the section exactly as written
+                if full:
+                    yield full
+                return
+
+        yield from self._end_paragraph()
+        if self.current:
+            yield self.current
+
+    def _end_paragraph(self) -> Iterator[str]:
+        """Pack the finished paragraph into the current chunk."""
+        para = "\n".join(self.paragraph).strip()
+        self.paragraph = []
+        self.paragraph_chars = 0
+        self.paragraph_has_text = False
+        if not para:
+            return
+
+        if self.current and len(self.current) + len(para) + 2 > self.max_chars:
+            yield self.current
+            # Start the next chunk with the section title for context
+            self.current = f"[{self.title}]\n{para}" if self.title else para
+        elif self.current:
+            self.current += "\n\n" + para
+        else:
+            self.current = para
+
+
+class _TokenSection:
+    """Streaming state for one section in token mode: the paragraph being read
+    and the pieces (lines, sentences or words) of the chunk being filled."""
+
+    def __init__(
+        self,
+        header_path: list[str],
+        max_tokens: int,
+        overlap_tokens: int,
+        markdown: bool = True,
+    ) -> None:
+        self.title = header_path[-1] if header_path else ""
+        self.prefix = f"[{HEADER_PATH_SEPARATOR.join(header_path)}]\n" if header_path else ""
+        self.markdown = markdown
+        self.fence: str | None = None
+        # Character budgets for the chunk body, from the estimated token counts
+        self.max_chars = max(max_tokens * CHARS_PER_TOKEN - len(self.prefix), CHARS_PER_TOKEN)
+        self.overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, self.max_chars // 2)
+        self.paragraph: list[str] = []
+        self.paragraph_chars = 0
+        # (separator before it, text) for each piece of the current chunk
+        self.pieces: list[tuple[str, str]] = []
+        self.chars = 0
+        # Pieces at the start of the current chunk repeated from the previous one
+        self.overlap = 0
+
+    def add_line(self, line: str) -> Iterator[str]:
+        """Consume one line, yielding any chunks it completes."""
+        if self.markdown:
+            self.fence = _track_fence(self.fence, line)
+
+        if not line.strip() and self.fence is None:
+            yield from self._end_paragraph()
+            return
+
+        if self.paragraph or line.strip():
+            self.paragraph.append(line)
+            self.paragraph_chars += len(line) + 1
+        if self.paragraph_chars > self.max_chars * MAX_PARAGRAPH_FACTOR:
+            yield from self._end_paragraph()
+
+    def finish(self) -> Iterator[str]:
+        """Yield the section's remaining chunks."""
+        yield from self._end_paragraph()
+        if len(self.pieces) > self.overlap:
+            yield self._text()
+
+    def _end_paragraph(self) -> Iterator[str]:
+        """Add the finished paragraph, whole if it fits, else line by line."""
+        para = "\n".join(self.paragraph).strip("\n")
+        self.paragraph = []
+        self.paragraph_chars = 0
+        if not para.strip():
+            return
+
+        if len(para) <= self.max_chars:
+            fits = self.chars + 2 + len(para) <= self.max_chars
+            # Start a new chunk at the paragraph break rather than splitting it
+            if fits or self.chars >= self.max_chars * MIN_FILL_AT_PARAGRAPH_BREAK:
+                yield from self._add("\n\n", para)
+                return
+
+        separator = "\n\n"
+        for line in para.split("\n"):
+            for piece, piece_separator in self._split(line, "\n"):
+                yield from self._add(separator, piece)
+                separator = piece_separator
+
+    def _split(self, line: str, separator: str) -> Iterator[tuple[str, str]]:
+        """Split a line into pieces that fit a chunk: sentences, then words.
+
+        Yields:
+            (piece, separator before the next piece) pairs
+        """
+        if len(line) <= self.max_chars:
+            yield line, separator
+            return
+        sentences = SENTENCE_BREAK.split(line)
+        for i, sentence in enumerate(sentences):
+            after = separator if i == len(sentences) - 1 else " "
+            if len(sentence) <= self.max_chars:
+                yield sentence, after
+                continue
+            words = sentence.split(" ")
+            group = ""
+            for word in words:
+                while len(word) > self.max_chars:
+                    # A single unbroken run of text: cut it anywhere
+                    if group:
+                        yield group, " "
+                        group = ""
+                    yield word[: self.max_chars], ""
+                    word = word[self.max_chars:]
+                if group and len(group) + 1 + len(word) > self.max_chars:
+                    yield group, " "
+                    group = ""
+                group = f"{group} {word}" if group else word
+            if group:
+                yield group, after
+
+    def _add(self, separator: str, piece: str) -> Iterator[str]:
+        """Append one piece, yielding the current chunk first if it is full."""
+        if self.pieces and self.chars + len(separator) + len(piece) > self.max_chars:
+            if len(self.pieces) > self.overlap:
+                yield from self._emit()
+            # Drop overlap the new piece doesn't leave room for
+            while self.pieces and self.chars + len(separator) + len(piece) > self.max_chars:
+                self.chars -= len(self.pieces[0][1]) + (len(self.pieces[1][0]) if len(self.pieces) > 1 else 0)
+                self.pieces.pop(0)
+                self.overlap -= 1
+        if self.pieces:
+            self.chars += len(separator)
+        self.pieces.append((separator, piece))
+        self.chars += len(piece)
+
+    def _emit(self) -> Iterator[str]:
+        """Yield the current chunk and start the next with its overlap."""
+        yield self._text()
+        overlap: list[tuple[str, str]] = []
+        chars = 0
+        for separator, piece in reversed(self.pieces):
+            if chars + len(piece) > self.overlap_chars:
+                break
+            overlap.insert(0, (separator, piece))
+            chars += len(piece) + len(separator)
+        self.pieces = overlap
+        self.chars = sum(len(piece) + len(separator) for separator, piece in overlap[1:])
+        self.chars += len(overlap[0][1]) if overlap else 0
+        self.overlap = len(overlap)
+
+    def _text(self) -> str:
+        """The current chunk's content."""
+        body = self.pieces[0][1] + "".join(separator + piece for separator, piece in self.pieces[1:])
+        return self.prefix + body.strip()
+
+
+def _track_fence(fence: str | None, line: str) -> str | None:
+    """Open or close a fenced code block.
 
     Args:
-        content: Section content (may include title)
-        section_title: Original section title for context
-        max_chars: Soft character limit per chunk
+        fence: Marker of the open code block, or None
+        line: Next line
 
     Returns:
-        List of chunk strings
+        Marker of the code block open after the line, or None
     """
-    # Split on blank lines (paragraph boundaries)
-    paragraphs = re.split(r'\n\s*\n', content)
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
-
-    if not paragraphs:
-        return [content] if content.strip() else []
-
-    chunks = []
-    current_chunk = ""
-
-    for para in paragraphs:
-        # If adding this paragraph would exceed limit
-        if current_chunk and len(current_chunk) + len(para) + 2 > max_chars:
-            # Save current chunk
-            chunks.append(current_chunk)
-            # Start new chunk with section title for context
-            title_text = _extract_title_text(section_title)
-            if title_text:
-                current_chunk = f"[{title_text}]\n{para}"
-            else:
-                current_chunk = para
-        else:
-            # Add to current chunk
-            if current_chunk:
-                current_chunk += "\n\n" + para
-            else:
-                current_chunk = para
+    match = FENCE_PATTERN.match(line)
+    if not match:
+        return fence
+    marker = match.group(1)
+    if fence is None:
+        return marker
+    if marker[0] == fence[0] and len(marker) >= len(fence) and not line[match.end():].strip():
+        return None
+    return fence
 
-    # Don't forget the last chunk
-    if current_chunk:
-        chunks.append(current_chunk)
 
-    return chunks
+def _ends_bare_header(lines: list[str]) -> bool:
+    """Whether a bare "#" header left pending at the end of the file is a header.
+
+    It is when the whitespace after the "#"s still leaves a character on a
+    line for the header title to match, as in "###  " or "###" followed by
+    "   "; the section it starts is then just the "#"s.
+
+    Args:
+        lines: The bare header line and the blank lines after it
+
+    Returns:
+        True if the lines form a header
+    """
+    rest = "\n".join(lines).lstrip("#")
+    return bool(rest[1:].strip("\n"))
 
 
 def _extract_title_text(header_line: str) -> str:
@@ -177,40 +526,3 @@ def _extract_title_text(header_line: str) -> str:
 
     # Remove leading # characters and whitespace
     return re.sub(r'^#+\s*', '', header_line).strip()
-
-
-def chunk_plain_text(
-    content: str,
-    source: str,
-    max_chars: int = 1000,
-) -> list[dict[str, Any]]:
-    """Chunk plain text files by paragraphs.
-
-    Args:
-        content: Full text content
-        source: File path or logical name
-        max_chars: Soft character limit per chunk
-
-    Returns:
-        List of document dicts
-    """
-    # Reuse paragraph splitting logic
-    chunks_content = _split_by_paragraphs(content, "", max_chars)
-
-    chunks = []
-    for i, chunk_content in enumerate(chunks_content):
-        chunks.append({
-            "content": chunk_content,
-            "metadata": {
-                "source": source,
-                "section_title": "",
-                "chunk_index": i,
-            },
-        })
-
-    # Add total_chunks
-    total = len(chunks)
-    for chunk in chunks:
-        chunk["metadata"]["total_chunks"] = total
-
-    return chunks
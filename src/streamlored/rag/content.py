@@ -0,0 +1,79 @@
+"""Cold storage for chunk text and metadata, read back only for returned hits."""
+
+import json
+import mmap
+import tempfile
+import threading
+from array import array
+from pathlib import Path
+from typing import Any
+
+
+class ContentFile:
+    """Append-only, offset-indexed file of chunk text and metadata.
+
+    Each chunk is one JSON record in a private temporary file; only the record
+    offsets stay in RAM. Reads go through a memory map, so the text lives in
+    the OS page cache (and can be evicted) instead of in Python objects.
+    """
+
+    def __init__(self, directory: Path | None = None) -> None:
+        """Create an empty content file.
+
+        Args:
+            directory: Where to create the file (e.g. next to the KB rather
+                than in a RAM-backed /tmp); the system default if None
+        """
+        self._file = tempfile.TemporaryFile(dir=directory, prefix="kb-content-")
+        # Record i spans _offsets[i]:_offsets[i + 1]
+        self._offsets = array("q", [0])
+        self._mmap: mmap.mmap | None = None
+        # Appends remap the file; keep reads from other threads off a closed map
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, content: str, metadata: dict[str, Any]) -> None:
+        """Append one chunk.
+
+        Args:
+            content: Chunk text
+            metadata: Chunk metadata
+        """
+        data = json.dumps({"content": content, "metadata": metadata}, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._file.seek(self._offsets[-1])
+            self._file.write(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+
+    def get(self, index: int) -> dict[str, Any]:
+        """Read one chunk.
+
+        Args:
+            index: Chunk position
+
+        Returns:
+            Dict with "content" and "metadata"
+        """
+        start, end = self._offsets[index], self._offsets[index + 1]
+        with self._lock:
+            if self._mmap is None or len(self._mmap) < end:
+                self._remap()
+            data = self._mmap[start:end]
+        return json.loads(data)
+
+    def _remap(self) -> None:
+        """Map the file again after it has grown."""
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """Unmap and delete the file."""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            self._file.close()
@@ -0,0 +1,142 @@
+"""Near-duplicate chunk detection with MinHash and LSH buckets.
+
+Overlapping docs (a series overview and its per-game pages, a remake roundup
+and the per-series remake docs) produce chunks that say the same thing. Each
+chunk gets a MinHash signature over its word shingles; signatures are split
+into bands, and chunks sharing a band bucket are compared, so checking a new
+chunk costs a few dict lookups instead of a pass over the whole KB.
+"""
+
+import hashlib
+import random
+from array import array
+from typing import Any
+
+from streamlored.rag.lexical import tokenize
+
+# Hash functions per MinHash signature
+NUM_PERMUTATIONS = 64
+
+# LSH bands of NUM_PERMUTATIONS // LSH_BANDS rows; two chunks become candidates
+# when any band matches, which is likely from about 50% similarity up
+LSH_BANDS = 16
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Chunks with fewer terms than this (bare headers, one-liners) are never
+# collapsed: short texts look alike without saying the same thing
+MIN_DEDUP_TERMS = 8
+
+# Estimated Jaccard similarity at which chunks count as duplicates by default
+DEFAULT_THRESHOLD = 0.85
+
+# Universal hashing (a * x + b) mod p over a Mersenne prime
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def minhash(text: str) -> list[int] | None:
+    """Compute the MinHash signature of a chunk.
+
+    Args:
+        text: Chunk content
+
+    Returns:
+        NUM_PERMUTATIONS hash minimums, or None if the text is too short to compare
+    """
+    terms = tokenize(text)
+    if len(terms) < MIN_DEDUP_TERMS:
+        return None
+    hashes = {
+        int.from_bytes(
+            hashlib.blake2b(" ".join(terms[i:i + SHINGLE_SIZE]).encode("utf-8"), digest_size=8).digest(),
+            "little",
+        )
+        for i in range(len(terms) - SHINGLE_SIZE + 1)
+    }
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def chunk_label(metadata: dict[str, Any]) -> dict[str, Any]:
+    """Identify a chunk in a duplicate report."""
+    return {
+        "path": metadata.get("path", metadata.get("source", "")),
+        "section_title": metadata.get("section_title", ""),
+        "chunk_index": metadata.get("chunk_index"),
+    }
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of the chunks kept so far, bucketed by LSH band."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD) -> None:
+        """Create an empty index.
+
+        Args:
+            threshold: Estimated Jaccard similarity at which a chunk is a duplicate
+        """
+        self.threshold = threshold
+        self._rows = NUM_PERMUTATIONS // LSH_BANDS
+        # Band bucket key -> positions of kept chunks in it
+        self._buckets: dict[tuple[int, int], list[int]] = {}
+        self._signatures: list[array] = []
+        self._metadata: list[dict[str, Any]] = []
+        # One entry per collapsed chunk
+        self.report: list[dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, signature: list[int] | None, metadata: dict[str, Any]) -> bool:
+        """Check a chunk against the kept chunks and keep it unless it is a duplicate.
+
+        A duplicate is only collapsed into a chunk that is returned wherever it
+        would have been: one from the same series, or any chunk if the
+        duplicate has no series. A series chunk that repeats a chunk from
+        elsewhere is kept so series-filtered searches still find it.
+
+        Args:
+            signature: MinHash signature from minhash (None = always keep)
+            metadata: Chunk metadata
+
+        Returns:
+            True if the chunk should be stored, False if it was collapsed
+        """
+        if signature is None:
+            return True
+
+        keys = [
+            (band, hash(tuple(signature[band * self._rows:(band + 1) * self._rows])))
+            for band in range(LSH_BANDS)
+        ]
+        series = metadata.get("series")
+        best, best_similarity = None, 0.0
+        seen: set[int] = set()
+        for key in keys:
+            for position in self._buckets.get(key, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                if series is not None and self._metadata[position].get("series") != series:
+                    continue
+                kept = self._signatures[position]
+                similarity = sum(x == y for x, y in zip(signature, kept)) / NUM_PERMUTATIONS
+                if similarity > best_similarity:
+                    best, best_similarity = position, similarity
+
+        if best is not None and best_similarity >= self.threshold:
+            self.report.append({
+                "collapsed": chunk_label(metadata),
+                "kept": chunk_label(self._metadata[best]),
+                "similarity": round(best_similarity, 3),
+            })
+            return False
+
+        position = len(self._signatures)
+        self._signatures.append(array("Q", signature))
+        self._metadata.append({"series": series, **chunk_label(metadata)})
+        for key in keys:
+            self._buckets.setdefault(key, []).append(position)
+        return True
@@ -0,0 +1,213 @@
+"""Pipelined ingestion of a docs folder into a document store.
+
+Files are read and chunked in a process pool while earlier chunks are being
+embedded and written, so the embedding backend stays busy instead of waiting
+for the whole tree to be chunked. A bounded queue between the two stages
+stops chunking from running far ahead of embedding. Near-duplicate chunks
+can be dropped before they are embedded (see dedup).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from streamlored.rag import DocumentStore
+from streamlored.rag.chunking import iter_markdown_chunks, iter_text_chunks
+from streamlored.rag.dedup import NearDuplicateIndex, minhash
+from streamlored.rag.metadata import path_metadata
+
+logger = logging.getLogger(__name__)
+
+# File types picked up by --ingest
+DOCUMENT_PATTERNS = ("**/*.txt", "**/*.md")
+
+# Chunks embedded and written per store call
+INGEST_BATCH_SIZE = 128
+
+# Chunked files waiting for the embedding stage, per chunking worker
+QUEUE_FILES_PER_WORKER = 4
+
+
+@dataclass
+class IngestStats:
+    """What an ingest run did."""
+
+    files: int = 0
+    empty_files: int = 0
+    failed_files: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+    # Near-duplicate chunks that were not stored (see NearDuplicateIndex.report)
+    duplicates: list[dict[str, Any]] = field(default_factory=list)
+
+    def summary(self) -> str:
+        """One-line description for logging."""
+        rate = self.chunks / self.seconds if self.seconds else 0.0
+        return (
+            f"{self.chunks} chunks from {self.files} files in {self.seconds:.1f}s ({rate:.1f} chunks/s)"
+            f", {self.empty_files} empty, {self.failed_files} failed, {len(self.duplicates)} near-duplicates skipped"
+        )
+
+
+def find_documents(docs_path: Path) -> list[Path]:
+    """Find the .txt and .md files under a folder.
+
+    Args:
+        docs_path: Folder to search
+
+    Returns:
+        Matching files, sorted
+    """
+    return sorted(path for pattern in DOCUMENT_PATTERNS for path in docs_path.glob(pattern))
+
+
+def chunk_file(
+    file_path: Path,
+    docs_path: Path,
+    max_tokens: int = 0,
+    overlap_tokens: int = 0,
+    signatures: bool = False,
+) -> list[dict[str, Any]]:
+    """Read and chunk one file, adding its path and series metadata.
+
+    Runs in a worker process, so it must stay a picklable module-level function.
+
+    Args:
+        file_path: File to chunk
+        docs_path: Docs folder being ingested
+        max_tokens: Size chunks by estimated tokens (0 = by characters)
+        overlap_tokens: Estimated tokens each chunk repeats from the previous one
+        signatures: Also add each chunk's MinHash signature as "minhash"
+
+    Returns:
+        Chunks with "content" and "metadata" (empty for a blank file)
+    """
+    iter_chunks = iter_markdown_chunks if file_path.suffix.lower() == ".md" else iter_text_chunks
+    # Stream the file line by line rather than reading it into one string
+    with open(file_path, encoding="utf-8") as f:
+        chunks = list(iter_chunks(f, file_path.name, max_tokens=max_tokens, overlap_tokens=overlap_tokens))
+
+    # Record series and path from the folder layout for filtered search
+    file_metadata = path_metadata(file_path, docs_path)
+    for chunk in chunks:
+        chunk["metadata"]["total_chunks"] = len(chunks)
+        chunk["metadata"].update(file_metadata)
+        if signatures:
+            # Hashed here so the work is spread over the chunking processes
+            chunk["minhash"] = minhash(chunk["content"])
+    return chunks
+
+
+async def ingest_files(
+    doc_store: DocumentStore,
+    files: list[Path],
+    docs_path: Path,
+    workers: int = 0,
+    executor: Executor | None = None,
+    max_tokens: int = 0,
+    overlap_tokens: int = 0,
+    dedup_threshold: float = 0.0,
+) -> IngestStats:
+    """Chunk files in parallel and stream the chunks into a document store.
+
+    Args:
+        doc_store: Store to ingest into
+        files: Files to ingest (see find_documents)
+        docs_path: Docs folder the files are under
+        workers: Chunking processes (0 = one per CPU)
+        executor: Executor to chunk in instead of a new process pool
+        max_tokens: Size chunks by estimated tokens (0 = by characters)
+        overlap_tokens: Estimated tokens each chunk repeats from the previous one
+        dedup_threshold: Skip chunks at least this similar to one already
+            ingested in this run (0 = keep all)
+
+    Returns:
+        Ingest statistics
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = IngestStats()
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[list[dict[str, Any]] | None] = asyncio.Queue(maxsize=workers * QUEUE_FILES_PER_WORKER)
+    duplicates = NearDuplicateIndex(dedup_threshold) if dedup_threshold else None
+
+    async def produce(pool: Executor) -> None:
+        """Chunk files, keeping a few per worker in flight, and queue the results."""
+        in_flight: dict[asyncio.Future, Path] = {}
+
+        async def collect(wait_for_all: bool) -> None:
+            done, _ = await asyncio.wait(
+                in_flight,
+                return_when=asyncio.ALL_COMPLETED if wait_for_all else asyncio.FIRST_COMPLETED,
+            )
+            for future in done:
+                file_path = in_flight.pop(future)
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    stats.failed_files += 1
+                    logger.error(f"Failed to read {file_path}: {e}")
+                    continue
+                if not chunks:
+                    stats.empty_files += 1
+                    continue
+                logger.info(f"Read: {file_path.name} -> {len(chunks)} chunks")
+                # Blocks while the embedding stage is behind
+                await queue.put(chunks)
+
+        try:
+            for file_path in files:
+                if len(in_flight) >= workers * 2:
+                    await collect(wait_for_all=False)
+                in_flight[loop.run_in_executor(
+                    pool, chunk_file, file_path, docs_path, max_tokens, overlap_tokens, duplicates is not None
+                )] = file_path
+            if in_flight:
+                await collect(wait_for_all=True)
+        except asyncio.CancelledError:
+            # The embedding stage failed and is no longer reading the queue
+            raise
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    async def consume() -> None:
+        """Embed and store queued chunks in batches."""
+        batch: list[dict[str, Any]] = []
+        while (chunks := await queue.get()) is not None:
+            if duplicates is not None:
+                chunks = [chunk for chunk in chunks if duplicates.add(chunk.pop("minhash"), chunk["metadata"])]
+            batch.extend(chunks)
+            stats.files += 1
+            if len(batch) >= INGEST_BATCH_SIZE:
+                await doc_store.ingest_documents(batch)
+                stats.chunks += len(batch)
+                batch = []
+        if batch:
+            await doc_store.ingest_documents(batch)
+            stats.chunks += len(batch)
+
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        producer = asyncio.create_task(produce(pool))
+        try:
+            await consume()
+        except BaseException:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            raise
+        await producer
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+
+    stats.seconds = time.perf_counter() - started
+    if duplicates is not None:
+        stats.duplicates = duplicates.report
+    return stats
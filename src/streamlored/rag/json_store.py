@@ -1,17 +1,55 @@
-"""JSON-backed document store for RAG."""
+"""JSON-backed document store for RAG.
 
+The KB file is a compacted snapshot. Changes since the last compaction are
+appended to a write-ahead log next to it (one JSON record per line), so an
+ingest writes only the new chunks and a crash can lose at most the record
+being written. Compaction folds the log into a new snapshot that atomically
+replaces the old one.
+"""
+
+import asyncio
+import heapq
 import json
 import logging
 import math
+import os
 import uuid
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 
 from streamlored.rag import DocumentStore
+from streamlored.rag.content import ContentFile
+from streamlored.rag.lexical import BM25Index, document_terms, reciprocal_rank_fusion, tokenize
+from streamlored.rag.metadata import FILTER_FIELDS, series_for_game
 from streamlored.rag.ollama_embeddings import OllamaEmbeddingProvider
+from streamlored.rag.rerank import DEFAULT_RERANK_CANDIDATES, Reranker, rerank
+from streamlored.rag.vectors import VectorIndex
 
 logger = logging.getLogger(__name__)
 
+# Retrieval modes: cosine similarity only, or cosine fused with BM25
+RETRIEVAL_MODES = ("vector", "hybrid")
+
+# Candidates each retriever contributes to rank fusion
+FUSION_CANDIDATES = 20
+
+# A query of at most this many terms that all appear together in a chunk is
+# answered from the lexical index alone, without embedding it...
+EXACT_MATCH_MAX_TERMS = 3
+# ...as long as every term is rare (in at most this share of chunks). Those
+# matches have no cosine "score"; they carry only their "lexical_score".
+EXACT_MATCH_MAX_DF = 0.05
+
+# A filtered query whose best match scores below this is retried over the whole KB
+FILTER_FALLBACK_MIN_SCORE = 0.5
+
+# Compact once the write-ahead log is at least this large...
+COMPACT_MIN_LOG_BYTES = 1_000_000
+# ...and this large relative to the snapshot,
+COMPACT_LOG_RATIO = 0.5
+# or once this share of the documents are deleted
+COMPACT_TOMBSTONE_RATIO = 0.25
+
 
 def cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
     """Compute cosine similarity between two vectors.
@@ -36,45 +74,394 @@ def cosine_similarity(vec_a: list[float], vec_b: list[float]) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def normalize(vec: list[float]) -> list[float]:
+    """Scale a vector to unit length so cosine similarity becomes a dot product.
+
+    Args:
+        vec: Vector to normalize
+
+    Returns:
+        Unit-length copy of the vector (all zeros if the input norm is 0)
+    """
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0:
+        return [0.0] * len(vec)
+    return [v / norm for v in vec]
+
+
 class JsonDocumentStore(DocumentStore):
     """Document store that persists to a JSON file."""
 
-    def __init__(self, kb_path: str, embedding_provider: OllamaEmbeddingProvider):
+    def __init__(
+        self,
+        kb_path: str,
+        embedding_provider: OllamaEmbeddingProvider,
+        retrieval: str = "hybrid",
+        lexical_shortcut: bool = True,
+        precision: str = "float32",
+        rescore: bool = True,
+        diversity: float = 0.0,
+        reranker: Reranker | None = None,
+        rerank_candidates: int = DEFAULT_RERANK_CANDIDATES,
+    ):
         """Initialize the JSON document store.
 
         Args:
             kb_path: Path to the knowledge base JSON file
             embedding_provider: Provider for generating embeddings
+            retrieval: "vector" or "hybrid" (vector + BM25 with rank fusion)
+            lexical_shortcut: In hybrid mode, answer short exact-term queries from
+                the lexical index without an embedding request
+            precision: In-memory embedding precision: "float32", "float16" or "int8"
+            rescore: With float16/int8, rescore the best candidates against the
+                float32 copies kept in a memory-mapped sidecar file
+            diversity: MMR weight of dissimilarity between results (0 = plain top-k)
+            reranker: Optional cross-scoring stage over the top candidates
+            rerank_candidates: Candidates per query for the reranker and MMR
         """
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
         self.kb_path = Path(kb_path)
         self.embedding_provider = embedding_provider
-        self.documents: list[dict[str, Any]] = []
+        self.retrieval = retrieval
+        self.lexical_shortcut = lexical_shortcut
+        self.precision = precision
+        self.rescore = rescore
+        self.diversity = diversity
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        # Document IDs; text and metadata are in self._content, embeddings in self._vectors
+        self._ids: list[str] = []
+        self._content = ContentFile(self._scratch_dir)
+        # Unit-length document embeddings in a packed buffer, parallel to self._ids
+        self._vectors = VectorIndex(precision, rescore)
+        # Inverted index over content and section titles, persisted next to the KB
+        self._lexical: BM25Index | None = None
+        # Posting lists per metadata value: field -> value -> doc indexes
+        self._metadata_postings: dict[str, dict[str, list[int]]] = {}
+        # Doc ID -> index, and indexes of deleted documents (tombstones)
+        self._positions: dict[str, int] = {}
+        self._deleted: set[int] = set()
+        # Sizes used to decide when to compact
+        self._base_bytes = 0
+        self._log_bytes = 0
+        self._cleared = False
+        self._compact_lock = asyncio.Lock()
+        self._compaction_task: asyncio.Task | None = None
 
         # Load existing data if file exists
         self._load()
 
     def _load(self) -> None:
-        """Load documents from the JSON file."""
+        """Load the snapshot and replay the write-ahead log on top of it."""
+        documents: list[dict[str, Any]] = []
+        self._base_bytes = 0
         if self.kb_path.exists():
             try:
                 with open(self.kb_path, "r", encoding="utf-8") as f:
-                    self.documents = json.load(f)
-                logger.info(f"Loaded {len(self.documents)} documents from {self.kb_path}")
+                    documents = json.load(f)
+                self._base_bytes = self.kb_path.stat().st_size
             except Exception as e:
                 logger.error(f"Failed to load knowledge base: {e}")
-                self.documents = []
-        else:
-            self.documents = []
+                documents = []
+
+        records = self._read_log()
+        if records:
+            documents = self._replay(documents, records)
+        self._cleared = any(record["op"] == "clear" for record in records)
+        if documents or records:
+            logger.info(
+                f"Loaded {len(documents)} documents from {self.kb_path}"
+                + (f" ({len(records)} log records replayed)" if records else "")
+            )
+
+        self._reindex(documents, [doc.pop("embedding") for doc in documents])
+
+        if self.retrieval == "hybrid":
+            self._lexical = BM25Index.load(self.lexical_path, self._ids)
+            if self._lexical is None:
+                self._lexical = self._build_lexical_index(documents)
+                if documents:
+                    self._lexical.save(self.lexical_path, self._ids)
+                    logger.info(f"Built lexical index for {len(documents)} documents")
+
+    @staticmethod
+    def _replay(documents: list[dict[str, Any]], records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Apply log records to snapshot documents.
+
+        Replay is idempotent (adds of known IDs are skipped), so a log that was
+        already folded into the snapshot by an interrupted compaction is harmless.
+
+        Args:
+            documents: Snapshot documents, with embeddings
+            records: Log records in order
+
+        Returns:
+            The resulting documents
+        """
+        by_id = {doc["id"]: doc for doc in documents}
+        for record in records:
+            op = record["op"]
+            if op == "add":
+                by_id.setdefault(record["doc"]["id"], record["doc"])
+            elif op == "delete":
+                by_id.pop(record["id"], None)
+            elif op == "clear":
+                by_id.clear()
+        return list(by_id.values())
+
+    def _reindex(self, documents: list[dict[str, Any]], embeddings: list[list[float]]) -> None:
+        """Replace the documents and rebuild the content file, vector and metadata indexes.
+
+        Args:
+            documents: Documents without embeddings
+            embeddings: Their embeddings, in the same order
+        """
+        self._ids = [doc["id"] for doc in documents]
+        self._deleted = set()
+        self._positions = {doc_id: i for i, doc_id in enumerate(self._ids)}
+
+        self._content.close()
+        self._content = ContentFile(self._scratch_dir)
+        for doc in documents:
+            self._content.append(doc["content"], doc["metadata"])
+
+        self._vectors.close()
+        self._vectors = VectorIndex(self.precision, self.rescore)
+        for embedding in embeddings:
+            self._vectors.add(embedding)
+        self._vectors.attach_sidecar(self._scratch_dir)
+
+        self._metadata_postings = {}
+        for doc_index, doc in enumerate(documents):
+            self._index_metadata(doc_index, doc["metadata"])
+
+    @property
+    def log_path(self) -> Path:
+        """Path of the write-ahead log (e.g. knowledge_base.log.jsonl)."""
+        return self.kb_path.with_suffix(".log.jsonl")
+
+    @property
+    def _scratch_dir(self) -> Path | None:
+        """Directory for the content and vector sidecar files (None = system temp dir)."""
+        return self.kb_path.parent if self.kb_path.parent.exists() else None
+
+    @property
+    def lexical_path(self) -> Path:
+        """Path of the persisted lexical index (e.g. knowledge_base.lexical.json)."""
+        return self.kb_path.with_suffix(".lexical.json")
+
+    @staticmethod
+    def _build_lexical_index(documents: Iterable[dict[str, Any]]) -> BM25Index:
+        """Index every document's content and section title."""
+        index = BM25Index()
+        for doc in documents:
+            index.add(document_terms(doc))
+        return index
+
+    def _document(self, doc_index: int) -> dict[str, Any]:
+        """Read a document's ID, text and metadata from the content file."""
+        return {"id": self._ids[doc_index], **self._content.get(doc_index)}
+
+    def _index_metadata(self, doc_index: int, metadata: dict[str, Any]) -> None:
+        """Add a document to the posting lists of its filterable metadata values."""
+        for field in FILTER_FIELDS:
+            value = metadata.get(field)
+            if value:
+                self._metadata_postings.setdefault(field, {}).setdefault(str(value), []).append(doc_index)
+
+    def metadata_values(self, field: str) -> list[str]:
+        """List the distinct values of a metadata field.
+
+        Args:
+            field: One of FILTER_FIELDS
+
+        Returns:
+            Values present in the KB
+        """
+        return list(self._metadata_postings.get(field, {}))
+
+    def filters_for_game(self, game_name: str | None) -> dict[str, list[str]] | None:
+        """Build query filters that restrict a search to a game's series.
+
+        Args:
+            game_name: Twitch game name (None if unknown)
+
+        Returns:
+            Filters for query_many, or None if the game matches no series in the KB
+        """
+        series = series_for_game(game_name, self.metadata_values("series"))
+        return {"series": series} if series else None
+
+    def _candidates(self, filters: dict[str, str | list[str]]) -> list[int]:
+        """Documents matching every filter field (any of the values per field).
+
+        Args:
+            filters: Field -> value or list of values
+
+        Returns:
+            Matching doc indexes in order
+        """
+        matches: set[int] | None = None
+        for field, values in filters.items():
+            if isinstance(values, str):
+                values = [values]
+            postings = self._metadata_postings.get(field, {})
+            docs = {doc for value in values for doc in postings.get(value, ())}
+            matches = docs if matches is None else matches & docs
+            if not matches:
+                return []
+        return sorted((matches or set()) - self._deleted)
+
+    def document_ids(self, filters: dict[str, str | list[str]]) -> list[str]:
+        """IDs of the documents whose metadata matches filters, e.g. {"path": "re/enemies.md"}.
+
+        Args:
+            filters: Field (see FILTER_FIELDS) -> value or list of values
+
+        Returns:
+            Matching document IDs
+        """
+        return [self._ids[i] for i in self._candidates(filters)]
+
+    def _read_log(self) -> list[dict[str, Any]]:
+        """Read the write-ahead log, cutting off a record torn by a crash.
+
+        Returns:
+            Log records in order
+        """
+        self._log_bytes = 0
+        if not self.log_path.exists():
+            return []
 
-    def _save(self) -> None:
-        """Save documents to the JSON file."""
-        # Ensure parent directory exists
+        records = []
+        good_bytes = 0
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    logger.warning(f"Discarding damaged log tail in {self.log_path} at byte {good_bytes}: {e}")
+                    break
+                good_bytes += len(line)
+
+        if good_bytes < self.log_path.stat().st_size:
+            with open(self.log_path, "r+b") as f:
+                f.truncate(good_bytes)
+        self._log_bytes = good_bytes
+        return records
+
+    def _append_log(self, records: list[dict[str, Any]]) -> None:
+        """Durably append records to the write-ahead log.
+
+        Args:
+            records: Records with an "op" of "add", "delete" or "clear"
+        """
         self.kb_path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records
+        ).encode("utf-8")
+        with open(self.log_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_bytes += len(data)
+
+    def needs_compaction(self) -> bool:
+        """Whether the log or the tombstones have grown enough to be worth compacting."""
+        if self._cleared and self._base_bytes:
+            return True
+        if self._deleted and len(self._deleted) >= len(self._ids) * COMPACT_TOMBSTONE_RATIO:
+            return True
+        return self._log_bytes >= COMPACT_MIN_LOG_BYTES and self._log_bytes >= self._base_bytes * COMPACT_LOG_RATIO
+
+    async def compact(self) -> None:
+        """Fold the write-ahead log into a new snapshot and drop deleted documents.
+
+        The snapshot is written to a temporary file in a worker thread and
+        renamed over the KB, so readers never see a partial file. Records
+        appended while it is written stay in the log.
+        """
+        async with self._compact_lock:
+            log_offset = self._log_bytes
+            live = self._live_indexes()
+            documents = [{**self._document(i), "embedding": self._vectors.exact(i)} for i in live]
+            self._cleared = False
+
+            self._base_bytes = await asyncio.to_thread(self._write_snapshot, documents)
+            self._truncate_log(log_offset)
+
+            if self._deleted:
+                live = self._live_indexes()
+                kept = [self._document(i) for i in live]
+                self._reindex(kept, [self._vectors.exact(i) for i in live])
+                if self._lexical is not None:
+                    self._lexical = self._build_lexical_index(kept)
+            if self._lexical is not None:
+                self._lexical.save(self.lexical_path, self._ids)
 
-        with open(self.kb_path, "w", encoding="utf-8") as f:
-            json.dump(self.documents, f, indent=2, ensure_ascii=False)
+            logger.info(f"Compacted {self.kb_path}: {len(documents)} documents, {self._log_bytes} log bytes left")
 
-        logger.info(f"Saved {len(self.documents)} documents to {self.kb_path}")
+    def _write_snapshot(self, documents: list[dict[str, Any]]) -> int:
+        """Atomically replace the KB file with a snapshot.
+
+        Args:
+            documents: Documents with embeddings
+
+        Returns:
+            Size of the new KB file in bytes
+        """
+        self.kb_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.kb_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(documents, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.kb_path)
+        return self.kb_path.stat().st_size
+
+    def _truncate_log(self, offset: int) -> None:
+        """Drop the first offset bytes of the log (already in the snapshot), keeping newer records."""
+        if not self.log_path.exists():
+            self._log_bytes = 0
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            tail = f.read()
+        if not tail:
+            self.log_path.unlink()
+        else:
+            tmp_path = self.log_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.log_path)
+        self._log_bytes = len(tail)
+
+    def _schedule_compaction(self) -> None:
+        """Start a background compaction if one is due and none is running."""
+        if self._compaction_task and not self._compaction_task.done():
+            return
+        if self.needs_compaction():
+            self._compaction_task = asyncio.create_task(self._compact_in_background())
+
+    async def _compact_in_background(self) -> None:
+        """Run compact() and log failures (the log stays authoritative if it fails)."""
+        try:
+            # An explicit compact() may have run while this task was waiting
+            if self.needs_compaction():
+                await self.compact()
+        except Exception as e:
+            logger.error(f"Failed to compact knowledge base {self.kb_path}: {e}")
+
+    def _live_indexes(self) -> list[int]:
+        """Indexes of documents that are not deleted."""
+        if not self._deleted:
+            return list(range(len(self._ids)))
+        return [i for i in range(len(self._ids)) if i not in self._deleted]
 
     async def ingest_documents(self, documents: list[dict[str, Any]]) -> None:
         """Ingest documents into the store.
@@ -85,67 +472,368 @@ class JsonDocumentStore(DocumentStore):
         if not documents:
             return
 
+        entries, embeddings = await self._embed_entries(documents)
+
+        # Persist to the log first, then make the chunks searchable
+        self._append_log([
+            {"op": "add", "doc": {**entry, "embedding": embedding}}
+            for entry, embedding in zip(entries, embeddings)
+        ])
+        self._add_entries(entries, embeddings)
+
+        logger.info(f"Ingested {len(documents)} documents")
+        self._schedule_compaction()
+
+    async def replace_documents(self, doc_ids: list[str], documents: list[dict[str, Any]]) -> int:
+        """Swap documents for new ones, e.g. the chunks of an edited file.
+
+        The new documents are embedded first. The deletions and additions are
+        then logged together and applied without yielding to the event loop,
+        so concurrent queries see either the old documents or the new ones.
+
+        Args:
+            doc_ids: IDs of the documents to delete
+            documents: Documents to add, with 'content' and optional 'metadata' keys
+
+        Returns:
+            Number of documents deleted
+        """
+        entries, embeddings = await self._embed_entries(documents) if documents else ([], [])
+
+        doomed = self._live_ids(doc_ids)
+        if not doomed and not entries:
+            return 0
+        self._append_log(
+            [{"op": "delete", "id": doc_id} for doc_id in doomed]
+            + [{"op": "add", "doc": {**entry, "embedding": embedding}} for entry, embedding in zip(entries, embeddings)]
+        )
+        self._deleted.update(self._positions[doc_id] for doc_id in doomed)
+        self._add_entries(entries, embeddings)
+
+        logger.info(f"Replaced {len(doomed)} documents with {len(entries)}")
+        self._schedule_compaction()
+        return len(doomed)
+
+    async def _embed_entries(self, documents: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[list[float]]]:
+        """Embed documents and give them IDs.
+
+        Args:
+            documents: Documents with 'content' and optional 'metadata' keys
+
+        Returns:
+            Entries with "id", "content" and "metadata", and their embeddings
+        """
         # Extract content for embedding
         contents = [doc.get("content", "") for doc in documents]
 
         # Generate embeddings
         logger.info(f"Generating embeddings for {len(documents)} documents...")
-        embeddings = await self.embedding_provider.embed(contents)
+        embeddings = await self.embedding_provider.embed_documents(contents)
 
         # Create document entries
-        for doc, embedding in zip(documents, embeddings):
-            entry = {
+        entries = [
+            {
                 "id": str(uuid.uuid4()),
                 "content": doc.get("content", ""),
                 "metadata": doc.get("metadata", {}),
-                "embedding": embedding,
             }
-            self.documents.append(entry)
+            for doc in documents
+        ]
+        return entries, embeddings
+
+    def _add_entries(self, entries: list[dict[str, Any]], embeddings: list[list[float]]) -> None:
+        """Make logged entries searchable."""
+        for entry, embedding in zip(entries, embeddings):
+            self._positions[entry["id"]] = len(self._ids)
+            self._index_metadata(len(self._ids), entry["metadata"])
+            self._ids.append(entry["id"])
+            self._content.append(entry["content"], entry["metadata"])
+            self._vectors.add(embedding)
+            if self._lexical is not None:
+                self._lexical.add(document_terms(entry))
+        self._vectors.attach_sidecar(self._scratch_dir)
+
+    def _live_ids(self, doc_ids: list[str]) -> list[str]:
+        """The given IDs that name documents not yet deleted, without repeats."""
+        return [
+            doc_id for doc_id in dict.fromkeys(doc_ids)
+            if doc_id in self._positions and self._positions[doc_id] not in self._deleted
+        ]
+
+    async def delete_documents(self, doc_ids: list[str]) -> int:
+        """Delete documents by ID.
+
+        Deletions are logged as tombstones; the documents stop matching queries
+        at once and are removed from disk at the next compaction.
 
-        # Persist to disk
-        self._save()
-        logger.info(f"Ingested {len(documents)} documents")
+        Args:
+            doc_ids: IDs of the documents to delete
+
+        Returns:
+            Number of documents deleted
+        """
+        doomed = self._live_ids(doc_ids)
+        if not doomed:
+            return 0
+
+        self._append_log([{"op": "delete", "id": doc_id} for doc_id in doomed])
+        self._deleted.update(self._positions[doc_id] for doc_id in doomed)
+        logger.info(f"Deleted {len(doomed)} documents")
+        self._schedule_compaction()
+        return len(doomed)
 
     async def query_knowledge_base(
         self,
         query: str,
         top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
     ) -> list[dict[str, Any]]:
         """Query the knowledge base for relevant documents.
 
         Args:
             query: The search query
             top_k: Number of results to return
+            filters: Optional metadata filters (see query_many)
 
         Returns:
             List of relevant document chunks with scores
         """
-        if not self.documents:
+        results = await self.query_many([query], top_k=top_k, filters=filters)
+        return results[0]
+
+    async def query_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
+        lexical_shortcut: bool | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Query the knowledge base with several queries at once.
+
+        All queries are embedded in a single backend call and scored against
+        the cached unit vectors in one pass over the documents. In hybrid mode
+        the cosine ranking is fused with a BM25 ranking, and short exact-term
+        queries are answered from the lexical index without being embedded.
+
+        Filters restrict the search to chunks whose metadata matches, e.g.
+        {"series": ["resident_evil"]}, using the metadata posting lists. If no
+        chunk matches, or a query's best filtered match is weak, that query
+        falls back to searching the whole KB.
+
+        Args:
+            queries: The search queries
+            top_k: Number of results to return per query
+            filters: Optional metadata filters: field (see FILTER_FIELDS) -> value
+                or list of accepted values
+            lexical_shortcut: Override the store's lexical_shortcut setting (False
+                when every result needs a cosine score)
+
+        Returns:
+            One list of relevant document chunks with scores per query. "score" is
+            the cosine similarity (None for lexical shortcut matches); hybrid
+            results also carry "fusion_score" or "lexical_score", and are ordered
+            by fusion, so use best_score() for the closest match.
+        """
+        if not queries:
             return []
 
-        # Embed the query
-        query_embedding = await self.embedding_provider.embed_single(query)
+        all_docs, doc_indexes = self._search_scope(filters)
+        if not all_docs:
+            return [[] for _ in queries]
+        filtered = doc_indexes is not all_docs
+
+        results: list[list[dict[str, Any]] | None] = [None] * len(queries)
+        query_terms = [tokenize(query) for query in queries] if self._lexical else []
+
+        # Short exact-token queries ("any%", "Hunter") skip the embedding round trip
+        if lexical_shortcut is None:
+            lexical_shortcut = self.lexical_shortcut
+        if self._lexical and lexical_shortcut:
+            for i, terms in enumerate(query_terms):
+                results[i] = self._exact_matches(terms, top_k, doc_indexes if filtered else None)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            # Embed all remaining queries in one round trip
+            embeddings = await self.embedding_provider.embed([queries[i] for i in pending])
+
+            # A compaction during the await renumbers the documents, so the
+            # indexes are taken again; from here on nothing yields to the loop
+            all_docs, doc_indexes = self._search_scope(filters)
+            if not all_docs:
+                return [result or [] for result in results]
+            filtered = doc_indexes is not all_docs
+
+            query_vectors = [normalize(vec) for vec in embeddings]
+            if len(query_vectors[0]) != self._vectors.dim:
+                raise ValueError("Query embedding dimension does not match the knowledge base")
+
+            rows = self._score_rows(query_vectors, doc_indexes)
+            row_docs = [doc_indexes] * len(rows)
+
+            if filtered:
+                # Weak filtered matches retry over everything (e.g. a Silent Hill
+                # question asked during a Resident Evil stream)
+                retry = [n for n, row in enumerate(rows) if max(row) < FILTER_FALLBACK_MIN_SCORE]
+                if retry:
+                    logger.debug(f"{len(retry)} filtered queries fell back to the whole KB")
+                    global_rows = self._score_rows([query_vectors[n] for n in retry], all_docs)
+                    for n, row in zip(retry, global_rows):
+                        rows[n] = row
+                        row_docs[n] = all_docs
+
+            for n, i in enumerate(pending):
+                terms = query_terms[i] if self._lexical else []
+                results[i] = self._rank(rows[n], row_docs[n], terms, top_k, queries[i])
+
+        return results
+
+    def _search_scope(self, filters: dict[str, str | list[str]] | None) -> tuple[list[int], list[int]]:
+        """Documents a query searches, as indexes into the current numbering.
+
+        Args:
+            filters: Optional metadata filters (see query_many)
+
+        Returns:
+            All live doc indexes, and the ones matching the filters (the same
+            list object if there are no filters or nothing matches them)
+        """
+        all_docs = self._live_indexes()
+        if not filters or not all_docs:
+            return all_docs, all_docs
+        doc_indexes = self._candidates(filters)
+        if not doc_indexes:
+            logger.debug(f"No chunks match filters {filters} - searching the whole KB")
+            return all_docs, all_docs
+        return all_docs, doc_indexes
+
+    def _score_rows(self, query_vectors: list[list[float]], doc_indexes: list[int]) -> list[list[float]]:
+        """Cosine similarity of each query against each listed document.
+
+        Args:
+            query_vectors: Unit-length query vectors
+            doc_indexes: Documents to score
+
+        Returns:
+            Score matrix: one row per query, one column per listed document
+        """
+        return self._vectors.scores(query_vectors, doc_indexes)
+
+    def _rank(
+        self,
+        row: list[float],
+        doc_indexes: list[int],
+        terms: list[str],
+        top_k: int,
+        query: str = "",
+    ) -> list[dict[str, Any]]:
+        """Turn one query's cosine scores into its top results.
+
+        With a reranker or diversity set, the best rerank_candidates are
+        reranked and the top_k results picked from them.
+
+        Args:
+            row: Cosine scores, parallel to doc_indexes
+            doc_indexes: Documents that were scored
+            terms: Query terms for BM25 fusion (empty in vector mode)
+            top_k: Number of results to return
+            query: The query text, for the reranker
+
+        Returns:
+            Top document chunks with scores
+        """
+        reranking = self.reranker is not None or self.diversity > 0
+        limit = max(top_k, self.rerank_candidates) if reranking else top_k
+        positions = range(len(row))
+        if self._lexical is None:
+            top = heapq.nlargest(limit, positions, key=row.__getitem__)
+            candidates = [(doc_indexes[p], self._result(doc_indexes[p], row[p])) for p in top]
+        else:
+            # Fuse cosine and BM25 rankings; "score" stays the cosine similarity
+            cosine = {doc_indexes[p]: row[p] for p in positions}
+            vector_ranking = [doc_indexes[p] for p in heapq.nlargest(FUSION_CANDIDATES, positions, key=row.__getitem__)]
+            lexical_ranking = [
+                doc for doc, _ in self._lexical.search(terms, len(self._ids)) if doc in cosine
+            ][:FUSION_CANDIDATES]
+            fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking])
+            top = heapq.nlargest(limit, fused, key=fused.__getitem__)
+            candidates = [(doc, self._result(doc, cosine[doc], fusion_score=fused[doc])) for doc in top]
+
+        if reranking:
+            return rerank(query, candidates, top_k, self._vectors, self.reranker, self.diversity)
+        return [result for _, result in candidates]
+
+    def _exact_matches(
+        self,
+        terms: list[str],
+        top_k: int,
+        doc_indexes: list[int] | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """Answer a query from the lexical index if it is a short, rare, exact-term query.
 
-        # Compute similarities
-        scored_docs = []
-        for doc in self.documents:
-            score = cosine_similarity(query_embedding, doc["embedding"])
-            scored_docs.append({
-                "id": doc["id"],
-                "content": doc["content"],
-                "metadata": doc["metadata"],
-                "score": score,
-            })
+        Args:
+            terms: Query terms
+            top_k: Number of results to return
+            doc_indexes: Only consider these documents (None for all)
 
-        # Sort by score descending and return top_k
-        scored_docs.sort(key=lambda x: x["score"], reverse=True)
-        return scored_docs[:top_k]
+        Returns:
+            Chunks containing every term, best BM25 first, or None if the
+            query needs vector search
+        """
+        if not terms or len(set(terms)) > EXACT_MATCH_MAX_TERMS:
+            return None
+
+        max_df = max(1, int(len(self._ids) * EXACT_MATCH_MAX_DF))
+        if any(self._lexical.document_frequency(term) > max_df for term in terms):
+            return None
+
+        matches = self._lexical.containing_all(terms) - self._deleted
+        if doc_indexes is not None:
+            matches &= set(doc_indexes)
+        if not matches:
+            return None
+
+        hits = [(doc, score) for doc, score in self._lexical.search(terms, len(self._ids)) if doc in matches]
+        logger.debug(f"Lexical match for {terms}: {len(matches)} chunks")
+        return [
+            self._result(doc, None, lexical_score=score)
+            for doc, score in hits[:top_k]
+        ]
+
+    def _result(self, doc_index: int, score: float | None, **extra: float) -> dict[str, Any]:
+        """Build a query result for a document, reading its text from the content file."""
+        doc = self._document(doc_index)
+        return {
+            "id": doc["id"],
+            "content": doc["content"],
+            "metadata": doc["metadata"],
+            "score": score,
+            **extra,
+        }
+
+    def embeddings(self) -> list[list[float]]:
+        """Get the unit-length embeddings of all documents, at full stored precision."""
+        return [self._vectors.exact(i) for i in self._live_indexes()]
 
     def document_count(self) -> int:
         """Return the number of documents in the store."""
-        return len(self.documents)
+        return len(self._ids) - len(self._deleted)
+
+    def close(self) -> None:
+        """Release the content file and the vector sidecar."""
+        if self._compaction_task and not self._compaction_task.done():
+            self._compaction_task.cancel()
+        self._content.close()
+        self._vectors.close()
 
     def clear(self) -> None:
-        """Clear all documents from the store."""
-        self.documents = []
-        self._save()
+        """Clear all documents from the store.
+
+        Only a "clear" record is logged; the old snapshot is dropped at the
+        next compaction.
+        """
+        self._append_log([{"op": "clear"}])
+        self._cleared = True
+        self._reindex([], [])
+        if self._lexical is not None:
+            self._lexical = BM25Index()
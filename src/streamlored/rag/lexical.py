@@ -0,0 +1,219 @@
+"""BM25 inverted index for exact-token retrieval over KB chunks."""
+
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Keep "%" and "+" so speedrun terms like "any%" and "ng+" stay single tokens
+TOKEN_PATTERN = re.compile(r"[\w%+]+")
+
+# Words too common in chat questions to count as search terms
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does did for from had has have how i if in is it its
+it's me my no not of on or so that the their them then there these they this to was we
+what when where which who why will with would you your
+""".split())
+
+# Section titles are short and descriptive, so their terms count extra
+TITLE_WEIGHT = 2
+
+# Bumped when the persisted format changes
+INDEX_VERSION = 1
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase search terms, dropping stopwords.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Search terms in order
+    """
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def document_terms(doc: dict[str, Any]) -> list[str]:
+    """Get the indexed terms for a KB document: its content plus weighted section title.
+
+    Args:
+        doc: Document with "content" and optional "metadata"
+
+    Returns:
+        Terms to index
+    """
+    terms = tokenize(doc.get("content", ""))
+    title = doc.get("metadata", {}).get("section_title")
+    if title:
+        terms.extend(tokenize(title) * TITLE_WEIGHT)
+    return terms
+
+
+def fingerprint(doc_ids: list[str]) -> str:
+    """Hash the document IDs an index was built from, to detect a stale index."""
+    digest = hashlib.sha1()
+    for doc_id in doc_ids:
+        digest.update(doc_id.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring.
+
+    Documents are identified by their position in the store, so the index
+    must be built and appended to in the same order as the documents.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        """Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        # term -> [[doc index, term frequency], ...] in doc index order
+        self.postings: dict[str, list[list[int]]] = {}
+        self.doc_lengths: list[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, terms: list[str]) -> None:
+        """Append one document's terms.
+
+        Args:
+            terms: The document's search terms
+        """
+        doc_index = len(self.doc_lengths)
+        for term, count in Counter(terms).items():
+            self.postings.setdefault(term, []).append([doc_index, count])
+        self.doc_lengths.append(len(terms))
+        self._total_length += len(terms)
+
+    def document_frequency(self, term: str) -> int:
+        """Number of documents containing a term."""
+        return len(self.postings.get(term, ()))
+
+    def idf(self, term: str) -> float:
+        """BM25 inverse document frequency of a term."""
+        df = self.document_frequency(term)
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, terms: list[str], limit: int) -> list[tuple[int, float]]:
+        """Score documents for a query.
+
+        Args:
+            terms: Query terms (see tokenize)
+            limit: Maximum number of hits
+
+        Returns:
+            (doc index, BM25 score) pairs, best first
+        """
+        if not self.doc_lengths:
+            return []
+
+        avgdl = self._total_length / len(self.doc_lengths) or 1.0
+        scores: dict[int, float] = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_index, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / avgdl)
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit]
+
+    def containing_all(self, terms: list[str]) -> set[int]:
+        """Documents that contain every one of the terms.
+
+        Args:
+            terms: Terms to match
+
+        Returns:
+            Matching doc indexes (empty if terms is empty)
+        """
+        matches: set[int] | None = None
+        for term in sorted(set(terms), key=self.document_frequency):
+            docs = {doc_index for doc_index, _ in self.postings.get(term, ())}
+            matches = docs if matches is None else matches & docs
+            if not matches:
+                return set()
+        return matches or set()
+
+    def save(self, path: Path, doc_ids: list[str]) -> None:
+        """Persist the index next to the KB.
+
+        Args:
+            path: Index file path
+            doc_ids: IDs of the indexed documents, in index order
+        """
+        data = {
+            "version": INDEX_VERSION,
+            "fingerprint": fingerprint(doc_ids),
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path, doc_ids: list[str]) -> "BM25Index | None":
+        """Load a persisted index if it matches the documents.
+
+        Args:
+            path: Index file path
+            doc_ids: IDs of the store's documents, in order
+
+        Returns:
+            The index, or None if it is missing, unreadable or stale
+        """
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load lexical index {path}: {e}")
+            return None
+
+        if data.get("version") != INDEX_VERSION or data.get("fingerprint") != fingerprint(doc_ids):
+            logger.info(f"Lexical index {path} is out of date")
+            return None
+
+        index = cls()
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = data["postings"]
+        index._total_length = sum(index.doc_lengths)
+        return index
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> dict[int, float]:
+    """Fuse several rankings of doc indexes with reciprocal rank fusion.
+
+    Args:
+        rankings: Doc indexes, best first, one list per retriever
+        k: Rank smoothing constant (60 is the usual choice)
+
+    Returns:
+        Doc index -> fused score
+    """
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_index in enumerate(ranking):
+            fused[doc_index] = fused.get(doc_index, 0.0) + 1.0 / (k + rank + 1)
+    return fused
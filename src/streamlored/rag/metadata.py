@@ -0,0 +1,69 @@
+"""Structured chunk metadata derived from the docs folder layout."""
+
+import re
+from pathlib import Path
+from typing import Any
+
+# Metadata fields that get posting lists and can be used as query filters
+FILTER_FIELDS = ("series", "path", "source", "section_title")
+
+# Folder suffixes that don't belong in a series name, e.g. "dead_space_knowledge_base"
+SERIES_SUFFIXES = ("_knowledge_base", "_information", "_info", "_docs")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a game or folder name and reduce it to words joined by "_".
+
+    Args:
+        name: Name like "Resident Evil 2" or "resident_evil_knowledge_base"
+
+    Returns:
+        Normalized name like "resident_evil_2"
+    """
+    return "_".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def path_metadata(file_path: Path, root: Path) -> dict[str, Any]:
+    """Get metadata for a document from where it sits under the docs folder.
+
+    The top-level folder names the series (".../dead_space_knowledge_base/x.md"
+    belongs to "dead_space"); files directly in the root have no series.
+
+    Args:
+        file_path: Document file
+        root: Docs folder being ingested
+
+    Returns:
+        Metadata with "path" (relative to root) and, if any, "series"
+    """
+    relative = file_path.relative_to(root)
+    metadata: dict[str, Any] = {"path": relative.as_posix()}
+    if len(relative.parts) > 1:
+        series = normalize_name(relative.parts[0])
+        for suffix in SERIES_SUFFIXES:
+            if series.endswith(suffix):
+                series = series[: -len(suffix)]
+                break
+        metadata["series"] = series
+    return metadata
+
+
+def series_for_game(game_name: str | None, known_series: list[str]) -> list[str]:
+    """Find the KB series a Twitch game belongs to.
+
+    A series matches when its words appear in order at the start of the game
+    name, so "Resident Evil 2" and "Resident Evil: Code Veronica" both map to
+    "resident_evil".
+
+    Args:
+        game_name: Twitch game name (None if unknown)
+        known_series: Series values present in the KB
+
+    Returns:
+        Matching series, longest first (empty if none match)
+    """
+    if not game_name:
+        return []
+    game = normalize_name(game_name)
+    matches = [s for s in known_series if game == s or game.startswith(f"{s}_")]
+    return sorted(matches, key=len, reverse=True)
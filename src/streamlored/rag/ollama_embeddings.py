@@ -1,50 +1,183 @@
 """Ollama-based embedding provider for RAG."""
 
+from array import array
+from collections import OrderedDict
+from typing import Any
+
 import httpx
 
+from streamlored import metrics
+from streamlored.llm.backend_pool import OllamaBackendPool
+from streamlored.llm.ollama_client import keep_alive_value
 from streamlored.rag import EmbeddingProvider
+from streamlored.tracing import span
+
+
+def endpoint_missing(response: httpx.Response) -> bool:
+    """Whether a 404 means the server lacks the endpoint, not the model.
+
+    Ollama answers an unknown model with a JSON error ("model ... not found,
+    try pulling it first"); servers that predate an endpoint answer with the
+    router's plain-text "404 page not found".
+
+    Args:
+        response: Response from the Ollama server
+
+    Returns:
+        True if the endpoint itself does not exist
+    """
+    if response.status_code != 404:
+        return False
+    try:
+        return "error" not in response.json()
+    except ValueError:
+        return True
 
 
 class OllamaEmbeddingProvider(EmbeddingProvider):
     """Embedding provider using Ollama's embedding API."""
 
-    def __init__(self, base_url: str, model: str, timeout: float = 60.0):
+    def __init__(
+        self,
+        base_url: str,
+        model: str,
+        timeout: float = 60.0,
+        batch_size: int = 64,
+        cache_size: int = 0,
+        pool: OllamaBackendPool | None = None,
+        keep_alive: str | None = None,
+    ):
         """Initialize the Ollama embedding provider.
 
         Args:
             base_url: Base URL of the Ollama server
             model: Model name to use for embeddings (e.g., nomic-embed-text)
             timeout: Request timeout in seconds
+            batch_size: Maximum number of texts sent in one /api/embed request
+            cache_size: Number of recent text embeddings to keep (0 disables caching)
+            pool: Optional backend pool to route requests through; defaults to
+                a single backend at base_url
+            keep_alive: Optional duration the embedding model stays loaded (e.g. "30m")
         """
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.cache_size = max(0, cache_size)
+        # Older Ollama servers only have the one-text-per-request endpoint
+        self._batch_supported = True
+        self.pool = pool or OllamaBackendPool.single(self.base_url, timeout=timeout)
+        self.keep_alive = keep_alive
+        # LRU of text -> packed float32 embedding
+        self._cache: OrderedDict[str, array] = OrderedDict()
+
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.pool.close()
+
+    async def warm_up(self) -> bool:
+        """Load the embedding model on every embed backend without embedding anything.
+
+        Returns:
+            True if at least one backend loaded the model
+        """
+        return await self.pool.broadcast("embed", "/api/embed", self._payload(input=[])) > 0
 
     async def embed(self, texts: list[str]) -> list[list[float]]:
         """Generate embeddings for the given texts.
 
+        Uses the batched /api/embed endpoint so N texts cost one round trip,
+        falling back to /api/embeddings on servers that predate it. Texts seen
+        recently are served from the cache without a request.
+
         Args:
             texts: List of text strings to embed
 
         Returns:
             List of embedding vectors
         """
+        if not texts:
+            return []
+
+        if not self.cache_size:
+            return await self._embed_uncached(texts)
+
+        missing = [text for text in dict.fromkeys(texts) if text not in self._cache]
+        metrics.embed_cache_lookups.labels("hit").inc(len(texts) - len(missing))
+        metrics.embed_cache_lookups.labels("miss").inc(len(missing))
+        if missing:
+            for text, embedding in zip(missing, await self._embed_uncached(missing)):
+                self._cache[text] = array("f", embedding)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
         embeddings = []
+        for text in texts:
+            cached = self._cache.get(text)
+            if cached is None:
+                # Evicted by this same call (batch larger than the cache)
+                cached = array("f", (await self._embed_uncached([text]))[0])
+            else:
+                self._cache.move_to_end(text)
+            embeddings.append(cached.tolist())
+        return embeddings
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for documents being ingested, bypassing the cache.
+
+        Args:
+            texts: List of text strings to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        if not texts:
+            return []
+        return await self._embed_uncached(texts)
+
+    def _payload(self, **fields: Any) -> dict[str, Any]:
+        """Build an embedding request body with the model and keep_alive."""
+        payload: dict[str, Any] = {"model": self.model, **fields}
+        if self.keep_alive:
+            payload["keep_alive"] = keep_alive_value(self.keep_alive)
+        return payload
+
+    async def _embed_uncached(self, texts: list[str]) -> list[list[float]]:
+        """Request embeddings from the Ollama server."""
+        with span("embed"):
+            embeddings: list[list[float]] = []
+
+            if self._batch_supported:
+                for start in range(0, len(texts), self.batch_size):
+                    with metrics.ollama_request("embed", self.model):
+                        response = await self.pool.post(
+                            "embed",
+                            "/api/embed",
+                            self._payload(input=texts[start:start + self.batch_size]),
+                        )
+                        # A model that isn't pulled yet also 404s; that raises below
+                        if endpoint_missing(response):
+                            self._batch_supported = False
+                            embeddings = []
+                            break
+                        response.raise_for_status()
+                    data = response.json()
+                    embeddings.extend(data["embeddings"])
+                else:
+                    return embeddings
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
             for text in texts:
-                response = await client.post(
-                    f"{self.base_url}/api/embeddings",
-                    json={
-                        "model": self.model,
-                        "prompt": text,
-                    },
-                )
-                response.raise_for_status()
+                with metrics.ollama_request("embed", self.model):
+                    response = await self.pool.post(
+                        "embed",
+                        "/api/embeddings",
+                        self._payload(prompt=text),
+                    )
+                    response.raise_for_status()
                 data = response.json()
                 embeddings.append(data["embedding"])
 
-        return embeddings
+            return embeddings
 
     async def embed_single(self, text: str) -> list[float]:
         """Generate embedding for a single text.
@@ -0,0 +1,146 @@
+"""Token-budgeted packing of KB results and chat history into prompt context."""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+# Rough characters per token for English text with Llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Separator between KB chunks in the packed context
+CHUNK_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheaply estimate how many tokens a text costs.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def format_kb_chunk(doc: dict[str, Any]) -> str:
+    """Format one KB result as a labelled "[source - section]:" block.
+
+    Args:
+        doc: KB query result
+
+    Returns:
+        Context block for the prompt
+    """
+    source = doc.get("metadata", {}).get("source", "unknown")
+    section = doc.get("metadata", {}).get("section_title", "")
+    if section:
+        return f"[{source} - {section}]:\n{doc['content']}"
+    return f"[{source}]:\n{doc['content']}"
+
+
+@dataclass
+class PackedContext:
+    """Context that fits the budget, plus what was left out and why."""
+
+    results: list[dict[str, Any]] = field(default_factory=list)
+    kb_context: str = ""
+    chat_context: str = ""
+    tokens: int = 0
+    budget: int = 0
+    duplicates_dropped: int = 0
+    chunks_dropped: int = 0
+    chat_lines_dropped: int = 0
+    truncated: bool = False
+
+    def summary(self) -> str:
+        """One-line description of the packing decisions, for logging."""
+        budget = self.budget if self.budget else "unlimited"
+        return (
+            f"~{self.tokens} tokens (budget {budget}): {len(self.results)} KB chunks "
+            f"({self.duplicates_dropped} same-section, {self.chunks_dropped} over budget dropped), "
+            f"{len(self.chat_context.splitlines())} chat lines ({self.chat_lines_dropped} dropped)"
+            + (", top chunk truncated" if self.truncated else "")
+        )
+
+
+def pack_context(
+    results: list[dict[str, Any]] | None,
+    chat_context: str = "",
+    *,
+    budget: int,
+    reserved: str = "",
+) -> PackedContext:
+    """Fit KB results and chat history into a token budget.
+
+    Only the best-scoring chunk per source section is kept. If the total is
+    still over budget, chat history is trimmed first (oldest lines first),
+    then the lowest-scoring chunks are dropped. The best chunk always stays,
+    cut short if it alone exceeds the budget.
+
+    Args:
+        results: KB query results, best first
+        chat_context: Recent chat history, one message per line, oldest first
+        budget: Maximum estimated tokens for everything (0 disables the limit)
+        reserved: Text that is always sent alongside (game context, the question)
+            and counts against the budget
+
+    Returns:
+        The packed context and packing statistics
+    """
+    packed = PackedContext(budget=budget)
+
+    # Keep only the best chunk from each section; results are sorted by score
+    chunks: list[dict[str, Any]] = []
+    seen_sections: set[tuple[str, str]] = set()
+    for doc in results or []:
+        metadata = doc.get("metadata", {})
+        section = metadata.get("section_title")
+        key = (metadata.get("source", ""), section)
+        if section and key in seen_sections:
+            packed.duplicates_dropped += 1
+            continue
+        seen_sections.add(key)
+        chunks.append(doc)
+
+    blocks = [format_kb_chunk(doc) for doc in chunks]
+    block_tokens = [estimate_tokens(block + CHUNK_SEPARATOR) for block in blocks]
+    chat_lines = chat_context.splitlines() if chat_context else []
+    line_tokens = [estimate_tokens(line + "\n") for line in chat_lines]
+    reserved_tokens = estimate_tokens(reserved)
+
+    total = reserved_tokens + sum(block_tokens) + sum(line_tokens)
+
+    if budget > 0:
+        # Chat history goes first, oldest messages first
+        dropped_lines: list[tuple[str, int]] = []
+        while total > budget and chat_lines:
+            dropped_lines.append((chat_lines.pop(0), line_tokens.pop(0)))
+            total -= dropped_lines[-1][1]
+
+        # Then the weakest KB matches, keeping at least the best one
+        while total > budget and len(blocks) > 1:
+            chunks.pop()
+            blocks.pop()
+            total -= block_tokens.pop()
+            packed.chunks_dropped += 1
+
+        # Dropping a chunk may have freed room for the newest chat lines again
+        while dropped_lines and total + dropped_lines[-1][1] <= budget:
+            line, tokens = dropped_lines.pop()
+            chat_lines.insert(0, line)
+            total += tokens
+        packed.chat_lines_dropped = len(dropped_lines)
+
+        # Last resort: cut the best chunk down to what's left
+        if total > budget and blocks:
+            available = max(0, budget - reserved_tokens) * CHARS_PER_TOKEN
+            blocks[0] = blocks[0][:available].rstrip()
+            packed.truncated = True
+            total = reserved_tokens + estimate_tokens(blocks[0])
+
+    packed.results = chunks
+    packed.kb_context = CHUNK_SEPARATOR.join(blocks)
+    packed.chat_context = "\n".join(chat_lines)
+    packed.tokens = total
+    return packed
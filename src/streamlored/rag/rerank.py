@@ -0,0 +1,158 @@
+"""Second-stage reranking of KB candidates: cross-scoring and MMR diversity.
+
+Plain top-k retrieval often returns several adjacent chunks of the same
+section. Reranking takes the best few dozen candidates instead, optionally
+rescores them against the query with a Reranker, and then picks the final
+results with maximal marginal relevance (MMR): each pick is the candidate
+with the best trade-off between relevance and similarity to the chunks
+already picked, measured on the vectors the store already holds in memory.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any
+
+from streamlored.rag.lexical import tokenize
+from streamlored.rag.vectors import VectorIndex
+
+# Candidates considered per query when reranking or diversifying
+DEFAULT_RERANK_CANDIDATES = 20
+
+
+class Reranker(ABC):
+    """Rescores retrieved chunks against the query."""
+
+    @abstractmethod
+    def score(self, query: str, documents: list[dict[str, Any]], relevance: list[float]) -> list[float]:
+        """Score candidates for a query.
+
+        Args:
+            query: The search query
+            documents: Candidate chunks with "content" and "metadata", best first
+            relevance: First-stage relevance of each candidate, scaled to 0..1
+
+        Returns:
+            New relevance per candidate (higher is better)
+        """
+        pass
+
+
+class TermOverlapReranker(Reranker):
+    """Blends first-stage relevance with how many query terms a chunk contains.
+
+    Cheap enough to run on every query: it only tokenizes the candidates.
+    Chunks whose text or section title covers more of the question move up.
+    """
+
+    def __init__(self, weight: float = 0.5) -> None:
+        """Create the reranker.
+
+        Args:
+            weight: Share of the final score taken by query-term coverage
+        """
+        self.weight = weight
+
+    def score(self, query: str, documents: list[dict[str, Any]], relevance: list[float]) -> list[float]:
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return relevance
+        scores = []
+        for doc, first_stage in zip(documents, relevance):
+            terms = set(tokenize(doc.get("content", "")))
+            terms.update(tokenize(doc.get("metadata", {}).get("section_title", "")))
+            coverage = len(query_terms & terms) / len(query_terms)
+            scores.append((1 - self.weight) * first_stage + self.weight * coverage)
+        return scores
+
+
+# Built-in rerankers by KB_RERANKER name
+RERANKERS: dict[str, type[Reranker]] = {
+    "overlap": TermOverlapReranker,
+}
+
+
+def make_reranker(name: str) -> Reranker | None:
+    """Create a built-in reranker by name.
+
+    Args:
+        name: A RERANKERS key, or "none"
+
+    Returns:
+        The reranker, or None for "none"
+    """
+    if name == "none":
+        return None
+    if name not in RERANKERS:
+        raise ValueError(f"Unknown reranker: {name}")
+    return RERANKERS[name]()
+
+
+def mmr(relevance: list[float], similarity: list[list[float]], top_k: int, diversity: float) -> list[int]:
+    """Pick results by maximal marginal relevance.
+
+    Args:
+        relevance: Relevance of each candidate to the query, scaled to 0..1
+        similarity: Candidate-to-candidate similarity matrix
+        top_k: Number of candidates to pick
+        diversity: Weight of dissimilarity to the picked candidates (0 = plain ranking)
+
+    Returns:
+        Positions of the picked candidates, in pick order
+    """
+    remaining = list(range(len(relevance)))
+    picked: list[int] = []
+    # Highest similarity of each candidate to anything picked so far
+    redundancy = [0.0] * len(relevance)
+    while remaining and len(picked) < top_k:
+        best = max(remaining, key=lambda p: (1 - diversity) * relevance[p] - diversity * redundancy[p])
+        remaining.remove(best)
+        picked.append(best)
+        for p in remaining:
+            redundancy[p] = max(redundancy[p], similarity[best][p])
+    return picked
+
+
+def rerank(
+    query: str,
+    candidates: list[tuple[int, dict[str, Any]]],
+    top_k: int,
+    vectors: VectorIndex,
+    reranker: Reranker | None = None,
+    diversity: float = 0.0,
+) -> list[dict[str, Any]]:
+    """Rerank a query's candidates and pick its final results.
+
+    Args:
+        query: The search query
+        candidates: (doc index, result) pairs, best first
+        top_k: Number of results to return
+        vectors: The store's vectors, for candidate-to-candidate similarity
+        reranker: Optional cross-scoring stage run before selection
+        diversity: MMR weight of dissimilarity to earlier results (0 = off)
+
+    Returns:
+        Final results; reranked ones carry "rerank_score"
+    """
+    if not candidates:
+        return []
+    results = [result for _, result in candidates]
+    relevance = _scale([result.get("fusion_score", result["score"]) for result in results])
+
+    if reranker is not None:
+        scores = reranker.score(query, results, relevance)
+        for result, score in zip(results, scores):
+            result["rerank_score"] = score
+        relevance = _scale(scores)
+
+    if diversity <= 0:
+        order = sorted(range(len(results)), key=lambda p: -relevance[p])[:top_k]
+        return [results[p] for p in order]
+
+    doc_indexes = [doc_index for doc_index, _ in candidates]
+    similarity = vectors.scores([vectors.approximate(i) for i in doc_indexes], doc_indexes)
+    return [results[p] for p in mmr(relevance, similarity, top_k, diversity)]
+
+
+def _scale(values: list[float]) -> list[float]:
+    """Min-max scale scores to 0..1 (all 1.0 if they are equal)."""
+    low, high = min(values), max(values)
+    return [(value - low) / (high - low) if high > low else 1.0 for value in values]
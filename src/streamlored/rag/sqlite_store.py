@@ -0,0 +1,700 @@
+"""SQLite-backed document store for RAG.
+
+Chunks live in one table with an FTS5 index for keyword search and their
+embeddings as float32 BLOBs; the embeddings are loaded into a VectorIndex when
+the store opens. WAL mode lets the bot and several workers read the database
+while an ingest writes to it; a store notices other processes' commits on its
+next query and reloads.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
+import struct
+import threading
+import uuid
+from pathlib import Path
+from typing import Any
+
+from streamlored.rag import DocumentStore
+from streamlored.rag.json_store import (
+    EXACT_MATCH_MAX_DF,
+    EXACT_MATCH_MAX_TERMS,
+    FILTER_FALLBACK_MIN_SCORE,
+    FUSION_CANDIDATES,
+    RETRIEVAL_MODES,
+    normalize,
+)
+from streamlored.rag.lexical import TITLE_WEIGHT, reciprocal_rank_fusion, tokenize
+from streamlored.rag.metadata import FILTER_FIELDS, series_for_game
+from streamlored.rag.ollama_embeddings import OllamaEmbeddingProvider
+from streamlored.rag.rerank import DEFAULT_RERANK_CANDIDATES, Reranker, rerank
+from streamlored.rag.vectors import VectorIndex
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS chunks (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    {", ".join(f"{field} TEXT" for field in FILTER_FIELDS)},
+    embedding BLOB NOT NULL
+);
+{"".join(f"CREATE INDEX IF NOT EXISTS chunks_{field} ON chunks ({field});" for field in FILTER_FIELDS)}
+
+-- Keep "%", "+" and "_" inside tokens, like lexical.tokenize ("any%", "ng+")
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content, section_title,
+    content='chunks', content_rowid='rowid',
+    tokenize="unicode61 tokenchars '%+_'"
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks_fts, 'row');
+
+CREATE TRIGGER IF NOT EXISTS chunks_insert AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts (rowid, content, section_title)
+    VALUES (new.rowid, new.content, new.section_title);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_delete AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts (chunks_fts, rowid, content, section_title)
+    VALUES ('delete', old.rowid, old.content, old.section_title);
+END;
+"""
+
+
+def fts_query(terms: list[str], operator: str = "OR") -> str:
+    """Build an FTS5 MATCH expression from search terms.
+
+    Args:
+        terms: Search terms (see lexical.tokenize)
+        operator: "OR" to rank by any term, "AND" to require all of them
+
+    Returns:
+        MATCH expression with every term quoted
+    """
+    quoted = ['"' + term.replace('"', '""') + '"' for term in dict.fromkeys(terms)]
+    return f" {operator} ".join(quoted)
+
+
+class SQLiteDocumentStore(DocumentStore):
+    """Document store that persists to a SQLite database."""
+
+    def __init__(
+        self,
+        kb_path: str,
+        embedding_provider: OllamaEmbeddingProvider,
+        retrieval: str = "hybrid",
+        lexical_shortcut: bool = True,
+        precision: str = "float32",
+        rescore: bool = True,
+        diversity: float = 0.0,
+        reranker: Reranker | None = None,
+        rerank_candidates: int = DEFAULT_RERANK_CANDIDATES,
+    ):
+        """Open (and create if needed) the knowledge base database.
+
+        Args:
+            kb_path: Path to the SQLite database file
+            embedding_provider: Provider for generating embeddings
+            retrieval: "vector" or "hybrid" (vector + FTS5 BM25 with rank fusion)
+            lexical_shortcut: In hybrid mode, answer short exact-term queries from
+                the FTS index without an embedding request
+            precision: In-memory embedding precision: "float32", "float16" or "int8"
+            rescore: With float16/int8, rescore the best candidates against the
+                float32 copies kept in a memory-mapped sidecar file
+            diversity: MMR weight of dissimilarity between results (0 = plain top-k)
+            reranker: Optional cross-scoring stage over the top candidates
+            rerank_candidates: Candidates per query for the reranker and MMR
+        """
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
+        self.kb_path = Path(kb_path)
+        self.embedding_provider = embedding_provider
+        self.retrieval = retrieval
+        self.lexical_shortcut = lexical_shortcut
+        self.precision = precision
+        self.rescore = rescore
+        self.diversity = diversity
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+
+        self.kb_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.kb_path,
+            timeout=30.0,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        # One connection is shared by asyncio.to_thread calls; keep transactions from interleaving
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        # Row IDs in order; text and metadata stay in the database until a query returns them
+        self._rowids: list[int] = []
+        self._vectors = VectorIndex(precision, rescore)
+        # Row ID -> doc index, and indexes of documents deleted since loading
+        self._indexes: dict[int, int] = {}
+        self._deleted: set[int] = set()
+        # Changes when another connection commits
+        self._data_version = -1
+
+        self._load()
+
+    def _load(self) -> None:
+        """Load the embeddings of all chunks from the database."""
+        self._rowids = []
+        self._indexes = {}
+        self._deleted = set()
+        self._vectors.close()
+        self._vectors = VectorIndex(self.precision, self.rescore)
+
+        with self._lock:
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            for rowid, embedding in self._conn.execute("SELECT rowid, embedding FROM chunks ORDER BY rowid"):
+                self._indexes[rowid] = len(self._rowids)
+                self._rowids.append(rowid)
+                self._vectors.add(list(struct.unpack(f"<{len(embedding) // 4}f", embedding)))
+        self._vectors.attach_sidecar(self.kb_path.parent)
+
+        if self._rowids:
+            logger.info(f"Loaded {len(self._rowids)} documents from {self.kb_path}")
+
+    def _refresh(self) -> None:
+        """Reload if another process has committed changes since the last load."""
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            logger.info(f"Knowledge base {self.kb_path} changed on disk, reloading")
+            self._load()
+
+    def close(self) -> None:
+        """Close the database connection and the vector sidecar."""
+        self._vectors.close()
+        with self._lock:
+            self._conn.close()
+
+    def metadata_values(self, field: str) -> list[str]:
+        """List the distinct values of a metadata field.
+
+        Args:
+            field: One of FILTER_FIELDS
+
+        Returns:
+            Values present in the KB
+        """
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown metadata field: {field}")
+        with self._lock:
+            rows = self._conn.execute(f"SELECT DISTINCT {field} FROM chunks WHERE {field} IS NOT NULL").fetchall()
+        return [row[0] for row in rows]
+
+    def filters_for_game(self, game_name: str | None) -> dict[str, list[str]] | None:
+        """Build query filters that restrict a search to a game's series.
+
+        Args:
+            game_name: Twitch game name (None if unknown)
+
+        Returns:
+            Filters for query_many, or None if the game matches no series in the KB
+        """
+        series = series_for_game(game_name, self.metadata_values("series"))
+        return {"series": series} if series else None
+
+    def _candidates(self, filters: dict[str, str | list[str]]) -> list[int]:
+        """Documents matching every filter field (any of the values per field), via the column indexes.
+
+        Args:
+            filters: Field -> value or list of values
+
+        Returns:
+            Matching doc indexes in order
+        """
+        clauses = []
+        params: list[str] = []
+        for field, values in filters.items():
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Unknown metadata field: {field}")
+            if isinstance(values, str):
+                values = [values]
+            if not values:
+                return []
+            clauses.append(f"{field} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        with self._lock:
+            rows = self._conn.execute(f"SELECT rowid FROM chunks WHERE {' AND '.join(clauses)}", params).fetchall()
+        indexes = (self._indexes.get(rowid) for rowid, in rows)
+        return sorted(i for i in indexes if i is not None and i not in self._deleted)
+
+    def document_ids(self, filters: dict[str, str | list[str]]) -> list[str]:
+        """IDs of the documents whose metadata matches filters, e.g. {"path": "re/enemies.md"}.
+
+        Args:
+            filters: Field (see FILTER_FIELDS) -> value or list of values
+
+        Returns:
+            Matching document IDs
+        """
+        rowids = [self._rowids[i] for i in self._candidates(filters)]
+        if not rowids:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id FROM chunks WHERE rowid IN ({', '.join('?' * len(rowids))})", rowids
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _live_indexes(self) -> list[int]:
+        """Indexes of documents that are not deleted."""
+        return [i for i in range(len(self._rowids)) if i not in self._deleted]
+
+    def _search_scope(self, filters: dict[str, str | list[str]] | None) -> tuple[list[int], list[int]]:
+        """Documents a query searches, as indexes into the current load.
+
+        Args:
+            filters: Optional metadata filters (see query_many)
+
+        Returns:
+            All live doc indexes, and the ones matching the filters (the same
+            list object if there are no filters or nothing matches them)
+        """
+        all_docs = self._live_indexes()
+        if not filters or not all_docs:
+            return all_docs, all_docs
+        doc_indexes = self._candidates(filters)
+        if not doc_indexes:
+            logger.debug(f"No chunks match filters {filters} - searching the whole KB")
+            return all_docs, all_docs
+        return all_docs, doc_indexes
+
+    async def ingest_documents(self, documents: list[dict[str, Any]]) -> None:
+        """Ingest documents into the store in a single transaction.
+
+        Args:
+            documents: List of documents with 'content' and optional 'metadata' keys
+        """
+        if not documents:
+            return
+
+        entries, embeddings = await self._embed_entries(documents)
+        rowids, _, stale = await asyncio.to_thread(self._write, entries, embeddings)
+        self._apply_write(rowids, embeddings, [], stale)
+
+        logger.info(f"Ingested {len(documents)} documents")
+
+    async def replace_documents(self, doc_ids: list[str], documents: list[dict[str, Any]]) -> int:
+        """Swap documents for new ones, e.g. the chunks of an edited file.
+
+        The new documents are embedded first, then the deletions and additions
+        are committed in one transaction, so other processes see either the
+        old documents or the new ones.
+
+        Args:
+            doc_ids: IDs of the documents to delete
+            documents: Documents to add, with 'content' and optional 'metadata' keys
+
+        Returns:
+            Number of documents deleted
+        """
+        entries, embeddings = await self._embed_entries(documents) if documents else ([], [])
+        doc_ids = list(dict.fromkeys(doc_ids))
+        if not doc_ids and not entries:
+            return 0
+
+        rowids, deleted, stale = await asyncio.to_thread(self._write, entries, embeddings, doc_ids)
+        self._apply_write(rowids, embeddings, deleted, stale)
+
+        logger.info(f"Replaced {len(deleted)} documents with {len(entries)}")
+        return len(deleted)
+
+    async def _embed_entries(self, documents: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[list[float]]]:
+        """Embed documents and give them IDs.
+
+        Args:
+            documents: Documents with 'content' and optional 'metadata' keys
+
+        Returns:
+            Entries with "id", "content" and "metadata", and their embeddings
+        """
+        contents = [doc.get("content", "") for doc in documents]
+        logger.info(f"Generating embeddings for {len(documents)} documents...")
+        embeddings = await self.embedding_provider.embed_documents(contents)
+
+        entries = [
+            {
+                "id": str(uuid.uuid4()),
+                "content": doc.get("content", ""),
+                "metadata": doc.get("metadata", {}),
+            }
+            for doc in documents
+        ]
+        return entries, embeddings
+
+    def _apply_write(
+        self,
+        rowids: list[int],
+        embeddings: list[list[float]],
+        deleted: list[int],
+        stale: bool,
+    ) -> None:
+        """Make a committed write visible to queries.
+
+        Args:
+            rowids: Row IDs of the inserted chunks
+            embeddings: Their embeddings, in the same order
+            deleted: Row IDs of the deleted chunks
+            stale: Whether other connections committed before the write, in
+                which case the whole KB is reloaded to pick their rows up too
+        """
+        if stale:
+            logger.info(f"Knowledge base {self.kb_path} changed on disk, reloading")
+            self._load()
+            return
+        self._deleted.update(self._indexes[rowid] for rowid in deleted if rowid in self._indexes)
+        for rowid, embedding in zip(rowids, embeddings):
+            self._indexes[rowid] = len(self._rowids)
+            self._rowids.append(rowid)
+            self._vectors.add(embedding)
+        self._vectors.attach_sidecar(self.kb_path.parent)
+
+    def _write(
+        self,
+        entries: list[dict[str, Any]],
+        embeddings: list[list[float]],
+        delete_ids: list[str] | None = None,
+    ) -> tuple[list[int], list[int], bool]:
+        """Delete and insert chunks in one transaction.
+
+        Args:
+            entries: Documents with "id", "content" and "metadata"
+            embeddings: Their embeddings, in the same order
+            delete_ids: IDs of chunks to delete first
+
+        Returns:
+            Row IDs of the inserted chunks and of the deleted ones, and whether
+            other connections had committed since the last load
+        """
+        columns = ", ".join(FILTER_FIELDS)
+        placeholders = ", ".join("?" * (len(FILTER_FIELDS) + 4))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Commits by other connections since the last load; our own don't change it
+                stale = self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version
+                deleted = []
+                for doc_id in delete_ids or []:
+                    row = self._conn.execute("DELETE FROM chunks WHERE id = ? RETURNING rowid", (doc_id,)).fetchone()
+                    if row:
+                        deleted.append(row[0])
+                rowids = []
+                for entry, embedding in zip(entries, embeddings):
+                    metadata = entry["metadata"]
+                    cursor = self._conn.execute(
+                        f"INSERT INTO chunks (id, content, metadata, {columns}, embedding) VALUES ({placeholders})",
+                        (
+                            entry["id"],
+                            entry["content"],
+                            json.dumps(metadata, ensure_ascii=False),
+                            *(str(metadata[f]) if metadata.get(f) else None for f in FILTER_FIELDS),
+                            struct.pack(f"<{len(embedding)}f", *embedding),
+                        ),
+                    )
+                    rowids.append(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rowids, deleted, stale
+
+    async def delete_documents(self, doc_ids: list[str]) -> int:
+        """Delete documents by ID.
+
+        Args:
+            doc_ids: IDs of the documents to delete
+
+        Returns:
+            Number of documents deleted
+        """
+        doc_ids = list(dict.fromkeys(doc_ids))
+        if not doc_ids:
+            return 0
+
+        _, rowids, stale = await asyncio.to_thread(self._write, [], [], doc_ids)
+        self._apply_write([], [], rowids, stale)
+        if rowids:
+            logger.info(f"Deleted {len(rowids)} documents")
+        return len(rowids)
+
+    async def compact(self) -> None:
+        """Merge the FTS index segments, checkpoint the WAL and drop deleted documents from memory."""
+
+        def optimize() -> None:
+            with self._lock:
+                self._conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        await asyncio.to_thread(optimize)
+        if self._deleted:
+            self._load()
+
+    async def query_knowledge_base(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Query the knowledge base for relevant documents.
+
+        Args:
+            query: The search query
+            top_k: Number of results to return
+            filters: Optional metadata filters (see query_many)
+
+        Returns:
+            List of relevant document chunks with scores
+        """
+        results = await self.query_many([query], top_k=top_k, filters=filters)
+        return results[0]
+
+    async def query_many(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        filters: dict[str, str | list[str]] | None = None,
+        lexical_shortcut: bool | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Query the knowledge base with several queries at once.
+
+        Behaves like JsonDocumentStore.query_many, with FTS5 providing the
+        BM25 ranking and SQL indexes the metadata filtering.
+
+        Args:
+            queries: The search queries
+            top_k: Number of results to return per query
+            filters: Optional metadata filters: field (see FILTER_FIELDS) -> value
+                or list of accepted values
+            lexical_shortcut: Override the store's lexical_shortcut setting
+
+        Returns:
+            One list of relevant document chunks with scores per query ("score"
+            is None for lexical shortcut matches)
+        """
+        if not queries:
+            return []
+        self._refresh()
+
+        all_docs, doc_indexes = self._search_scope(filters)
+        if not all_docs:
+            return [[] for _ in queries]
+        filtered = doc_indexes is not all_docs
+
+        hybrid = self.retrieval == "hybrid"
+        results: list[list[dict[str, Any]] | None] = [None] * len(queries)
+        query_terms = [tokenize(query) for query in queries] if hybrid else []
+
+        # Short exact-token queries ("any%", "Hunter") skip the embedding round trip
+        if lexical_shortcut is None:
+            lexical_shortcut = self.lexical_shortcut
+        if hybrid and lexical_shortcut:
+            for i, terms in enumerate(query_terms):
+                results[i] = self._exact_matches(terms, top_k, doc_indexes if filtered else None)
+
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            embeddings = await self.embedding_provider.embed([queries[i] for i in pending])
+
+            # Another query may have reloaded (renumbering the documents) during
+            # the await, so refresh and take the indexes again; from here on
+            # nothing yields to the event loop
+            self._refresh()
+            all_docs, doc_indexes = self._search_scope(filters)
+            if not all_docs:
+                return [result or [] for result in results]
+            filtered = doc_indexes is not all_docs
+
+            query_vectors = [normalize(vec) for vec in embeddings]
+            if len(query_vectors[0]) != self._vectors.dim:
+                raise ValueError("Query embedding dimension does not match the knowledge base")
+
+            rows = self._vectors.scores(query_vectors, doc_indexes)
+            row_docs = [doc_indexes] * len(rows)
+
+            if filtered:
+                retry = [n for n, row in enumerate(rows) if max(row) < FILTER_FALLBACK_MIN_SCORE]
+                if retry:
+                    logger.debug(f"{len(retry)} filtered queries fell back to the whole KB")
+                    global_rows = self._vectors.scores([query_vectors[n] for n in retry], all_docs)
+                    for n, row in zip(retry, global_rows):
+                        rows[n] = row
+                        row_docs[n] = all_docs
+
+            for n, i in enumerate(pending):
+                terms = query_terms[i] if hybrid else []
+                results[i] = self._rank(rows[n], row_docs[n], terms, top_k, queries[i])
+
+        return results
+
+    def _lexical_search(self, terms: list[str], operator: str = "OR") -> list[tuple[int, float]]:
+        """Rank documents by FTS5 BM25, section titles weighted like BM25Index.
+
+        Args:
+            terms: Query terms
+            operator: "OR" for any term, "AND" for all terms
+
+        Returns:
+            (doc index, BM25 score) pairs, best first
+        """
+        if not terms:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT rowid, -bm25(chunks_fts, 1.0, {float(TITLE_WEIGHT)}) AS score FROM chunks_fts "
+                "WHERE chunks_fts MATCH ? ORDER BY score DESC",
+                (fts_query(terms, operator),),
+            ).fetchall()
+        hits = [(self._indexes.get(rowid), score) for rowid, score in rows]
+        return [(doc, score) for doc, score in hits if doc is not None and doc not in self._deleted]
+
+    def _document_frequency(self, term: str) -> int:
+        """Number of documents containing a term, from the FTS vocabulary."""
+        with self._lock:
+            row = self._conn.execute("SELECT doc FROM chunks_vocab WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else 0
+
+    def _rank(
+        self,
+        row: list[float],
+        doc_indexes: list[int],
+        terms: list[str],
+        top_k: int,
+        query: str = "",
+    ) -> list[dict[str, Any]]:
+        """Turn one query's cosine scores into its top results.
+
+        With a reranker or diversity set, the best rerank_candidates are
+        reranked and the top_k results picked from them.
+
+        Args:
+            row: Cosine scores, parallel to doc_indexes
+            doc_indexes: Documents that were scored
+            terms: Query terms for BM25 fusion (empty in vector mode)
+            top_k: Number of results to return
+            query: The query text, for the reranker
+
+        Returns:
+            Top document chunks with scores
+        """
+        reranking = self.reranker is not None or self.diversity > 0
+        limit = max(top_k, self.rerank_candidates) if reranking else top_k
+        positions = range(len(row))
+        if self.retrieval != "hybrid":
+            top = heapq.nlargest(limit, positions, key=row.__getitem__)
+            hits = [(doc_indexes[p], row[p], {}) for p in top]
+        else:
+            cosine = {doc_indexes[p]: row[p] for p in positions}
+            vector_ranking = [doc_indexes[p] for p in heapq.nlargest(FUSION_CANDIDATES, positions, key=row.__getitem__)]
+            lexical_ranking = [doc for doc, _ in self._lexical_search(terms) if doc in cosine][:FUSION_CANDIDATES]
+            fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking])
+            top = heapq.nlargest(limit, fused, key=fused.__getitem__)
+            hits = [(doc, cosine[doc], {"fusion_score": fused[doc]}) for doc in top]
+
+        if reranking:
+            return rerank(query, self._hit_results(hits), top_k, self._vectors, self.reranker, self.diversity)
+        return self._results(hits)
+
+    def _exact_matches(
+        self,
+        terms: list[str],
+        top_k: int,
+        doc_indexes: list[int] | None = None,
+    ) -> list[dict[str, Any]] | None:
+        """Answer a query from the FTS index if it is a short, rare, exact-term query.
+
+        Args:
+            terms: Query terms
+            top_k: Number of results to return
+            doc_indexes: Only consider these documents (None for all)
+
+        Returns:
+            Chunks containing every term, best BM25 first, or None if the
+            query needs vector search
+        """
+        if not terms or len(set(terms)) > EXACT_MATCH_MAX_TERMS:
+            return None
+
+        max_df = max(1, int(len(self._rowids) * EXACT_MATCH_MAX_DF))
+        if any(self._document_frequency(term) > max_df for term in set(terms)):
+            return None
+
+        hits = self._lexical_search(terms, "AND")
+        if doc_indexes is not None:
+            allowed = set(doc_indexes)
+            hits = [(doc, score) for doc, score in hits if doc in allowed]
+        if not hits:
+            return None
+
+        logger.debug(f"Lexical match for {terms}: {len(hits)} chunks")
+        return self._results([
+            (doc, None, {"lexical_score": score})
+            for doc, score in hits[:top_k]
+        ])
+
+    def _results(self, hits: list[tuple[int, float | None, dict[str, float]]]) -> list[dict[str, Any]]:
+        """Build query results, fetching the hits' text and metadata in one query.
+
+        Args:
+            hits: (doc index, score, extra score fields) in result order
+
+        Returns:
+            Results for the hits still in the database
+        """
+        return [result for _, result in self._hit_results(hits)]
+
+    def _hit_results(self, hits: list[tuple[int, float | None, dict[str, float]]]) -> list[tuple[int, dict[str, Any]]]:
+        """Like _results, but paired with each result's doc index."""
+        rowids = [self._rowids[doc_index] for doc_index, _, _ in hits]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT rowid, id, content, metadata FROM chunks WHERE rowid IN ({', '.join('?' * len(rowids))})",
+                rowids,
+            ).fetchall()
+        docs = {rowid: (doc_id, content, metadata) for rowid, doc_id, content, metadata in rows}
+
+        results = []
+        for rowid, (doc_index, score, extra) in zip(rowids, hits):
+            if rowid not in docs:
+                continue
+            doc_id, content, metadata = docs[rowid]
+            results.append((doc_index, {
+                "id": doc_id,
+                "content": content,
+                "metadata": json.loads(metadata),
+                "score": score,
+                **extra,
+            }))
+        return results
+
+    def embeddings(self) -> list[list[float]]:
+        """Get the unit-length embeddings of all documents, at full stored precision."""
+        return [self._vectors.exact(i) for i in self._live_indexes()]
+
+    def document_count(self) -> int:
+        """Return the number of documents in the store."""
+        return len(self._rowids) - len(self._deleted)
+
+    def clear(self) -> None:
+        """Clear all documents from the store."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM chunks")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._load()
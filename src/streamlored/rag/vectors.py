@@ -0,0 +1,263 @@
+"""Compact in-memory vector storage with optional scalar quantization.
+
+Embeddings are kept unit-normalized in flat typed buffers instead of lists
+of Python floats (about 24 bytes per dimension as objects, 4 as float32):
+
+- float32: 4 bytes per dimension, exact scores
+- float16: 2 bytes per dimension, scores accurate to about 1e-3
+- int8: 1 byte per dimension plus one float32 scale per vector
+
+Quantized indexes keep a float32 copy in a private, memory-mapped sidecar
+file, so full precision costs disk space rather than RAM. It is used to rescore the
+best approximate candidates exactly and as the source when the KB is saved.
+"""
+
+import heapq
+import logging
+import mmap
+import operator
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Approximate candidates per query that get an exact float32 rescore
+RESCORE_CANDIDATES = 50
+
+
+def quantize_int8(vec: list[float]) -> tuple[array, float]:
+    """Symmetrically quantize a vector to int8.
+
+    Args:
+        vec: Vector to quantize
+
+    Returns:
+        (int8 codes, scale) with vec ~= codes * scale
+    """
+    peak = max(map(abs, vec), default=0.0)
+    if peak == 0:
+        return array("b", bytes(len(vec))), 0.0
+    scale = peak / 127
+    return array("b", (round(v / scale) for v in vec)), scale
+
+
+class Float32Sidecar:
+    """Private, memory-mapped file of float32 vectors for exact rescoring.
+
+    Like ContentFile, the file is an unlinked temporary file, so each index
+    (and each process sharing a KB) numbers its vectors in its own file and
+    can append to it without touching anyone else's.
+    """
+
+    def __init__(self, dim: int, directory: Path | None = None) -> None:
+        """Create an empty sidecar file.
+
+        Args:
+            dim: Vector dimension
+            directory: Where to create the file (e.g. next to the KB rather
+                than in a RAM-backed /tmp); the system default if None
+        """
+        self.dim = dim
+        self._file = tempfile.TemporaryFile(dir=directory, prefix="kb-vectors-")
+        self._mmap: mmap.mmap | None = None
+        self._struct = struct.Struct(f"<{dim}f")
+        self.count = 0
+
+    def extend(self, vectors: "VectorIndex") -> None:
+        """Append the exact vectors of an index past those already in the file.
+
+        Args:
+            vectors: Index whose first self.count vectors are already in the file
+        """
+        self._file.seek(self.count * self._struct.size)
+        for i in range(self.count, len(vectors)):
+            self._file.write(self._struct.pack(*vectors.exact(i)))
+        self._file.flush()
+        self.count = len(vectors)
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def vector(self, index: int) -> tuple[float, ...]:
+        """Read one vector."""
+        return self._struct.unpack_from(self._mmap, index * self._struct.size)
+
+    def close(self) -> None:
+        """Unmap and delete the file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+
+
+class VectorIndex:
+    """Unit-normalized vectors in one flat buffer, scored by dot product."""
+
+    def __init__(self, precision: str = "float32", rescore: bool = True) -> None:
+        """Initialize an empty index.
+
+        Args:
+            precision: "float32", "float16" or "int8"
+            rescore: For quantized precisions, rescore the best approximate
+                candidates exactly against the float32 copies
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision: {precision}")
+        self.precision = precision
+        self.rescore = rescore and precision != "float32"
+        self.dim = 0
+        self._count = 0
+        self._float32 = array("f")
+        self._float16 = bytearray()
+        self._int8 = array("b")
+        self._scales = array("f")
+        self._half: struct.Struct | None = None
+        # Exact copies: on disk for vectors already saved, in RAM until then
+        self.sidecar: Float32Sidecar | None = None
+        self._pending: dict[int, array] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of RAM used by the hot (scanned) vectors."""
+        if self.precision == "float32":
+            return len(self._float32) * self._float32.itemsize
+        if self.precision == "float16":
+            return len(self._float16)
+        return len(self._int8) + len(self._scales) * self._scales.itemsize
+
+    def add(self, vec: list[float]) -> None:
+        """Normalize and append a vector.
+
+        Args:
+            vec: Embedding vector
+        """
+        if not self.dim:
+            self.dim = len(vec)
+            self._half = struct.Struct(f"<{self.dim}e")
+        elif len(vec) != self.dim:
+            raise ValueError(f"Vector dimension {len(vec)} does not match index dimension {self.dim}")
+
+        norm = sum(v * v for v in vec) ** 0.5
+        unit = [v / norm for v in vec] if norm else [0.0] * self.dim
+
+        if self.precision == "float32":
+            self._float32.extend(unit)
+        else:
+            if self.precision == "float16":
+                self._float16 += self._half.pack(*unit)
+            else:
+                codes, scale = quantize_int8(unit)
+                self._int8.extend(codes)
+                self._scales.append(scale)
+            self._pending[self._count] = array("f", unit)
+        self._count += 1
+
+    def exact(self, index: int) -> list[float]:
+        """Get a vector at full stored precision (float32 when available).
+
+        Args:
+            index: Vector position
+
+        Returns:
+            The unit vector
+        """
+        if self.precision == "float32":
+            start = index * self.dim
+            return self._float32[start:start + self.dim].tolist()
+        pending = self._pending.get(index)
+        if pending is not None:
+            return pending.tolist()
+        if self.sidecar is not None and index < self.sidecar.count:
+            return list(self.sidecar.vector(index))
+        return self.approximate(index)
+
+    def approximate(self, index: int) -> list[float]:
+        """Get a vector decoded from its hot (possibly quantized) form."""
+        start = index * self.dim
+        if self.precision == "float32":
+            return self._float32[start:start + self.dim].tolist()
+        if self.precision == "float16":
+            return list(self._half.unpack_from(self._float16, start * 2))
+        scale = self._scales[index]
+        return [code * scale for code in self._int8[start:start + self.dim]]
+
+    def scores(self, queries: list[list[float]], doc_indexes: list[int] | range) -> list[list[float]]:
+        """Dot products of unit queries against the listed vectors.
+
+        Args:
+            queries: Unit-length query vectors
+            doc_indexes: Vectors to score
+
+        Returns:
+            Score matrix: one row per query, one column per listed vector
+        """
+        rows: list[list[float]] = [[] for _ in queries]
+        dim = self.dim
+
+        if self.precision == "float32":
+            view = memoryview(self._float32)
+            for doc in doc_indexes:
+                vec = view[doc * dim:(doc + 1) * dim]
+                for row, query in zip(rows, queries):
+                    row.append(sum(map(operator.mul, query, vec)))
+        elif self.precision == "float16":
+            unpack = self._half.unpack_from
+            buf = self._float16
+            for doc in doc_indexes:
+                vec = unpack(buf, doc * dim * 2)
+                for row, query in zip(rows, queries):
+                    row.append(sum(map(operator.mul, query, vec)))
+        else:
+            view = memoryview(self._int8)
+            scales = self._scales
+            for doc in doc_indexes:
+                vec = view[doc * dim:(doc + 1) * dim]
+                scale = scales[doc]
+                for row, query in zip(rows, queries):
+                    row.append(sum(map(operator.mul, query, vec)) * scale)
+
+        if self.rescore:
+            self._rescore(queries, doc_indexes, rows)
+        return rows
+
+    def _rescore(self, queries: list[list[float]], doc_indexes: list[int] | range, rows: list[list[float]]) -> None:
+        """Replace the best approximate scores in each row with exact ones."""
+        doc_list = doc_indexes if isinstance(doc_indexes, list) else list(doc_indexes)
+        cache: dict[int, list[float]] = {}
+        for row, query in zip(rows, queries):
+            best = heapq.nlargest(RESCORE_CANDIDATES, range(len(row)), key=row.__getitem__)
+            for position in best:
+                doc = doc_list[position]
+                vec = cache.get(doc)
+                if vec is None:
+                    vec = cache[doc] = self.exact(doc)
+                row[position] = sum(map(operator.mul, query, vec))
+
+    def attach_sidecar(self, directory: Path | None = None) -> None:
+        """Move exact vectors held in RAM to the sidecar file.
+
+        The first call creates the sidecar; later calls append the vectors
+        added since.
+
+        Args:
+            directory: Where to create the sidecar file; the system default if None
+        """
+        if self.precision == "float32" or not self._pending:
+            return
+        if self.sidecar is None:
+            self.sidecar = Float32Sidecar(self.dim, directory)
+        self.sidecar.extend(self)
+        self._pending.clear()
+
+    def close(self) -> None:
+        """Release the sidecar file."""
+        if self.sidecar:
+            self.sidecar.close()
+            self.sidecar = None
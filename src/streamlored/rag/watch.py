@@ -0,0 +1,131 @@
+"""Hot reload of the knowledge base when files in the docs folder change."""
+
+import asyncio
+import logging
+from pathlib import Path
+
+from streamlored.rag import DocumentStore
+from streamlored.rag.ingest import chunk_file, find_documents
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size) of a file, compared between polls
+FileStamp = tuple[int, int]
+
+
+class DocsWatcher:
+    """Polls a docs folder and re-ingests the files that changed.
+
+    Only the changed files are re-chunked and re-embedded, in the background.
+    Each file's old chunks are swapped for its new ones with the store's
+    replace_documents, so queries keep being answered throughout and never
+    see a file half-updated. The replaced chunks can trigger a background
+    compaction; queries in flight are safe from it because the stores pick
+    the chunks to score only after the query embedding arrives. A file is
+    reloaded once it has looked the same for two polls in a row, so editors
+    that save in several writes trigger a single reload.
+    """
+
+    def __init__(
+        self,
+        doc_store: DocumentStore,
+        docs_path: Path,
+        interval: float = 5.0,
+        max_tokens: int = 0,
+        overlap_tokens: int = 0,
+    ) -> None:
+        """Create a watcher (call start() to begin polling).
+
+        Args:
+            doc_store: Store to update; must support document_ids and replace_documents
+            docs_path: Docs folder the KB was ingested from
+            interval: Seconds between polls
+            max_tokens: Chunk sizing, as for --ingest (0 = by characters)
+            overlap_tokens: Chunk overlap, as for --ingest
+        """
+        self.doc_store = doc_store
+        self.docs_path = docs_path
+        self.interval = interval
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        # Relative path -> stamp of the version in the KB
+        self._files: dict[str, FileStamp] = {}
+        # Changed files waiting to stop changing
+        self._pending: dict[str, FileStamp | None] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start polling in the background."""
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Watching {self.docs_path} for KB changes (every {self.interval}s)")
+
+    async def close(self) -> None:
+        """Stop polling, waiting for a reload in progress to be cancelled."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _scan(self) -> dict[str, FileStamp]:
+        """Stamp every document under the docs folder."""
+        stamps = {}
+        for file_path in find_documents(self.docs_path):
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            stamps[file_path.relative_to(self.docs_path).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    async def _run(self) -> None:
+        """Poll until cancelled; the KB is assumed current when watching starts."""
+        self._files = await asyncio.to_thread(self._scan)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Failed to check {self.docs_path} for changes: {e}")
+
+    async def poll(self) -> list[str]:
+        """Check the docs folder once and reload files that changed and have settled.
+
+        Returns:
+            Relative paths of the files reloaded
+        """
+        stamps = await asyncio.to_thread(self._scan)
+        changed = {path for path in stamps.keys() | self._files.keys() if stamps.get(path) != self._files.get(path)}
+        settled = sorted(path for path in changed if path in self._pending and self._pending[path] == stamps.get(path))
+        self._pending = {path: stamps.get(path) for path in changed if path not in settled}
+
+        reloaded = []
+        for path in settled:
+            try:
+                await self.reload(path)
+            except Exception as e:
+                # Left out of self._files, so it is retried on later polls
+                logger.error(f"Failed to reload {path} into the KB: {e}")
+                continue
+            if path in stamps:
+                self._files[path] = stamps[path]
+            else:
+                self._files.pop(path, None)
+            reloaded.append(path)
+        return reloaded
+
+    async def reload(self, path: str) -> None:
+        """Replace a file's chunks in the KB with freshly chunked ones.
+
+        Args:
+            path: File path relative to the docs folder (removed files lose their chunks)
+        """
+        file_path = self.docs_path / path
+        chunks = []
+        if file_path.is_file():
+            chunks = await asyncio.to_thread(chunk_file, file_path, self.docs_path, self.max_tokens, self.overlap_tokens)
+        old_ids = self.doc_store.document_ids({"path": path})
+        await self.doc_store.replace_documents(old_ids, chunks)
+        logger.info(f"Reloaded {path}: {len(old_ids)} chunks replaced by {len(chunks)}")
@@ -0,0 +1,565 @@
+"""Chat replay load generator for capacity planning.
+
+Feeds a recorded chat log through the real bot pipeline (event_message, the
+auto-respond pattern filter and KB micro-batches, commands, inference) at a
+multiple of its original pace, without Twitch or a GPU. Model calls go to a
+FakeOllamaServer with configurable latency, and the KB is ingested from the
+docs folder with the same hashing embeddings the fake server returns.
+
+Each run reports per-stage latency histograms, queue depths, event loop lag,
+the auto-respond rate, and how many replies went stale or were dropped, so a
+sweep over speeds shows the message rate at which replies stop keeping up.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import tempfile
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from twitchio.ext import commands
+
+from streamlored.config import Settings
+from streamlored.inference import open_document_store
+from streamlored.llm.fake_server import FakeOllamaServer
+from streamlored.rag.benchmark import HashingEmbeddingProvider
+from streamlored.rag.ingest import find_documents, ingest_files
+from streamlored.tracing import percentile
+from streamlored.twitch_bot import TwitchBot
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram bucket upper bounds in seconds (plus one for anything slower)
+HISTOGRAM_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stages timed for every run, in pipeline order
+STAGES = ("pattern_filter", "batch_wait", "kb_scoring", "generation", "reply")
+
+# Seconds after which a reply counts as stale by default: chat has moved on
+DEFAULT_STALE_AFTER = 15.0
+
+# Seconds between queue depth and event loop lag samples
+SAMPLE_INTERVAL = 0.1
+
+# Seconds to wait for in-flight replies after the last message; the rest are dropped
+DRAIN_TIMEOUT = 60.0
+
+# Plain text logs: "[12:34:56] nick: message", optionally with a date and "#channel"
+TEXT_LOG_PATTERN = re.compile(
+    r"^\[(?:(\d{4}-\d{2}-\d{2})[ T])?(\d{1,2}):(\d{2}):(\d{2})\]\s+(?:#(\S+)\s+)?([^\s:]+):\s?(.*)$"
+)
+
+# Chat message whose handling the current task belongs to
+_current_message: ContextVar["ReplayMessage | None"] = ContextVar("replay_message", default=None)
+
+
+@dataclass
+class ChatLine:
+    """One recorded chat message."""
+
+    time: float  # seconds since the first message
+    author: str
+    content: str
+    channel: str | None = None  # None = the primary channel
+
+
+def _timestamp(value: Any) -> float:
+    """Seconds for a JSON log timestamp (epoch number or ISO 8601 string)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def load_chat_log(path: Path) -> list[ChatLine]:
+    """Read a chat log to replay.
+
+    Two formats are accepted: JSON Lines with "time" (epoch seconds or ISO
+    8601), "author" and "content" plus an optional "channel", or text lines
+    like "[12:34:56] nick: message" as written by common chat loggers. Text
+    logs without dates are assumed to cross midnight when the clock goes
+    backwards.
+
+    Args:
+        path: Chat log file
+
+    Returns:
+        Messages in order, timed from the first one
+    """
+    lines: list[ChatLine] = []
+    skipped = 0
+    day_offset = 0.0
+    with open(path, encoding="utf-8") as f:
+        for raw in f:
+            raw = raw.strip()
+            if not raw:
+                continue
+            if raw.startswith("{"):
+                entry = json.loads(raw)
+                lines.append(ChatLine(
+                    time=_timestamp(entry.get("time", entry.get("timestamp", 0))),
+                    author=entry.get("author") or entry.get("user", "viewer"),
+                    content=entry.get("content", entry.get("message", "")),
+                    channel=entry.get("channel"),
+                ))
+                continue
+
+            match = TEXT_LOG_PATTERN.match(raw)
+            if not match:
+                skipped += 1
+                continue
+            date, hours, minutes, seconds, channel, author, content = match.groups()
+            clock = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+            if date:
+                clock += datetime.fromisoformat(date).toordinal() * 86400
+            elif lines and clock + day_offset < lines[-1].time - 43200:
+                day_offset += 86400
+            lines.append(ChatLine(clock + day_offset, author, content, channel))
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} unrecognised lines in {path}")
+    if not lines:
+        return []
+    start = lines[0].time
+    for line in lines:
+        line.time -= start
+    lines.sort(key=lambda line: line.time)
+    return lines
+
+
+class ReplayChatter:
+    """Stands in for a TwitchIO chatter."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.display_name = name
+        self._ws = None
+
+
+class ReplayChannel:
+    """Stands in for a TwitchIO channel; hands what the bot sends to the run."""
+
+    def __init__(self, name: str, run: "ReplayRun") -> None:
+        self.name = name
+        self._run = run
+
+    async def send(self, content: str) -> None:
+        self._run.record_reply(content)
+
+
+class ReplayMessage:
+    """Stands in for a TwitchIO message, remembering what became of it."""
+
+    def __init__(self, line: ChatLine, channel: ReplayChannel) -> None:
+        self.content = line.content
+        self.author = ReplayChatter(line.author)
+        self.channel = channel
+        self.echo = False
+        self.tags: dict[str, str] = {}
+        self.arrived = time.perf_counter()
+        self.dispatched = False
+        self.failed = False
+        self.replied = False
+
+
+class ReplayContext(commands.Context):
+    """Command context that replies through the replay channel instead of IRC."""
+
+    async def send(self, content: str) -> None:
+        await self.channel.send(content)
+
+
+class ReplayRun:
+    """Measurements for one replay at one speed."""
+
+    def __init__(self, speed: float, stale_after: float) -> None:
+        """Start an empty run.
+
+        Args:
+            speed: Replay speed multiplier
+            stale_after: Seconds after which a reply counts as stale
+        """
+        self.speed = speed
+        self.stale_after = stale_after
+        self.messages: list[ReplayMessage] = []
+        self.latencies: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        self.failures: dict[str, int] = {}
+        self.decisions: dict[str, int] = {}
+        self.batch_sizes: list[int] = []
+        self.depths: dict[str, list[int]] = {"auto_batch": [], "in_flight": [], "ollama_waiting": []}
+        self.loop_lag: list[float] = []
+        self.in_flight = 0
+        self.replies = 0
+        self.stale = 0
+
+    def count(self, decision: str) -> None:
+        """Count a routing decision for a message."""
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+
+    def timed(self, stage: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Wrap a coroutine function so its calls are timed as a stage.
+
+        Args:
+            stage: Stage name
+            func: Coroutine function to wrap
+
+        Returns:
+            The wrapped function
+        """
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                self.failures[stage] = self.failures.get(stage, 0) + 1
+                message = _current_message.get()
+                if message is not None:
+                    message.failed = True
+                raise
+            finally:
+                self.latencies[stage].append(time.perf_counter() - started)
+        return wrapper
+
+    def record_reply(self, content: str) -> None:
+        """Record a message the bot sent, against the chat message it answers."""
+        message = _current_message.get()
+        if message is None or message.failed:
+            # Not tied to a chat message, or the error reply after a failed generation
+            return
+        latency = time.perf_counter() - message.arrived
+        message.replied = True
+        self.replies += 1
+        self.latencies["reply"].append(latency)
+        if latency > self.stale_after:
+            self.stale += 1
+
+    async def sample(self, bot: "ReplayBot", server: FakeOllamaServer) -> None:
+        """Sample queue depths and event loop lag until cancelled."""
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            self.loop_lag.append(max(0.0, time.perf_counter() - started - SAMPLE_INTERVAL))
+            self.depths["auto_batch"].append(bot._auto_batcher.pending_count)
+            self.depths["in_flight"].append(self.in_flight)
+            self.depths["ollama_waiting"].append(server.waiting)
+
+    def results(self, span: float, wall: float, server: FakeOllamaServer, timed_out: bool) -> dict[str, Any]:
+        """Summarize the run.
+
+        Args:
+            span: Seconds the replayed log covers
+            wall: Seconds the replay took, including the drain
+            server: The fake Ollama server the run used
+            timed_out: Whether replies were still in flight at the drain timeout
+
+        Returns:
+            Machine-readable results
+        """
+        dispatched = sum(message.dispatched for message in self.messages)
+        dropped = sum(message.dispatched and not message.replied for message in self.messages)
+        auto_replies = self.decisions.get("stream_history", 0) + self.decisions.get("kb_accepted", 0)
+        return {
+            "speed": self.speed,
+            "messages": len(self.messages),
+            "offered_rate": len(self.messages) / (span / self.speed) if span else float(len(self.messages)),
+            "wall_s": wall,
+            "decisions": self.decisions,
+            "auto_respond_rate": auto_replies / len(self.messages) if self.messages else 0.0,
+            "mean_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0,
+            "dispatched": dispatched,
+            "replies": self.replies,
+            "stale": self.stale,
+            "dropped": dropped,
+            "drain_timed_out": timed_out,
+            "failures": self.failures,
+            "latency_s": {stage: histogram(values) for stage, values in self.latencies.items()},
+            "queue_depth": {
+                name: {"mean": sum(values) / len(values) if values else 0.0, "max": max(values, default=0)}
+                for name, values in self.depths.items()
+            },
+            "event_loop_lag_s": histogram(self.loop_lag),
+            "ollama": {"requests": dict(server.requests), "rejected": server.rejected, "max_waiting": server.max_waiting},
+        }
+
+
+def histogram(values: list[float]) -> dict[str, Any]:
+    """Summarize latencies as percentiles and HISTOGRAM_BOUNDS bucket counts.
+
+    Args:
+        values: Latencies in seconds
+
+    Returns:
+        Count, mean, p50/p95/p99/max and per-bucket counts keyed by upper bound
+    """
+    if not values:
+        return {"count": 0}
+    buckets = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value in values:
+        buckets[bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values),
+        "buckets": dict(zip([str(bound) for bound in HISTOGRAM_BOUNDS] + ["+Inf"], buckets)),
+    }
+
+
+class ReplayBot(TwitchBot):
+    """TwitchBot fed from a chat log, with its pipeline stages timed."""
+
+    def __init__(self, settings: Settings, run: ReplayRun) -> None:
+        """Create the bot without connecting to Twitch.
+
+        Args:
+            settings: Settings pointing at the fake Ollama server and replay KB
+            run: Run to record measurements in
+        """
+        super().__init__(settings)
+        self.run_stats = run
+        self.inference.score_candidates = run.timed("kb_scoring", self.inference.score_candidates)
+        self.inference.run = run.timed("generation", self.inference.run)
+
+    async def event_message(self, message: ReplayMessage) -> None:
+        _current_message.set(message)
+        if "streamlored" in message.content.lower():
+            self.run_stats.count("mention")
+        await super().event_message(message)
+
+    def _match_auto_respond_patterns(self, message, state) -> str | None:
+        started = time.perf_counter()
+        match = super()._match_auto_respond_patterns(message, state)
+        self.run_stats.latencies["pattern_filter"].append(time.perf_counter() - started)
+        self.run_stats.count({"kb": "kb_candidate", None: "no_match"}.get(match, match))
+        return match
+
+    async def _evaluate_auto_batch(self, messages: list) -> None:
+        # The batch task inherits the context of whichever message armed the timer
+        _current_message.set(None)
+        now = time.perf_counter()
+        self.run_stats.batch_sizes.append(len(messages))
+        self.run_stats.latencies["batch_wait"].extend(now - message.arrived for message in messages)
+        await super()._evaluate_auto_batch(messages)
+
+    async def _handle_auto_response(self, message, state, results=None, query=None) -> None:
+        _current_message.set(message)
+        if results is not None:
+            self.run_stats.count("kb_accepted")
+        await super()._handle_auto_response(message, state, results=results, query=query)
+
+    async def _dispatch(self, kind, payload, channel, author, error_reply=None, fallback_message=None) -> None:
+        message = _current_message.get()
+        if message is not None:
+            message.dispatched = True
+        self.run_stats.in_flight += 1
+        try:
+            await super()._dispatch(kind, payload, channel, author, error_reply, fallback_message)
+        finally:
+            self.run_stats.in_flight -= 1
+
+    async def get_context(self, message, *, cls=None):
+        return await super().get_context(message, cls=cls or ReplayContext)
+
+    async def invoke(self, context) -> None:
+        _current_message.set(context.message)
+        if context.is_valid:
+            self.run_stats.count("command")
+        await super().invoke(context)
+
+    async def event_command_error(self, context, error: Exception) -> None:
+        # Chat is full of other bots' commands; unknown ones are expected
+        if not isinstance(error, commands.CommandNotFound):
+            logger.warning(f"Command error during replay: {error}")
+
+    async def shutdown(self) -> None:
+        """Release what the bot opened, without touching the unused IRC connection."""
+        await self._auto_batcher.close()
+        if self.residency:
+            await self.residency.close()
+        await self.ollama_pool.close()
+
+
+async def replay_chat(
+    settings: Settings,
+    lines: list[ChatLine],
+    speed: float,
+    server: FakeOllamaServer,
+    stale_after: float = DEFAULT_STALE_AFTER,
+) -> dict[str, Any]:
+    """Replay a chat log through a fresh bot at one speed.
+
+    Args:
+        settings: Settings pointing at the fake Ollama server and replay KB
+        lines: Output of load_chat_log
+        speed: Pace multiplier (10 = ten times as fast as recorded)
+        server: Running fake Ollama server
+        stale_after: Seconds after which a reply counts as stale
+
+    Returns:
+        Results for this speed (see ReplayRun.results)
+    """
+    run = ReplayRun(speed, stale_after)
+    bot = ReplayBot(settings, run)
+    primary = settings.channel_names[0]
+    channels: dict[str, ReplayChannel] = {}
+    tasks: set[asyncio.Task] = set()
+    sampler = asyncio.create_task(run.sample(bot, server))
+
+    started = time.perf_counter()
+    for line in lines:
+        delay = started + line.time / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = (line.channel or primary).lstrip("#").lower()
+        channel = channels.setdefault(name, ReplayChannel(name, run))
+        message = ReplayMessage(line, channel)
+        run.messages.append(message)
+        task = asyncio.create_task(bot.event_message(message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*tasks, bot._auto_batcher.close(), return_exceptions=True),
+            timeout=DRAIN_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        timed_out = True
+    wall = time.perf_counter() - started
+
+    sampler.cancel()
+    try:
+        await sampler
+    except asyncio.CancelledError:
+        pass
+    await bot.shutdown()
+    return run.results(lines[-1].time if lines else 0.0, wall, server, timed_out)
+
+
+async def run_replay(
+    settings: Settings,
+    lines: list[ChatLine],
+    speeds: list[float],
+    stale_after: float = DEFAULT_STALE_AFTER,
+    **server_options: Any,
+) -> list[dict[str, Any]]:
+    """Replay a chat log at each speed against its own fake Ollama server.
+
+    The KB is ingested from KB_DOCS_PATH into a scratch store first, with
+    the hashing embeddings the fake server returns for queries.
+
+    Args:
+        settings: Application settings (chunking, retrieval and batching options apply)
+        lines: Output of load_chat_log
+        speeds: Pace multipliers to run, e.g. [1, 10, 50]
+        stale_after: Seconds after which a reply counts as stale
+        **server_options: Passed to FakeOllamaServer (generate_latency, parallel, ...)
+
+    Returns:
+        Results per speed
+    """
+    if not lines:
+        raise ValueError("No chat messages to replay")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kb_path = str(Path(tmp) / ("knowledge_base.sqlite3" if settings.kb_store == "sqlite" else "knowledge_base.json"))
+        if settings.kb_enabled:
+            docs_path = Path(settings.kb_docs_path)
+            # The same vectors the fake server's /api/embed returns for queries
+            store = open_document_store(settings, kb_path, HashingEmbeddingProvider())
+            stats = await ingest_files(
+                store,
+                find_documents(docs_path),
+                docs_path,
+                workers=settings.ingest_workers,
+                max_tokens=settings.chunk_max_tokens,
+                overlap_tokens=settings.chunk_overlap_tokens,
+                dedup_threshold=settings.ingest_dedup_threshold,
+            )
+            await store.compact()
+            store.close()
+            logger.info(f"Replay KB: {stats.summary()}")
+
+        results = []
+        for speed in speeds:
+            # A fresh server per speed, so generations left queued by an overloaded run don't carry over
+            server = FakeOllamaServer(**server_options)
+            server.start()
+            try:
+                replay_settings = settings.model_copy(update={
+                    "ollama_host": "127.0.0.1",
+                    "ollama_port": int(server.url.rsplit(":", 1)[1]),
+                    "ollama_backends": "",
+                    "kb_path": kb_path,
+                    "twitch_channel_kb_paths": "",
+                    "kb_watch": False,
+                    "inference_mode": "local",
+                    "obs_enabled": False,
+                    "livesplit_enabled": False,
+                })
+                results.append(await replay_chat(replay_settings, lines, speed, server, stale_after))
+            finally:
+                server.stop()
+        return results
+
+
+def format_replay_results(results: list[dict[str, Any]], stale_after: float = DEFAULT_STALE_AFTER) -> str:
+    """Render replay results as text.
+
+    Args:
+        results: Output of run_replay
+        stale_after: Staleness threshold the runs used
+
+    Returns:
+        Summary text
+    """
+    lines = [
+        f"{'speed':>6} {'msg/s':>7} {'auto%':>6} {'replies':>8} {'p50 s':>7} {'p95 s':>7} "
+        f"{'stale':>6} {'dropped':>8} {'max queue':>10} {'lag p99 ms':>11}"
+    ]
+    for result in results:
+        reply = result["latency_s"]["reply"]
+        lines.append(
+            f"{result['speed']:>5g}x {result['offered_rate']:>7.2f} {result['auto_respond_rate'] * 100:>5.1f}% "
+            f"{result['replies']:>8} {reply.get('p50', 0):>7.2f} {reply.get('p95', 0):>7.2f} "
+            f"{result['stale']:>6} {result['dropped']:>8} {result['queue_depth']['ollama_waiting']['max']:>10} "
+            f"{result['event_loop_lag_s'].get('p99', 0) * 1000:>11.1f}"
+        )
+
+    for result in results:
+        lines.append("")
+        lines.append(f"Stage latency at {result['speed']:g}x (ms):")
+        for stage, summary in result["latency_s"].items():
+            if summary["count"]:
+                lines.append(
+                    f"  {stage:<15} n={summary['count']:<6} p50 {summary['p50'] * 1000:>9.1f}  "
+                    f"p95 {summary['p95'] * 1000:>9.1f}  p99 {summary['p99'] * 1000:>9.1f}  "
+                    f"max {summary['max'] * 1000:>9.1f}"
+                )
+
+    fresh = [
+        result for result in results
+        if not result["dropped"] and result["latency_s"]["reply"].get("p95", 0) <= stale_after
+    ]
+    lines.append("")
+    if fresh:
+        best = max(fresh, key=lambda result: result["offered_rate"])
+        lines.append(
+            f"Replies stay fresh (p95 under {stale_after:g}s, none dropped) up to "
+            f"{best['offered_rate']:.2f} msg/s ({best['speed']:g}x)"
+        )
+    else:
+        lines.append(f"Replies went stale (p95 over {stale_after:g}s) or were dropped at every speed")
+    return "\n".join(lines)
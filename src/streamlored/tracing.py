@@ -0,0 +1,242 @@
+"""Per-request latency tracing for chat replies.
+
+A trace follows one reply from the handler that received the message through
+its stages: LiveSplit round trips, the OBS screenshot, query embedding, KB
+search and generation. Code that does the work marks a stage with span();
+without an active trace a span does nothing, so library code is instrumented
+unconditionally. The current trace travels in a context variable, so it
+follows awaits and the tasks a handler starts without being passed around.
+
+Stage times exclude nested stages (KB search does not include the query
+embedding it waits on). Each finished trace is logged as one [TRACE] line
+and kept in a ring buffer that percentile aggregates are computed from.
+"""
+
+import asyncio
+import functools
+import logging
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Finished traces kept for percentiles by default
+DEFAULT_BUFFER_SIZE = 1000
+
+# Trace of the request the current task is working on
+_current_trace: ContextVar["Trace | None"] = ContextVar("trace", default=None)
+
+# Time spent in stages nested in the innermost open span, as a one-item list
+_nested_time: ContextVar[list[float] | None] = ContextVar("trace_nested_time", default=None)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile.
+
+    Args:
+        values: Samples (at least one)
+        q: Percentile, 0-100
+
+    Returns:
+        The q-th percentile of values
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+@dataclass
+class Trace:
+    """Stage timings of one request."""
+
+    kind: str
+    started: float = field(default_factory=time.perf_counter)
+    # Seconds from start to finish (set when the trace ends)
+    total: float = 0.0
+    # Stage -> seconds spent in it, excluding nested stages
+    stages: dict[str, float] = field(default_factory=dict)
+
+    def add(self, stage: str, seconds: float) -> None:
+        """Add time to a stage (repeated stages, e.g. several LiveSplit commands, add up)."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def summary(self) -> str:
+        """One-line description for logging."""
+        parts = [f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.stages.items()]
+        untraced = self.total - sum(self.stages.values())
+        if untraced >= 0.0005:
+            parts.append(f"other {untraced * 1000:.0f}ms")
+        return f"{self.kind} {self.total * 1000:.0f}ms: {', '.join(parts) or 'no stages'}"
+
+
+class Tracer:
+    """Ring buffer of finished traces with percentile aggregates."""
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SIZE) -> None:
+        """Create an empty buffer.
+
+        Args:
+            capacity: Traces kept (0 disables tracing)
+        """
+        self.capacity = max(0, capacity)
+        self._traces: deque[Trace] = deque(maxlen=self.capacity)
+        # Traces recorded since start, including ones since dropped from the buffer
+        self.recorded = 0
+
+    def resize(self, capacity: int) -> None:
+        """Change how many traces are kept, keeping the newest.
+
+        Args:
+            capacity: Traces kept (0 disables tracing)
+        """
+        self.capacity = max(0, capacity)
+        self._traces = deque(self._traces, maxlen=self.capacity)
+
+    def record(self, trace: Trace) -> None:
+        """Keep a finished trace."""
+        self._traces.append(trace)
+        self.recorded += 1
+
+    def traces(self, kind: str | None = None) -> list[Trace]:
+        """Buffered traces, oldest first.
+
+        Args:
+            kind: Only traces of this request kind (None = all)
+
+        Returns:
+            Matching traces
+        """
+        return [trace for trace in self._traces if kind is None or trace.kind == kind]
+
+    def percentiles(self, kind: str | None = None) -> dict[str, dict[str, float]]:
+        """Latency percentiles per stage over the buffered traces.
+
+        Args:
+            kind: Only traces of this request kind (None = all)
+
+        Returns:
+            Stage ("total" for whole requests) -> count, mean and p50/p95/p99
+            in seconds, over the traces that include the stage
+        """
+        samples: dict[str, list[float]] = {}
+        for trace in self.traces(kind):
+            samples.setdefault("total", []).append(trace.total)
+            for stage, seconds in trace.stages.items():
+                samples.setdefault(stage, []).append(seconds)
+        return {
+            stage: {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+            for stage, values in samples.items()
+        }
+
+    def summary_lines(self) -> list[str]:
+        """One line of p50/p95/p99 stage latencies per request kind."""
+        lines = []
+        for kind in sorted({trace.kind for trace in self._traces}):
+            stats = self.percentiles(kind)
+            stages = ", ".join(
+                f"{stage} {s['p50'] * 1000:.0f}/{s['p95'] * 1000:.0f}/{s['p99'] * 1000:.0f}ms"
+                for stage, s in stats.items()
+            )
+            lines.append(f"{kind} (n={stats['total']['count']}) p50/p95/p99: {stages}")
+        return lines
+
+
+# Traces of this process
+tracer = Tracer()
+
+
+@contextmanager
+def trace(kind: str) -> Iterator[Trace | None]:
+    """Trace one request; spans entered inside it are recorded against it.
+
+    Args:
+        kind: Request kind ("ask", "lore", "auto", ...)
+
+    Yields:
+        The trace, or None if tracing is disabled
+    """
+    if not tracer.capacity:
+        yield None
+        return
+
+    current = Trace(kind)
+    trace_token = _current_trace.set(current)
+    nested_token = _nested_time.set(None)
+    try:
+        yield current
+    finally:
+        current.total = time.perf_counter() - current.started
+        _nested_time.reset(nested_token)
+        _current_trace.reset(trace_token)
+        tracer.record(current)
+        logger.info(f"[TRACE] {current.summary()}")
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a stage of the current request (does nothing outside a trace).
+
+    Args:
+        stage: Stage name ("embed", "generate", ...)
+    """
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+
+    parent = _nested_time.get()
+    nested = [0.0]
+    token = _nested_time.set(nested)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _nested_time.reset(token)
+        current.add(stage, max(0.0, elapsed - nested[0]))
+        if parent is not None:
+            parent[0] += elapsed
+
+
+def traced(kind: str) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Decorate a coroutine function so each call is traced as one request.
+
+    Args:
+        kind: Request kind
+
+    Returns:
+        Decorator
+    """
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with trace(kind):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def report_periodically(interval: float) -> None:
+    """Log percentile aggregates every interval seconds while new traces arrive.
+
+    Args:
+        interval: Seconds between reports
+    """
+    reported = tracer.recorded
+    while True:
+        await asyncio.sleep(interval)
+        if tracer.recorded == reported:
+            continue
+        reported = tracer.recorded
+        for line in tracer.summary_lines():
+            logger.info(f"[TRACE] {line}")
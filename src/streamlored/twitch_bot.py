@@ -2,24 +2,53 @@
 
 import asyncio
 import logging
-from collections import deque
-from datetime import datetime
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable
 from twitchio.ext import commands
 
+from streamlored import metrics
+from streamlored.batching import MicroBatcher
+from streamlored.channel_state import ChannelState
 from streamlored.config import Settings
-from streamlored.llm import OllamaClient
+from streamlored.inference import InferenceService
+from streamlored.job_queue import SQLiteJobQueue
+from streamlored.llm import ModelResidency, OllamaBackendPool, OllamaClient
 from streamlored.plugins import BasePlugin
 from streamlored.rag.ollama_embeddings import OllamaEmbeddingProvider
-from streamlored.rag.json_store import JsonDocumentStore
-from streamlored.persona import build_system_prompt
-from streamlored.twitch_api import TwitchAPIClient, GameContext
+from streamlored.rag import DocumentStore
+from streamlored.rag.watch import DocsWatcher
+from streamlored.twitch_api import TwitchAPIClient
 from streamlored.obs_client import OBSWebSocketClient
+from streamlored.tracing import report_periodically, span, traced, tracer
 
 logger = logging.getLogger(__name__)
 
 # Max characters for Twitch chat
 MAX_RESPONSE_LENGTH = 500
 
+# Appended to every game context string
+GAME_FOCUS_NOTE = " Focus your answer on this game/series first, but you can reference other games when useful."
+
+# Vague questions that benefit from a screenshot of what's on screen
+VAGUE_QUESTION_PATTERNS = [
+    "what's going on", "whats going on", "what is going on",
+    "what are we doing", "what's happening", "whats happening",
+    "where are we", "what is this", "what's this",
+]
+
+
+@dataclass
+class PendingReply:
+    """Where to deliver a queued job's reply once a worker finishes it."""
+
+    channel: object
+    kind: str
+    error_reply: str | None = None
+    # Chat message to run through command handling if the job declines to reply
+    fallback_message: object | None = None
+
 
 class TwitchBot(commands.Bot):
     """StreamLored Twitch chat bot."""
@@ -33,31 +62,60 @@ class TwitchBot(commands.Bot):
         self.settings = settings
         self.plugins: list[BasePlugin] = []
 
-        # Initialize Ollama client
+        # Initialize Ollama client (shared by all channels)
+        self.ollama_pool = OllamaBackendPool.from_settings(settings)
         self.ollama = OllamaClient(
             base_url=settings.ollama_base_url,
             model=settings.ollama_model,
+            pool=self.ollama_pool,
+            keep_alive=settings.ollama_keep_alive_by_model,
         )
 
-        # Initialize RAG components if enabled
-        self.doc_store: JsonDocumentStore | None = None
-        if settings.kb_enabled:
-            embedding_provider = OllamaEmbeddingProvider(
+        # In queue mode, retrieval and generation run in worker processes
+        self.job_queue: SQLiteJobQueue | None = None
+        self._awaiting_jobs: dict[int, PendingReply] = {}
+        self._delivery_task: asyncio.Task | None = None
+        if settings.inference_mode == "queue":
+            self.job_queue = SQLiteJobQueue(settings.job_queue_path)
+
+        # Initialize RAG components if enabled. The embedding provider (and its
+        # cache) is shared; channels with a KB namespace get their own index.
+        # Workers own the KB in queue mode, so the bot doesn't load it.
+        self.embedding_provider: OllamaEmbeddingProvider | None = None
+        if settings.kb_enabled and not self.job_queue:
+            self.embedding_provider = OllamaEmbeddingProvider(
                 base_url=settings.ollama_base_url,
                 model=settings.ollama_embed_model,
+                cache_size=settings.embed_cache_size,
+                pool=self.ollama_pool,
+                keep_alive=settings.ollama_embed_keep_alive,
             )
-            self.doc_store = JsonDocumentStore(
-                kb_path=settings.kb_path,
-                embedding_provider=embedding_provider,
+
+        # Workers keep their own models loaded in queue mode
+        self.residency: ModelResidency | None = None
+        self._warmup_task: asyncio.Task | None = None
+        if not self.job_queue:
+            self.residency = ModelResidency(
+                self.ollama,
+                self.embedding_provider,
+                vision_model=settings.ollama_vision_model if settings.obs_enabled else None,
+                policy=settings.ollama_residency,
             )
+        self.inference = InferenceService(settings, self.ollama, self.embedding_provider, self.residency)
+        self.doc_store: DocumentStore | None = self.inference.get_doc_store(settings.kb_path)
+        self._docs_watcher: DocsWatcher | None = None
 
         # Initialize Twitch API client for game context
         self.api_client = TwitchAPIClient(
             client_id=settings.twitch_client_id,
             client_secret=settings.twitch_client_secret,
         )
-        self.current_game: GameContext | None = None
-        self._game_poll_task: asyncio.Task | None = None
+
+        # Per-channel chat, stream and game state
+        kb_paths = settings.channel_kb_paths
+        self.channels: dict[str, ChannelState] = {}
+        for i, name in enumerate(settings.channel_names):
+            self.channels[name] = self._new_channel_state(name, kb_paths.get(name), primary=i == 0)
 
         # Initialize OBS WebSocket client for screenshots
         self.obs_client: OBSWebSocketClient | None = None
@@ -68,39 +126,96 @@ class TwitchBot(commands.Bot):
                 password=settings.obs_password,
             )
 
-        # Chat history for context (last 10 messages)
-        self.chat_history: deque = deque(maxlen=10)
+        # Per-request stage timings, logged and kept for percentiles
+        tracer.resize(settings.trace_buffer_size)
+        self._trace_report_task: asyncio.Task | None = None
 
-        # Stream history - tracks games played during this session
-        # Format: [{"game": "Game Name", "title": "Stream Title", "started": datetime, "ended": datetime|None}]
-        self.stream_history: list[dict] = []
-        self._stream_start_time: datetime | None = None
+        # Candidate auto-response questions are scored against the KB in micro-batches
+        self._auto_batcher: MicroBatcher = MicroBatcher(
+            self._evaluate_auto_batch,
+            window=settings.auto_respond_batch_window,
+            max_size=settings.auto_respond_batch_size,
+        )
+
+        # Prometheus metrics; gauges are read only when the endpoint is scraped
+        self._metrics_server: metrics.MetricsServer | None = None
+        self._loop_lag_task: asyncio.Task | None = None
+        metrics.queue_depth.set_function(self._queue_depths)
+        metrics.ollama_in_flight.set_function(
+            lambda: {(backend.url,): backend.in_flight for backend in self.ollama_pool.backends}
+        )
 
         # Initialize TwitchIO bot
         super().__init__(
             token=settings.twitch_oauth_token,
             prefix=settings.bot_prefix,
-            initial_channels=[settings.twitch_channel],
+            initial_channels=list(self.channels),
+        )
+
+    def _new_channel_state(
+        self,
+        name: str,
+        kb_path: str | None = None,
+        primary: bool = False,
+    ) -> ChannelState:
+        """Create state for a channel.
+
+        Args:
+            name: Channel login name
+            kb_path: Channel-specific KB path, or None for the shared KB
+            primary: Whether this is the streamer's own channel
+
+        Returns:
+            New channel state
+        """
+        kb_path = (kb_path or self.settings.kb_path) if self.settings.kb_enabled else None
+        return ChannelState(
+            name=name,
+            primary=primary,
+            kb_path=kb_path,
+            doc_store=self.inference.get_doc_store(kb_path),
         )
 
+    def _channel_state(self, channel) -> ChannelState:
+        """Get the state for a TwitchIO channel, creating it if needed.
+
+        Args:
+            channel: TwitchIO channel object
+
+        Returns:
+            The channel's state
+        """
+        name = channel.name.lower()
+        state = self.channels.get(name)
+        if state is None:
+            state = self._new_channel_state(name)
+            self.channels[name] = state
+        return state
+
     async def event_ready(self) -> None:
         """Called when the bot is ready and connected."""
         logger.info(f"Bot connected as {self.settings.twitch_bot_nick}")
-        logger.info(f"Joined channel: {self.settings.twitch_channel}")
+        logger.info(f"Joined channels: {', '.join(self.channels)}")
 
         # Check Ollama health
         if await self.ollama.health_check():
-            logger.info(f"Ollama connected at {self.settings.ollama_base_url}")
+            logger.info(f"Ollama connected at {self.ollama_pool.describe()}")
         else:
-            logger.warning(f"Ollama not available at {self.settings.ollama_base_url}")
+            logger.warning(f"Ollama not available at {self.ollama_pool.describe()}")
+        self.ollama_pool.start_health_probes()
+
+        # Load models in the background so the first reply doesn't pay for it
+        if self.residency and self.settings.ollama_warmup:
+            self._warmup_task = asyncio.create_task(self.residency.warm_up())
 
         # Initialize plugins
         for plugin in self.plugins:
             await plugin.setup(self)
 
-        # Start game polling task
+        # Start one game polling task per channel
         if self.settings.twitch_client_id and self.settings.twitch_client_secret:
-            self._game_poll_task = asyncio.create_task(self._poll_game_context())
+            for state in self.channels.values():
+                state.game_poll_task = asyncio.create_task(self._poll_game_context(state))
             logger.info(f"Game polling started (every {self.settings.twitch_poll_interval}s)")
         else:
             logger.warning("Twitch client_id/secret not set - game context disabled")
@@ -113,53 +228,61 @@ class TwitchBot(commands.Bot):
                 logger.warning("Failed to connect to OBS WebSocket - screenshot feature disabled")
                 self.obs_client = None
 
-    async def _poll_game_context(self) -> None:
-        """Periodically poll for current game context."""
-        while True:
-            try:
-                new_context = await self.api_client.get_stream_info(
-                    self.settings.twitch_channel
+        # Re-ingest edited docs into the running KB
+        if self.settings.kb_watch:
+            if self.doc_store:
+                self._docs_watcher = DocsWatcher(
+                    self.doc_store,
+                    Path(self.settings.kb_docs_path),
+                    interval=self.settings.kb_watch_interval,
+                    max_tokens=self.settings.chunk_max_tokens,
+                    overlap_tokens=self.settings.chunk_overlap_tokens,
                 )
+                self._docs_watcher.start()
+            else:
+                logger.warning("KB_WATCH needs the KB loaded in the bot (KB_ENABLED and INFERENCE_MODE=local)")
 
-                # Check if game changed
-                old_game = self.current_game.game_name if self.current_game else None
-                new_game = new_context.game_name if new_context else None
-
-                if old_game != new_game:
-                    now = datetime.now()
+        # Log latency percentiles of recent replies
+        if tracer.capacity and self.settings.trace_report_interval > 0:
+            self._trace_report_task = asyncio.create_task(report_periodically(self.settings.trace_report_interval))
 
-                    # End previous game session
-                    if self.stream_history and self.stream_history[-1]["ended"] is None:
-                        self.stream_history[-1]["ended"] = now
+        # Serve metrics and start measuring event loop lag
+        if self.settings.metrics_port and not self._metrics_server:
+            server = metrics.MetricsServer(self.settings.metrics_host, self.settings.metrics_port)
+            try:
+                await server.start()
+                self._metrics_server = server
+                self._loop_lag_task = asyncio.create_task(metrics.monitor_event_loop_lag())
+            except OSError as e:
+                logger.error(f"Failed to start metrics server on port {self.settings.metrics_port}: {e}")
 
-                    if new_game:
-                        title = new_context.title if new_context else None
-                        logger.info(f"Now playing: {new_game} | Title: {title}")
+        # Deliver replies produced by inference workers
+        if self.job_queue:
+            self._delivery_task = asyncio.create_task(self._deliver_job_replies())
+            logger.info(f"Worker mode: inference jobs queued at {self.settings.job_queue_path}")
 
-                        # Start new game session
-                        self.stream_history.append({
-                            "game": new_game,
-                            "title": title,
-                            "started": now,
-                            "ended": None,
-                        })
+    async def _poll_game_context(self, state: ChannelState) -> None:
+        """Periodically poll for a channel's current game context.
 
-                        # Set stream start time on first game
-                        if self._stream_start_time is None:
-                            self._stream_start_time = now
+        Args:
+            state: The channel to poll for
+        """
+        while True:
+            try:
+                new_context = await self.api_client.get_stream_info(state.name)
+                old_game = state.current_game.game_name if state.current_game else None
+
+                if state.update_game(new_context):
+                    if new_context and new_context.game_name:
+                        logger.info(f"[{state.name}] Now playing: {new_context.game_name} | Title: {new_context.title}")
+                        # Chat picks up around a game switch; make sure the models are loaded
+                        if self.residency and self.settings.ollama_warmup:
+                            await self.residency.refresh()
                     elif old_game:
-                        logger.info("Stream went offline or game cleared")
-
-                # Clear old history if it gets too large (max 50 sessions)
-                if len(self.stream_history) > 50:
-                    removed = len(self.stream_history) - 50
-                    self.stream_history = self.stream_history[-50:]
-                    logger.info(f"Trimmed stream history (removed {removed} old sessions)")
-
-                self.current_game = new_context
+                        logger.info(f"[{state.name}] Stream went offline or game cleared")
 
             except Exception as e:
-                logger.error(f"Error polling game context: {e}")
+                logger.error(f"Error polling game context for {state.name}: {e}")
 
             await asyncio.sleep(self.settings.twitch_poll_interval)
 
@@ -173,36 +296,43 @@ class TwitchBot(commands.Bot):
         if message.echo:
             return
 
+        state = self._channel_state(message.channel)
+        metrics.chat_messages.labels(state.name).inc()
+
         # Log incoming messages
-        logger.debug(f"[{message.author.name}]: {message.content}")
+        logger.debug(f"[{state.name}] [{message.author.name}]: {message.content}")
 
         # Add to chat history
-        self.chat_history.append({
-            "user": message.author.name,
-            "content": message.content,
-        })
+        state.add_chat_message(message.author.name, message.content)
 
         # Check if bot is directly mentioned
         if "streamlored" in message.content.lower():
-            await self._handle_mention(message)
+            await self._handle_mention(message, state)
             return
 
         # Check if this looks like a question we can answer from KB
-        if await self._should_auto_respond(message):
-            await self._handle_auto_response(message)
+        match = self._match_auto_respond_patterns(message, state)
+        if match == "stream_history":
+            await self._handle_auto_response(message, state)
+            return
+        if match == "kb":
+            # Defer the KB relevance check so a burst of questions is scored together
+            self._auto_batcher.submit(message)
             return
 
         # Process commands
         await self.handle_commands(message)
 
-    async def _should_auto_respond(self, message) -> bool:
-        """Check if we should auto-respond to this message.
+    def _match_auto_respond_patterns(self, message, state: ChannelState) -> str | None:
+        """Cheap pattern pre-filter for auto-responses.
 
         Args:
             message: The chat message
+            state: State of the channel the message was sent in
 
         Returns:
-            True if we should respond
+            "stream_history" if stream history can answer it directly, "kb" if it
+            is a candidate for a KB relevance check, or None to ignore it
         """
         content = message.content.lower()
         logger.info(f"[AUTO] Checking: {content}")
@@ -215,7 +345,8 @@ class TwitchBot(commands.Bot):
         ]
         if any(excl == content.strip() for excl in exclusions):
             logger.info(f"[AUTO] Excluded (false positive): {content}")
-            return False
+            metrics.auto_respond_decisions.labels("ignore", "excluded").inc()
+            return None
 
         # Question patterns (high priority)
         question_indicators = [
@@ -274,222 +405,357 @@ class TwitchBot(commands.Bot):
         logger.info(f"[AUTO] Pattern match - question: {has_question}, gaming: {has_gaming_keyword}, stream_history: {has_stream_history_question}")
 
         # Stream history questions can be answered directly from stream history
-        if has_stream_history_question and self.stream_history:
+        if has_stream_history_question and state.stream_history:
             logger.info(f"[AUTO] Stream history question detected - will respond")
-            return True
+            metrics.auto_respond_decisions.labels("respond", "stream_history").inc()
+            return "stream_history"
 
         # Need at least a question pattern or gaming keyword
         if not has_question and not has_gaming_keyword:
             logger.info(f"[AUTO] No patterns matched for: {content}")
-            return False
+            metrics.auto_respond_decisions.labels("ignore", "no_pattern").inc()
+            return None
 
         # Check if we have relevant KB content
-        if not self.doc_store or self.doc_store.document_count() == 0:
+        if not state.kb_path or (state.doc_store and state.doc_store.document_count() == 0):
             logger.info("[AUTO] No KB available or empty")
-            return False
+            metrics.auto_respond_decisions.labels("ignore", "no_kb").inc()
+            return None
 
-        # Query KB to see if we have relevant content
-        try:
-            # Include game context and split name in the query for better relevance
-            query = message.content
-
-            # Get current split from LiveSplit plugin if available
-            current_split = None
-            for plugin in self.plugins:
-                if plugin.name == "livesplit" and hasattr(plugin, 'get_current_split_name'):
-                    current_split = await plugin.get_current_split_name()
-                    if current_split:
-                        logger.info(f"[AUTO] LiveSplit current split: {current_split}")
-                    break
-
-            if current_split:
-                query = f"{current_split}: {message.content}"
-                logger.info(f"[AUTO] Enhanced query: {query}")
-            elif self.current_game and self.current_game.game_name:
-                query = f"{self.current_game.game_name}: {message.content}"
-
-            results = await self.doc_store.query_knowledge_base(query, top_k=3)
-            if not results:
-                logger.info(f"[AUTO] No KB results for: {message.content[:50]}")
-                return False
-
-            # Check similarity - only respond if we have good matches
-            # Require minimum similarity threshold to avoid false positives
-            top_result = results[0]
-            similarity_score = top_result.get("score", 0)
-
-            # Only auto-respond if similarity is above threshold
-            # 0.65 allows split-enhanced queries to match, 0.75 was too strict
-            if similarity_score < 0.65:
-                logger.info(f"[AUTO] KB match too weak ({similarity_score:.2f} < 0.65) for: {message.content[:50]}")
-                return False
-
-            logger.info(f"[AUTO] KB match found ({similarity_score:.2f}) - will respond to: {message.content[:50]}")
-            return True
+        return "kb"
 
-        except Exception as e:
-            logger.error(f"Error checking KB relevance: {e}")
-            return False
+    async def _evaluate_auto_batch(self, messages: list) -> None:
+        """Score a micro-batch of candidate questions against the KB and dispatch.
 
-    async def _handle_auto_response(self, message) -> None:
-        """Handle automatic response to a question using KB.
+        Candidates share one LiveSplit lookup, and all candidates that search
+        the same document store share one embedding call and scoring pass.
+        Messages that don't clear the similarity threshold fall through to
+        normal command handling, same as an unbatched message would. In queue
+        mode the scoring happens on a worker instead.
 
         Args:
-            message: The chat message to respond to
+            messages: Chat messages that passed the pattern pre-filter
         """
-        game_context = await self._get_game_context_string()
-        chat_context = self._get_chat_history_string()
+        dispatch = await self._score_auto_batch(messages)
 
-        try:
-            # Include split name or game context in query for better matches
-            query = message.content
+        # Dispatch all decisions together
+        await asyncio.gather(*dispatch, return_exceptions=True)
+
+    @traced("auto_batch")
+    async def _score_auto_batch(self, messages: list) -> list[Awaitable]:
+        """Decide what to do with each message of a micro-batch.
 
-            # Get current split from LiveSplit plugin if available
-            current_split = None
-            for plugin in self.plugins:
-                if plugin.name == "livesplit" and hasattr(plugin, 'get_current_split_name'):
-                    current_split = await plugin.get_current_split_name()
-                    break
+        Args:
+            messages: Chat messages that passed the pattern pre-filter
 
-            if current_split:
-                query = f"{current_split}: {message.content}"
-            elif self.current_game and self.current_game.game_name:
-                query = f"{self.current_game.game_name}: {message.content}"
+        Returns:
+            Not yet started auto-response or command handlers, one per message
+        """
+        started = time.perf_counter()
+
+        current_split = await self._get_current_split_name()
+        if current_split:
+            logger.info(f"[AUTO] LiveSplit current split: {current_split}")
+
+        # Group candidates by the KB their channel searches
+        groups: dict[str | None, list] = {}
+        for message in messages:
+            state = self._channel_state(message.channel)
+            groups.setdefault(state.kb_path, []).append((message, state))
+
+        dispatch = []
+        accepted = 0
+        for group in groups.values():
+            # Include game context and split name in the queries for better relevance
+            queries = [
+                self._build_kb_query(message.content, state, current_split)
+                for message, state in group
+            ]
 
-            # Query knowledge base
-            results = await self.doc_store.query_knowledge_base(query, top_k=5)
+            if self.job_queue:
+                for (message, state), query in zip(group, queries):
+                    dispatch.append(self._handle_auto_response(message, state, query=query))
+                continue
 
-            if not results:
-                return
+            try:
+                decisions = await self.inference.score_candidates(
+                    group[0][1].doc_store,
+                    queries,
+                    [state.game_name for _, state in group],
+                )
+            except Exception as e:
+                logger.error(f"Error checking KB relevance: {e}")
+                metrics.auto_respond_decisions.labels("ignore", "error").inc(len(group))
+                decisions = [None] * len(group)
 
-            # Build context from results
-            context_parts = []
-            for doc in results:
-                source = doc.get("metadata", {}).get("source", "unknown")
-                section = doc.get("metadata", {}).get("section_title", "")
-                if section:
-                    context_parts.append(f"[{source} - {section}]:\n{doc['content']}")
+            for (message, state), results in zip(group, decisions):
+                if results is None:
+                    dispatch.append(self.handle_commands(message))
                 else:
-                    context_parts.append(f"[{source}]:\n{doc['content']}")
+                    dispatch.append(self._handle_auto_response(message, state, results=results))
+                    accepted += 1
 
-            kb_context = "\n\n".join(context_parts)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"[AUTO] Scored batch of {len(messages)} in {elapsed_ms:.0f}ms ({accepted} accepted)")
+        return dispatch
 
-            # Combine all context
-            full_context = kb_context
-            if chat_context:
-                full_context = f"Recent chat:\n{chat_context}\n\nKnowledge base:\n{kb_context}"
+    def _queue_depths(self) -> dict[tuple[str, ...], float]:
+        """Current depth of each queue, for the queue depth gauge.
 
-            system_prompt = build_system_prompt(
-                "lore",
-                game_context=game_context,
-                extra_context=full_context,
-            )
-
-            # Check if this is a vague question that would benefit from screenshot context
-            content_lower = message.content.lower()
-            vague_patterns = [
-                "what's going on", "whats going on", "what is going on",
-                "what are we doing", "what's happening", "whats happening",
-                "where are we", "what is this", "what's this",
-            ]
-            use_screenshot = any(pattern in content_lower for pattern in vague_patterns)
+        Returns:
+            Queue name (as a one-label tuple) -> items waiting
+        """
+        depths: dict[tuple[str, ...], float] = {
+            ("auto_batch",): self._auto_batcher.pending_count,
+        }
+        if self.job_queue:
+            counts = self.job_queue.depth()
+            depths[("jobs_pending",)] = counts.get("pending", 0)
+            depths[("jobs_running",)] = counts.get("running", 0)
+            depths[("awaiting_delivery",)] = len(self._awaiting_jobs)
+        return depths
+
+    async def _get_current_split_name(self) -> str | None:
+        """Get the current split name from the LiveSplit plugin, if registered.
 
-            # Capture screenshot if OBS is available and question is vague
-            screenshot = None
-            if use_screenshot and self.obs_client:
+        Returns:
+            Split name, or None if LiveSplit is unavailable
+        """
+        for plugin in self.plugins:
+            if plugin.name == "livesplit" and hasattr(plugin, 'get_current_split_name'):
                 try:
-                    screenshot = await self.obs_client.get_screenshot()
-                    if screenshot:
-                        logger.info("[AUTO] Including screenshot for vague question")
-                        system_prompt += "\n\nYou can see a screenshot of what's on screen. Use it to give specific context about what's happening."
+                    return await plugin.get_current_split_name()
                 except Exception as e:
-                    logger.debug(f"Failed to capture screenshot for auto-response: {e}")
+                    logger.debug(f"Error getting current split from {plugin.name}: {e}")
+                break
+        return None
+
+    def _build_kb_query(
+        self,
+        content: str,
+        state: ChannelState,
+        current_split: str | None,
+    ) -> str:
+        """Prefix a chat message with split or game context for KB search.
 
-            response = await self.ollama.generate(
-                prompt=message.content,
-                system_prompt=system_prompt,
-                images=[screenshot] if screenshot else None,
-                model_override=self.settings.ollama_vision_model if screenshot else None,
-            )
+        Args:
+            content: The chat message text
+            state: State of the channel the message was sent in
+            current_split: Current LiveSplit split name, if any
+
+        Returns:
+            Query string to embed
+        """
+        # LiveSplit runs next to the primary channel's stream only
+        if current_split and state.primary:
+            return f"{current_split}: {content}"
+        if state.current_game and state.current_game.game_name:
+            return f"{state.current_game.game_name}: {content}"
+        return content
+
+    @traced("auto")
+    async def _handle_auto_response(
+        self,
+        message,
+        state: ChannelState,
+        results: list[dict] | None = None,
+        query: str | None = None,
+    ) -> None:
+        """Handle automatic response to a question using KB.
 
-            # Enforce max length
-            if len(response) > MAX_RESPONSE_LENGTH - 50:
-                response = response[:MAX_RESPONSE_LENGTH - 53] + "..."
+        Args:
+            message: The chat message to respond to
+            state: State of the channel the message was sent in
+            results: KB results already retrieved for this message, if any
+            query: KB query still to be scored against the similarity threshold
+                (queue mode); without it or results, the KB is searched unconditionally
+        """
+        game_context = await self._get_game_context_string(state)
 
-            await message.channel.send(f"@{message.author.name} {response}")
+        if results is None and query is None:
+            # Include split name or game context in query for better matches
+            current_split = await self._get_current_split_name() if state.primary else None
+            payload_query = self._build_kb_query(message.content, state, current_split)
+        else:
+            payload_query = query
+
+        # Capture screenshot if OBS is available and question is vague. A queued
+        # candidate may still be rejected, so the worker hands accepted ones
+        # back for the screenshot instead.
+        content_lower = message.content.lower()
+        wants_screenshot = bool(self.obs_client) and any(
+            pattern in content_lower for pattern in VAGUE_QUESTION_PATTERNS
+        )
+        screenshot = None
+        if wants_screenshot and query is None:
+            screenshot = await self._capture_auto_screenshot()
+
+        await self._dispatch(
+            "auto",
+            {
+                "content": message.content,
+                "query": payload_query,
+                "require_match": query is not None,
+                "results": results,
+                "kb_path": state.kb_path,
+                "game": state.game_name,
+                "game_context": game_context,
+                "chat_context": state.chat_history_string(),
+                "screenshot": screenshot,
+                "wants_screenshot": wants_screenshot and query is not None,
+            },
+            message.channel,
+            message.author.name,
+            # A queued candidate the worker rejects still gets command handling
+            fallback_message=message if query is not None else None,
+        )
 
-            # Log detailed context
-            logger.info(f"Auto-responded to {message.author.name}: {message.content[:80]}")
-            logger.info(f"  Game context: {game_context if game_context else 'None'}")
-            logger.info(f"  KB sources: {[doc.get('metadata', {}).get('source', '?') for doc in results]}")
-            logger.info(f"  Top score: {results[0].get('score', 0):.2f}")
-            if chat_context:
-                logger.info(f"  Chat history:\n{chat_context}")
-            logger.info(f"  KB context preview: {kb_context[:300]}...")
-            logger.info(f"  Response: {response[:100]}...")
+    async def _capture_auto_screenshot(self) -> str | None:
+        """Capture a screenshot for a vague auto-response question.
 
+        Returns:
+            Base64 screenshot, or None if OBS is unavailable or the capture failed
+        """
+        if not self.obs_client:
+            return None
+        try:
+            with span("obs_screenshot"), metrics.obs_screenshot_seconds.time():
+                screenshot = await self.obs_client.get_screenshot()
         except Exception as e:
-            logger.error(f"Error in auto-response: {e}")
+            logger.debug(f"Failed to capture screenshot for auto-response: {e}")
+            return None
+        if screenshot:
+            logger.info("[AUTO] Including screenshot for vague question")
+        return screenshot
 
-    async def _handle_mention(self, message) -> None:
+    async def _resume_accepted_job(self, job, channel) -> None:
+        """Queue the reply to an auto-response a worker accepted, with a screenshot.
+
+        Args:
+            job: Accepted job, its payload holding the KB results
+            channel: TwitchIO channel to reply in
+        """
+        payload = dict(job.payload, screenshot=await self._capture_auto_screenshot(), wants_screenshot=False)
+        await self._dispatch("auto", payload, channel, job.author)
+
+    @traced("mention")
+    async def _handle_mention(self, message, state: ChannelState) -> None:
         """Handle when the bot is mentioned in chat.
 
         Args:
             message: The chat message mentioning the bot
+            state: State of the channel the message was sent in
         """
-        game_context = await self._get_game_context_string()
-        chat_context = self._get_chat_history_string()
+        await self._dispatch(
+            "mention",
+            {
+                "author": message.author.name,
+                "content": message.content,
+                "game_context": await self._get_game_context_string(state),
+                "chat_context": state.chat_history_string(),
+            },
+            message.channel,
+            message.author.name,
+        )
 
-        # Build the prompt with full context
-        prompt = f"{message.author.name} said: '{message.content}'\n\nRespond naturally to what they said."
+    async def _dispatch(
+        self,
+        kind: str,
+        payload: dict,
+        channel,
+        author: str,
+        error_reply: str | None = None,
+        fallback_message=None,
+    ) -> None:
+        """Run an inference job here, or queue it for a worker in queue mode.
 
-        try:
-            # Combine game and chat context
-            extra_context = ""
-            if chat_context:
-                extra_context = f"Recent chat history:\n{chat_context}"
-
-            system_prompt = build_system_prompt(
-                "ask",
-                game_context=game_context,
-                extra_context=extra_context if extra_context else None,
-            )
-
-            response = await self.ollama.generate(
-                prompt=prompt,
-                system_prompt=system_prompt,
-            )
+        Args:
+            kind: Job type (see InferenceService.run)
+            payload: Job parameters
+            channel: TwitchIO channel to reply in
+            author: Chatter the reply is addressed to
+            error_reply: Message sent to the chatter if the job fails
+            fallback_message: Chat message handed to command handling if the job declines to reply
+        """
+        if self.job_queue:
+            try:
+                with span("enqueue"):
+                    job_id = await asyncio.to_thread(
+                        self.job_queue.enqueue, kind, channel.name, author, payload
+                    )
+            except Exception as e:
+                logger.error(f"Failed to queue {kind} job: {e}")
+                if error_reply:
+                    await channel.send(f"@{author} {error_reply}")
+                return
+            self._awaiting_jobs[job_id] = PendingReply(channel, kind, error_reply, fallback_message)
+            return
 
-            # Enforce max length
-            if len(response) > MAX_RESPONSE_LENGTH - 50:  # Leave room for @mention
-                response = response[:MAX_RESPONSE_LENGTH - 53] + "..."
+        try:
+            reply = await self.inference.run(kind, payload)
+        except Exception as e:
+            logger.error(f"Error generating {kind} reply: {e}")
+            if error_reply:
+                await channel.send(f"@{author} {error_reply}")
+            return
 
-            await message.channel.send(f"@{message.author.name} {response}")
+        await self._send_reply(channel, author, kind, reply, fallback_message)
 
-            # Log detailed context
-            logger.info(f"Mention response to {message.author.name}: {message.content[:80]}")
-            logger.info(f"  Game context: {game_context if game_context else 'None'}")
-            if chat_context:
-                logger.info(f"  Chat history:\n{chat_context}")
-            logger.info(f"  Response: {response[:100]}...")
+    async def _send_reply(self, channel, author: str, kind: str, reply: str | None, fallback_message=None) -> None:
+        """Post a generated reply, truncated to fit Twitch chat.
 
-        except Exception as e:
-            logger.error(f"Error responding to mention: {e}")
+        Args:
+            channel: TwitchIO channel to reply in
+            author: Chatter the reply is addressed to
+            kind: Job type, for logging
+            reply: Reply text, or None if the job declined to reply
+            fallback_message: Chat message handed to command handling when there is no reply
+        """
+        if reply is None:
+            if fallback_message is not None:
+                await self.handle_commands(fallback_message)
+            return
 
-    def _get_chat_history_string(self) -> str:
-        """Get formatted chat history for context.
+        # Enforce max length, leaving room for the @mention
+        if len(reply) > MAX_RESPONSE_LENGTH - 50:
+            reply = reply[:MAX_RESPONSE_LENGTH - 53] + "..."
 
-        Returns:
-            Formatted string of recent chat messages
-        """
-        if not self.chat_history:
-            return ""
+        await channel.send(f"@{author} {reply}")
+        logger.info(f"{kind} response to {author}: {reply[:100]}...")
 
-        lines = []
-        for msg in self.chat_history:
-            lines.append(f"{msg['user']}: {msg['content']}")
+    async def _deliver_job_replies(self) -> None:
+        """Poll the job queue and post replies finished by workers."""
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self.job_queue.collect_finished)
+                for job in jobs:
+                    pending = self._awaiting_jobs.pop(job.id, None)
+                    # Jobs queued before a bot restart can still be delivered by channel name
+                    channel = pending.channel if pending else self.get_channel(job.channel)
+                    if channel is None:
+                        continue
+
+                    if job.status == "accepted":
+                        await self._resume_accepted_job(job, channel)
+                        continue
+
+                    if job.status == "failed":
+                        logger.error(f"Worker failed {job.kind} job {job.id}: {job.error}")
+                        if pending and pending.error_reply:
+                            await channel.send(f"@{job.author} {pending.error_reply}")
+                        continue
+
+                    await self._send_reply(
+                        channel,
+                        job.author,
+                        job.kind,
+                        job.reply,
+                        pending.fallback_message if pending else None,
+                    )
+            except Exception as e:
+                logger.error(f"Error delivering job replies: {e}")
 
-        return "\n".join(lines)
+            await asyncio.sleep(self.settings.job_poll_interval)
 
     def register_plugin(self, plugin: BasePlugin) -> None:
         """Register a plugin with the bot.
@@ -502,86 +768,78 @@ class TwitchBot(commands.Bot):
 
     async def close(self) -> None:
         """Clean up resources before shutdown."""
-        # Cancel game polling task
-        if self._game_poll_task:
-            self._game_poll_task.cancel()
+        # Cancel game polling tasks
+        for state in self.channels.values():
+            if state.game_poll_task:
+                state.game_poll_task.cancel()
+                try:
+                    await state.game_poll_task
+                except asyncio.CancelledError:
+                    pass
+
+        # Stop delivering worker replies
+        if self._delivery_task:
+            self._delivery_task.cancel()
             try:
-                await self._game_poll_task
+                await self._delivery_task
             except asyncio.CancelledError:
                 pass
+        if self.job_queue:
+            self.job_queue.close()
+
+        # Stop latency reports
+        if self._trace_report_task:
+            self._trace_report_task.cancel()
+
+        # Stop serving metrics
+        if self._loop_lag_task:
+            self._loop_lag_task.cancel()
+        if self._metrics_server:
+            await self._metrics_server.close()
+
+        # Stop watching the docs folder
+        if self._docs_watcher:
+            await self._docs_watcher.close()
 
         # Disconnect from OBS
         if self.obs_client:
             await self.obs_client.disconnect()
 
+        # Finish any auto-response batch still waiting on its window
+        await self._auto_batcher.close()
+
         # Teardown plugins
         for plugin in self.plugins:
             await plugin.teardown()
 
-        await super().close()
-
-    def _get_stream_history_string(self) -> str:
-        """Get a formatted string describing games played during this stream.
-
-        Returns:
-            History string like "Tonight's stream: Dead Space (1hr), then RE2 (current)"
-        """
-        if not self.stream_history:
-            return ""
+        # Stop model warm-ups, health probes and pooled model backend connections
+        if self._warmup_task:
+            self._warmup_task.cancel()
+        if self.residency:
+            await self.residency.close()
+        await self.ollama_pool.close()
 
-        parts = []
-        for i, session in enumerate(self.stream_history):
-            game = session["game"]
-            started = session["started"]
-            ended = session["ended"]
-
-            if ended:
-                # Calculate duration
-                duration = ended - started
-                minutes = int(duration.total_seconds() / 60)
-                if minutes >= 60:
-                    hours = minutes // 60
-                    mins = minutes % 60
-                    duration_str = f"{hours}hr {mins}min" if mins else f"{hours}hr"
-                else:
-                    duration_str = f"{minutes}min"
-                parts.append(f"{game} ({duration_str})")
-            else:
-                # Current game
-                duration = datetime.now() - started
-                minutes = int(duration.total_seconds() / 60)
-                if minutes >= 60:
-                    hours = minutes // 60
-                    mins = minutes % 60
-                    duration_str = f"{hours}hr {mins}min" if mins else f"{hours}hr"
-                else:
-                    duration_str = f"{minutes}min"
-                parts.append(f"{game} ({duration_str}, current)")
-
-        if not parts:
-            return ""
+        await super().close()
 
-        return "Tonight's stream: " + ", then ".join(parts)
+    async def _get_game_context_string(self, state: ChannelState) -> str:
+        """Get a formatted string describing a channel's current game/stream context.
 
-    async def _get_game_context_string(self) -> str:
-        """Get a formatted string describing the current game/stream context.
+        Args:
+            state: The channel to describe
 
         Returns:
             Context string for system prompts, or empty string if no context
         """
         parts = []
 
-        if self.current_game:
-            context = self.current_game.to_context_string()
-            if context:
-                parts.append(context)
-
-        history = self._get_stream_history_string()
-        if history:
-            parts.append(history)
+        # Game and stream history only change on game polls, so they're cached
+        stream_context = state.stream_context_string()
+        if stream_context:
+            parts.append(stream_context)
 
-        # Get plugin context (e.g., LiveSplit timer state)
-        for plugin in self.plugins:
+        # Get plugin context (e.g., LiveSplit timer state) - plugins are local
+        # to the primary channel's stream
+        for plugin in self.plugins if state.primary else []:
             if hasattr(plugin, 'get_context_string'):
                 try:
                     plugin_context = await plugin.get_context_string()
@@ -591,7 +849,7 @@ class TwitchBot(commands.Bot):
                     logger.debug(f"Error getting context from plugin {plugin.name}: {e}")
 
         if parts:
-            return " ".join(parts) + " Focus your answer on this game/series first, but you can reference other games when useful."
+            return " ".join(parts) + GAME_FOCUS_NOTE
         return ""
 
     @commands.command(name="ping")
@@ -604,6 +862,7 @@ class TwitchBot(commands.Bot):
         await ctx.send(f"pong @{ctx.author.name}")
 
     @commands.command(name="ask")
+    @traced("ask")
     async def cmd_ask(self, ctx: commands.Context) -> None:
         """Send a question to the LLM and reply with the answer.
 
@@ -619,39 +878,35 @@ class TwitchBot(commands.Bot):
         question_text = question[1]
         logger.info(f"User {ctx.author.name} asked: {question_text}")
 
-        try:
-            # Generate response from Ollama with persona and game context
-            game_context = await self._get_game_context_string()
-            system_prompt = build_system_prompt("ask", game_context=game_context)
-
-            response = await self.ollama.generate(
-                prompt=question_text,
-                system_prompt=system_prompt,
-            )
-
-            # Truncate if too long for Twitch
-            if len(response) > MAX_RESPONSE_LENGTH - 50:
-                response = response[:MAX_RESPONSE_LENGTH - 53] + "..."
-
-            await ctx.send(f"@{ctx.author.name} {response}")
-
-        except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            await ctx.send(f"@{ctx.author.name} Sorry, I couldn't process that request.")
+        # Generate response from Ollama with persona and game context
+        state = self._channel_state(ctx.channel)
+        await self._dispatch(
+            "ask",
+            {
+                "question": question_text,
+                "game_context": await self._get_game_context_string(state),
+            },
+            ctx.channel,
+            ctx.author.name,
+            error_reply="Sorry, I couldn't process that request.",
+        )
 
     @commands.command(name="lore")
+    @traced("lore")
     async def cmd_lore(self, ctx: commands.Context) -> None:
         """Answer a question using the knowledge base (RAG).
 
         Args:
             ctx: Command context
         """
+        state = self._channel_state(ctx.channel)
+
         # Check if RAG is available
-        if not self.doc_store or not self.settings.kb_enabled:
+        if not state.kb_path:
             await ctx.send(f"@{ctx.author.name} Knowledge base is not enabled.")
             return
 
-        if self.doc_store.document_count() == 0:
+        if state.doc_store and state.doc_store.document_count() == 0:
             await ctx.send(f"@{ctx.author.name} Knowledge base is empty. No lore available yet!")
             return
 
@@ -664,46 +919,22 @@ class TwitchBot(commands.Bot):
         question_text = question[1]
         logger.info(f"User {ctx.author.name} asked lore: {question_text}")
 
-        try:
-            # Query knowledge base
-            results = await self.doc_store.query_knowledge_base(question_text, top_k=5)
-
-            if not results:
-                await ctx.send(f"@{ctx.author.name} No relevant information found in the knowledge base.")
-                return
-
-            # Build context from results
-            context_parts = []
-            for doc in results:
-                source = doc.get("metadata", {}).get("source", "unknown")
-                section = doc.get("metadata", {}).get("section_title", "")
-                if section:
-                    context_parts.append(f"[{source} - {section}]:\n{doc['content']}")
-                else:
-                    context_parts.append(f"[{source}]:\n{doc['content']}")
-
-            context = "\n\n".join(context_parts)
-
-            # Generate response with RAG context, persona, and game context
-            game_context = await self._get_game_context_string()
-            system_prompt = build_system_prompt("lore", extra_context=context, game_context=game_context)
-
-            response = await self.ollama.generate(
-                prompt=question_text,
-                system_prompt=system_prompt,
-            )
-
-            # Truncate if too long for Twitch
-            if len(response) > MAX_RESPONSE_LENGTH - 50:
-                response = response[:MAX_RESPONSE_LENGTH - 53] + "..."
-
-            await ctx.send(f"@{ctx.author.name} {response}")
-
-        except Exception as e:
-            logger.error(f"Error in !lore command: {e}")
-            await ctx.send(f"@{ctx.author.name} Sorry, I couldn't search the knowledge base.")
+        # Generate response with RAG context, persona, and game context
+        await self._dispatch(
+            "lore",
+            {
+                "question": question_text,
+                "game_context": await self._get_game_context_string(state),
+                "kb_path": state.kb_path,
+                "game": state.game_name,
+            },
+            ctx.channel,
+            ctx.author.name,
+            error_reply="Sorry, I couldn't search the knowledge base.",
+        )
 
     @commands.command(name="screenshot")
+    @traced("screenshot")
     async def cmd_screenshot(self, ctx: commands.Context) -> None:
         """Capture a screenshot and describe what's happening using vision model.
 
@@ -723,44 +954,31 @@ class TwitchBot(commands.Bot):
 
         try:
             # Capture screenshot (stays in memory as base64)
-            screenshot = await self.obs_client.get_screenshot()
-
-            if not screenshot:
-                await ctx.send(f"@{ctx.author.name} Failed to capture screenshot from OBS.")
-                return
-
-            # Build strict vision prompt - prevent hallucination
-            vision_system = """Analyze this stream screenshot.
-
-RULES:
-- Answer in 1 sentence MAX (under 150 characters)
-- Only describe what you literally see
-- Be direct and factual
-- No speculation or predictions
-
-If asked a question, answer it briefly. Otherwise, state the key visible element."""
-
-            # Generate response using vision model
-            response = await self.ollama.generate(
-                prompt=question,
-                system_prompt=vision_system,
-                images=[screenshot],
-                model_override=self.settings.ollama_vision_model,
-            )
-
-            # Truncate if too long for Twitch
-            if len(response) > MAX_RESPONSE_LENGTH - 50:
-                response = response[:MAX_RESPONSE_LENGTH - 53] + "..."
-
-            await ctx.send(f"@{ctx.author.name} {response}")
-
-            logger.info(f"Screenshot response to {ctx.author.name}: {response[:100]}...")
-
+            with span("obs_screenshot"), metrics.obs_screenshot_seconds.time():
+                screenshot = await self.obs_client.get_screenshot()
         except Exception as e:
             logger.error(f"Error in !screenshot command: {e}")
             await ctx.send(f"@{ctx.author.name} Sorry, I couldn't process the screenshot.")
+            return
+
+        if not screenshot:
+            await ctx.send(f"@{ctx.author.name} Failed to capture screenshot from OBS.")
+            return
+
+        # Generate response using vision model
+        await self._dispatch(
+            "screenshot",
+            {
+                "question": question,
+                "screenshot": screenshot,
+            },
+            ctx.channel,
+            ctx.author.name,
+            error_reply="Sorry, I couldn't process the screenshot.",
+        )
 
     @commands.command(name="look")
+    @traced("look")
     async def cmd_look(self, ctx: commands.Context) -> None:
         """Look at the screen and answer with persona + game context.
 
@@ -780,41 +998,27 @@ If asked a question, answer it briefly. Otherwise, state the key visible element
 
         try:
             # Capture screenshot
-            screenshot = await self.obs_client.get_screenshot()
-
-            if not screenshot:
-                await ctx.send(f"@{ctx.author.name} Failed to capture screenshot from OBS.")
-                return
-
-            # Build persona prompt with game context
-            game_context = await self._get_game_context_string()
-            system_prompt = build_system_prompt("ask", game_context=game_context)
-
-            # Add vision-specific guidance
-            system_prompt += """
-
-When analyzing the image:
-- Base your answer on what you can see
-- You can use your game knowledge to provide context
-- Stay in character with your usual tone
-- Don't make up things that aren't visible"""
-
-            # Generate response using vision model
-            response = await self.ollama.generate(
-                prompt=question,
-                system_prompt=system_prompt,
-                images=[screenshot],
-                model_override=self.settings.ollama_vision_model,
-            )
-
-            # Truncate if too long for Twitch
-            if len(response) > MAX_RESPONSE_LENGTH - 50:
-                response = response[:MAX_RESPONSE_LENGTH - 53] + "..."
-
-            await ctx.send(f"@{ctx.author.name} {response}")
-
-            logger.info(f"Look response to {ctx.author.name}: {response[:100]}...")
-
+            with span("obs_screenshot"), metrics.obs_screenshot_seconds.time():
+                screenshot = await self.obs_client.get_screenshot()
         except Exception as e:
             logger.error(f"Error in !look command: {e}")
             await ctx.send(f"@{ctx.author.name} Sorry, I couldn't process that.")
+            return
+
+        if not screenshot:
+            await ctx.send(f"@{ctx.author.name} Failed to capture screenshot from OBS.")
+            return
+
+        # Generate response using vision model with persona and game context
+        state = self._channel_state(ctx.channel)
+        await self._dispatch(
+            "look",
+            {
+                "question": question,
+                "game_context": await self._get_game_context_string(state),
+                "screenshot": screenshot,
+            },
+            ctx.channel,
+            ctx.author.name,
+            error_reply="Sorry, I couldn't process that.",
+        )
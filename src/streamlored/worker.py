@@ -0,0 +1,142 @@
+"""Inference worker that pulls chat reply jobs from the job queue."""
+
+import asyncio
+import logging
+import os
+import socket
+
+from streamlored.config import Settings
+from streamlored.inference import InferenceService
+from streamlored.job_queue import Job, SQLiteJobQueue
+from streamlored.tracing import report_periodically, trace, tracer
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sweeps for jobs abandoned by crashed workers
+STALE_SWEEP_INTERVAL = 10.0
+
+
+class InferenceWorker:
+    """Claims jobs from the queue and runs them on an InferenceService.
+
+    Run one per core or per Ollama host; each process loads its own KB and
+    talks to whichever Ollama server its settings point at.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        queue: SQLiteJobQueue,
+        service: InferenceService,
+    ) -> None:
+        """Initialize the worker.
+
+        Args:
+            settings: Application settings
+            queue: Job queue shared with the bot
+            service: Service that runs retrieval and generation
+        """
+        self.settings = settings
+        self.queue = queue
+        self.service = service
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        """Process jobs until cancelled."""
+        logger.info(f"Worker {self.worker_id} started (concurrency {self.settings.worker_concurrency})")
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time()
+
+        tracer.resize(self.settings.trace_buffer_size)
+        report_task = None
+        if tracer.capacity and self.settings.trace_report_interval > 0:
+            report_task = asyncio.create_task(report_periodically(self.settings.trace_report_interval))
+
+        try:
+            while True:
+                if loop.time() >= next_sweep:
+                    await asyncio.to_thread(self.queue.requeue_stale, self.settings.job_timeout)
+                    next_sweep = loop.time() + STALE_SWEEP_INTERVAL
+
+                free_slots = self.settings.worker_concurrency - len(self._running)
+                jobs: list[Job] = []
+                if free_slots > 0:
+                    jobs = await asyncio.to_thread(self.queue.claim, self.worker_id, free_slots)
+
+                if not jobs:
+                    await asyncio.sleep(self.settings.job_poll_interval)
+                    continue
+
+                for job in await self._prescore_auto_jobs(jobs):
+                    task = asyncio.create_task(self._run_job(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+        finally:
+            for task in self._running:
+                task.cancel()
+            if report_task:
+                report_task.cancel()
+
+    async def _prescore_auto_jobs(self, jobs: list[Job]) -> list[Job]:
+        """Score claimed auto-response candidates against the KB in batches.
+
+        Candidates for the same KB share one embedding call and scoring pass.
+        Rejected candidates are completed with no reply right away; accepted
+        ones that want a screenshot are handed back to the bot to take it.
+
+        Args:
+            jobs: Jobs just claimed from the queue
+
+        Returns:
+            Jobs that still need to run
+        """
+        groups: dict[str, list[Job]] = {}
+        for job in jobs:
+            if job.kind == "auto" and job.payload.get("require_match") and job.payload.get("kb_path"):
+                groups.setdefault(job.payload["kb_path"], []).append(job)
+
+        settled: set[int] = set()
+        for kb_path, group in groups.items():
+            doc_store = self.service.get_doc_store(kb_path)
+            if not doc_store:
+                continue
+            try:
+                with trace("auto_batch"):
+                    decisions = await self.service.score_candidates(
+                        doc_store,
+                        [job.payload["query"] for job in group],
+                        [job.payload.get("game") for job in group],
+                    )
+            except Exception as e:
+                logger.error(f"Error checking KB relevance: {e}")
+                decisions = [None] * len(group)
+
+            for job, results in zip(group, decisions):
+                if results is None:
+                    await asyncio.to_thread(self.queue.complete, job.id, self.worker_id, None)
+                    settled.add(job.id)
+                    continue
+                job.payload["results"] = results
+                job.payload["require_match"] = False
+                if job.payload.get("wants_screenshot"):
+                    await asyncio.to_thread(self.queue.accept, job.id, self.worker_id, job.payload)
+                    settled.add(job.id)
+
+        return [job for job in jobs if job.id not in settled]
+
+    async def _run_job(self, job: Job) -> None:
+        """Run one job and store its reply or error."""
+        try:
+            with trace(job.kind):
+                reply = await self.service.run(job.kind, job.payload)
+        except Exception as e:
+            logger.error(f"Error running {job.kind} job {job.id}: {e}")
+            if not await asyncio.to_thread(self.queue.fail, job.id, self.worker_id, str(e)):
+                logger.warning(f"Dropped error of {job.kind} job {job.id}: it was handed to another worker")
+            return
+
+        if not await asyncio.to_thread(self.queue.complete, job.id, self.worker_id, reply):
+            logger.warning(f"Dropped reply to {job.kind} job {job.id}: it was handed to another worker")
+            return
+        logger.info(f"Finished {job.kind} job {job.id} for {job.author} in #{job.channel}")
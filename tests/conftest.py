@@ -0,0 +1,11 @@
+"""Shared fixtures for the test suite."""
+
+import pytest
+
+from streamlored.rag.benchmark import HashingEmbeddingProvider
+
+
+@pytest.fixture
+def embedder() -> HashingEmbeddingProvider:
+    """Deterministic embedder that needs no Ollama server."""
+    return HashingEmbeddingProvider(dim=64)
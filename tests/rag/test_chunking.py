@@ -0,0 +1,266 @@
+"""Markdown and plain-text chunking."""
+
+import random
+import re
+from pathlib import Path
+
+import pytest
+
+from streamlored.rag.chunking import (
+    MAX_PARAGRAPH_FACTOR,
+    chunk_markdown,
+    chunk_plain_text,
+    iter_markdown_chunks,
+)
+from streamlored.rag.packing import CHARS_PER_TOKEN, estimate_tokens
+
+DOCS_PATH = Path(__file__).resolve().parents[2] / "docs"
+
+
+# The whole-string chunker that iter_markdown_chunks replaced, kept as the
+# reference for its header and paragraph semantics
+def reference_chunk_markdown(content: str, source: str, max_chars: int = 1000) -> list[dict]:
+    sections = []
+    last_end = 0
+    last_header = ""
+    for match in re.finditer(r"^(#{1,6}\s+.+)$", content, re.MULTILINE):
+        if match.start() > last_end:
+            section_content = content[last_end:match.start()].strip()
+            if section_content or last_header:
+                sections.append((last_header, section_content))
+        last_header = match.group(1)
+        last_end = match.end()
+    remaining = content[last_end:].strip()
+    if remaining or last_header:
+        sections.append((last_header, remaining))
+
+    chunks = []
+    for header, body in sections:
+        full = f"{header}\n{body}".strip() if header else body.strip()
+        if not full:
+            continue
+        title = re.sub(r"^#+\s*", "", header).strip()
+        texts = [full] if len(full) <= max_chars else reference_paragraphs(full, title, max_chars)
+        chunks.extend({"content": text, "section_title": title} for text in texts)
+    return chunks
+
+
+def reference_paragraphs(content: str, title: str, max_chars: int) -> list[str]:
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", content) if p.strip()]
+    chunks = []
+    current = ""
+    for para in paragraphs:
+        if current and len(current) + len(para) + 2 > max_chars:
+            chunks.append(current)
+            current = f"[{title}]\n{para}" if title else para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def contents(chunks: list[dict]) -> list[tuple[str, str]]:
+    return [(chunk["content"], chunk["metadata"]["section_title"]) for chunk in chunks]
+
+
+def reference_contents(content: str, max_chars: int) -> list[tuple[str, str]]:
+    chunks = reference_chunk_markdown(content, "x.md", max_chars)
+    return [(chunk["content"], chunk["section_title"]) for chunk in chunks]
+
+
+def random_markdown(rng: random.Random, max_chars: int) -> str:
+    """Headers (bare ones too), paragraphs and stray blank or whitespace lines, without code fences.
+
+    Kept under the length at which the streaming chunkers cut an unbroken
+    paragraph, which the reference never does.
+    """
+    words = ["boss", "key", "Nemesis", "route", "any%", "save", "door", "#tag", "ammo.", "Why?"]
+    lines: list[str] = []
+    for _ in range(rng.randint(0, 40)):
+        if sum(len(line) + 1 for line in lines) > max_chars * (MAX_PARAGRAPH_FACTOR - 1):
+            break
+        kind = rng.random()
+        if kind < 0.15:
+            lines.append("#" * rng.randint(1, 6) + " " + " ".join(rng.choices(words, k=rng.randint(1, 4))))
+        elif kind < 0.2:
+            lines.append("#" * rng.randint(1, 3) + rng.choice(["", " ", "  "]))
+        elif kind < 0.4:
+            lines.append(rng.choice(["", "", "   ", "\t"]))
+        else:
+            indent = rng.choice(["", "", "", "  "])
+            lines.append(indent + " ".join(rng.choices(words, k=rng.randint(1, 30))))
+    return "\n".join(lines) + rng.choice(["", "\n", "\n\n"])
+
+
+@pytest.mark.parametrize(
+    "path", sorted(DOCS_PATH.rglob("*.md")), ids=lambda path: path.relative_to(DOCS_PATH).as_posix()
+)
+def test_markdown_matches_reference_on_docs(path):
+    content = path.read_text(encoding="utf-8")
+    for max_chars in (300, 1000):
+        assert contents(chunk_markdown(content, "x.md", max_chars)) == reference_contents(content, max_chars)
+
+
+def test_markdown_matches_reference_on_random_input():
+    rng = random.Random(41)
+    for _ in range(2000):
+        max_chars = rng.choice([40, 120, 400])
+        content = random_markdown(rng, max_chars)
+        chunks = chunk_markdown(content, "x.md", max_chars)
+        assert contents(chunks) == reference_contents(content, max_chars), content
+        assert [c["metadata"]["chunk_index"] for c in chunks] == list(range(len(chunks)))
+        assert all(c["metadata"]["total_chunks"] == len(chunks) for c in chunks)
+
+
+def test_plain_text_matches_reference_paragraphs():
+    rng = random.Random(7)
+    for _ in range(300):
+        max_chars = rng.choice([40, 120, 400])
+        content = random_markdown(rng, max_chars).replace("#", "")
+        chunks = chunk_plain_text(content, "x.txt", max_chars)
+        assert [c["content"] for c in chunks] == reference_paragraphs(content, "", max_chars)
+
+
+def test_iter_markdown_chunks_reads_lines_lazily():
+    def lines():
+        yield "# Title\n"
+        yield "first paragraph\n"
+        yield "\n"
+        yield "# Next\n"
+        raise AssertionError("read past the first section")
+
+    chunks = iter_markdown_chunks(lines(), "x.md")
+    assert next(chunks)["content"] == "# Title\nfirst paragraph"
+
+
+def test_hash_lines_inside_fences_are_not_headers():
+    content = "## Setup\nRun this:\n```bash\n# install deps\npip install x\n```\n## Next\nMore text"
+    chunks = chunk_markdown(content, "x.md")
+    assert contents(chunks) == [
+        ("## Setup\nRun this:\n```bash\n# install deps\npip install x\n```", "Setup"),
+        ("## Next\nMore text", "Next"),
+    ]
+    assert chunks[0]["metadata"]["header_path"] == "Setup"
+
+
+def test_tilde_fences_and_longer_closing_fences():
+    content = "# A\n~~~\n# not a header\n~~~~\n# B\ntext\n````\n```\n# still code\n````\n# C"
+    titles = [chunk["metadata"]["section_title"] for chunk in chunk_markdown(content, "x.md")]
+    assert titles == ["A", "B", "C"]
+
+
+def test_fenced_blocks_are_not_split_at_blank_lines():
+    code = "```python\ndef boss():\n\n    return 1\n\n\n# phase two\nprint(boss())\n```"
+    filler = "Intro text for the section. " * 3
+    content = f"# Code\n{filler.strip()}\n\n{code}\n\nOutro text after the block."
+    chunks = chunk_markdown(content, "x.md", max_chars=len(code) + 15)
+    assert [chunk["content"] for chunk in chunks] == [
+        f"# Code\n{filler.strip()}",
+        f"[Code]\n{code}",
+        "[Code]\nOutro text after the block.",
+    ]
+
+
+def test_unclosed_fence_runs_to_the_end_of_the_file():
+    content = "# A\n```\n# one\n\n# two\n"
+    chunks = chunk_markdown(content, "x.md")
+    assert contents(chunks) == [("# A\n```\n# one\n\n# two", "A")]
+
+
+def sentences(count: int, offset: int = 0) -> str:
+    return " ".join(f"Sentence {i} is about the boss." for i in range(offset, offset + count))
+
+
+def bodies(chunks: list[dict]) -> list[str]:
+    """Chunk contents without their header path line."""
+    return [
+        chunk["content"].split("\n", 1)[1] if chunk["metadata"]["header_path"] else chunk["content"]
+        for chunk in chunks
+    ]
+
+
+@pytest.mark.parametrize("max_tokens", [20, 40, 200])
+@pytest.mark.parametrize("overlap_tokens", [0, 8])
+def test_token_chunks_fit_max_tokens_with_header_path(max_tokens, overlap_tokens):
+    rng = random.Random(max_tokens + overlap_tokens)
+    words = ["boss", "Nemesis", "key", "route.", "any%", "save", "door?", "averyveryverylongunbrokenword" * 3]
+    paragraphs = [" ".join(rng.choices(words, k=rng.randint(1, 120))) for _ in range(30)]
+    content = "# Resident Evil 3\n## Any% Route\n### Nemesis Fights\n" + "\n\n".join(paragraphs)
+    chunks = chunk_markdown(content, "x.md", max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["content"].startswith("[Resident Evil 3 > Any% Route > Nemesis Fights]\n")
+        assert estimate_tokens(chunk["content"]) <= max_tokens
+    # Nothing is lost or reordered (overlap only repeats text)
+    expected = "".join("".join(paragraphs).split())
+    found = "".join("".join(bodies(chunks)).split())
+    if overlap_tokens:
+        remaining = iter(found)
+        assert all(char in remaining for char in expected)
+    else:
+        assert found == expected
+
+
+def test_token_overlap_repeats_previous_tail():
+    text = sentences(40)
+    chunks = chunk_plain_text(text, "x.txt", max_tokens=30, overlap_tokens=10)
+    assert len(chunks) > 2
+
+    end = 0
+    for i, body in enumerate(bodies(chunks)):
+        start = text.find(body)
+        assert start >= 0, body
+        if i:
+            # Starts inside the previous chunk, repeating at most overlap_tokens of it
+            assert start < end
+            assert 0 < end - start <= 10 * CHARS_PER_TOKEN
+            assert body.startswith(text[start:end])
+        end = start + len(body)
+    assert end == len(text)
+
+
+def test_token_chunks_without_overlap_tile_the_text():
+    text = sentences(40)
+    chunks = chunk_plain_text(text, "x.txt", max_tokens=30)
+    assert " ".join(bodies(chunks)) == text
+
+
+def test_token_chunks_split_long_words():
+    word = "x" * 500
+    chunks = chunk_plain_text(f"start {word} end", "x.txt", max_tokens=20, overlap_tokens=5)
+    assert all(len(chunk["content"]) <= 20 * CHARS_PER_TOKEN for chunk in chunks)
+    assert "".join(bodies(chunks)).count("x") >= 500
+
+
+def test_nested_header_paths():
+    content = (
+        "Intro before any header\n"
+        "# Resident Evil\nGame text\n"
+        "## Any%\nRoute text\n"
+        "### Nemesis\nBoss text\n"
+        "#### \n\nKnife only\nBare header text\n"
+        "## Knife%\nOther route\n"
+        "# Dino Crisis\nNext game\n"
+    )
+    chunks = chunk_markdown(content, "x.md", max_tokens=100)
+    assert [(chunk["metadata"]["header_path"], chunk["content"]) for chunk in chunks] == [
+        ("", "Intro before any header"),
+        ("Resident Evil", "[Resident Evil]\nGame text"),
+        ("Resident Evil > Any%", "[Resident Evil > Any%]\nRoute text"),
+        ("Resident Evil > Any% > Nemesis", "[Resident Evil > Any% > Nemesis]\nBoss text"),
+        (
+            "Resident Evil > Any% > Nemesis > Knife only",
+            "[Resident Evil > Any% > Nemesis > Knife only]\nBare header text",
+        ),
+        ("Resident Evil > Knife%", "[Resident Evil > Knife%]\nOther route"),
+        ("Dino Crisis", "[Dino Crisis]\nNext game"),
+    ]
+    assert [chunk["metadata"]["section_title"] for chunk in chunks] == [
+        "", "Resident Evil", "Any%", "Nemesis", "Knife only", "Knife%", "Dino Crisis"
+    ]
+    # Character mode records the same paths
+    assert [c["metadata"]["header_path"] for c in chunk_markdown(content, "x.md")] == [
+        chunk["metadata"]["header_path"] for chunk in chunks
+    ]
@@ -0,0 +1,130 @@
+"""Crash safety of the JSON store's snapshot + write-ahead log."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from streamlored.rag.json_store import JsonDocumentStore
+
+
+def docs(*names: str) -> list[dict]:
+    return [{"content": f"notes about {name}", "metadata": {"path": f"{name}.md"}} for name in names]
+
+
+def contents(store: JsonDocumentStore) -> list[str]:
+    return sorted(store._document(i)["content"] for i in store._live_indexes())
+
+
+def test_torn_final_record_is_discarded(tmp_path, embedder):
+    kb_path = tmp_path / "kb.json"
+    store = JsonDocumentStore(str(kb_path), embedder)
+    asyncio.run(store.ingest_documents(docs("alpha", "bravo")))
+    store.close()
+    intact_size = store.log_path.stat().st_size
+
+    # A crash in the middle of an append leaves a record without its newline
+    with open(store.log_path, "ab") as f:
+        f.write(b'{"op":"add","doc":{"id":"torn","content":"half a reco')
+
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert contents(store) == ["notes about alpha", "notes about bravo"]
+    assert store.log_path.stat().st_size == intact_size
+
+    # Appends after recovery start on a clean record boundary
+    asyncio.run(store.ingest_documents(docs("charlie")))
+    store.close()
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert contents(store) == ["notes about alpha", "notes about bravo", "notes about charlie"]
+    store.close()
+
+
+def test_replay_is_idempotent_after_interrupted_compaction(tmp_path, embedder, monkeypatch):
+    kb_path = tmp_path / "kb.json"
+    store = JsonDocumentStore(str(kb_path), embedder)
+    names = [f"doc{i}" for i in range(8)]
+    asyncio.run(store.ingest_documents(docs(*names)))
+    asyncio.run(store.delete_documents(store.document_ids({"path": "doc0.md"})))
+
+    # Crash after the snapshot is renamed into place but before the log is trimmed
+    def crash(offset: int) -> None:
+        raise OSError("simulated crash")
+
+    monkeypatch.setattr(store, "_truncate_log", crash)
+    with pytest.raises(OSError):
+        asyncio.run(store.compact())
+    store.close()
+    assert kb_path.exists() and store.log_path.exists()
+
+    store = JsonDocumentStore(str(kb_path), embedder)
+    expected = [f"notes about {name}" for name in names[1:]]
+    assert contents(store) == expected
+    assert len(set(store._ids)) == len(store._ids)
+
+    # Compacting the recovered store converges on the same documents
+    asyncio.run(store.compact())
+    store.close()
+    assert not store.log_path.exists()
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert contents(store) == expected
+    store.close()
+
+
+def test_clear_survives_reopen(tmp_path, embedder):
+    kb_path = tmp_path / "kb.json"
+    store = JsonDocumentStore(str(kb_path), embedder)
+    asyncio.run(store.ingest_documents(docs("alpha", "bravo")))
+    asyncio.run(store.compact())
+    store.clear()
+    store.close()
+
+    # The snapshot still holds the old documents; the logged clear hides them
+    assert len(json.loads(kb_path.read_text(encoding="utf-8"))) == 2
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert store.document_count() == 0
+    asyncio.run(store.ingest_documents(docs("charlie")))
+    store.close()
+
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert contents(store) == ["notes about charlie"]
+    asyncio.run(store.compact())
+    store.close()
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert contents(store) == ["notes about charlie"]
+    store.close()
+
+
+def test_append_during_compaction_is_kept(tmp_path, embedder, monkeypatch):
+    kb_path = tmp_path / "kb.json"
+    store = JsonDocumentStore(str(kb_path), embedder)
+    snapshot_started = threading.Event()
+    finish_snapshot = threading.Event()
+    write_snapshot = store._write_snapshot
+
+    def slow_write_snapshot(documents: list[dict]) -> int:
+        snapshot_started.set()
+        finish_snapshot.wait(timeout=10)
+        return write_snapshot(documents)
+
+    monkeypatch.setattr(store, "_write_snapshot", slow_write_snapshot)
+
+    async def race() -> None:
+        await store.ingest_documents(docs("alpha", "bravo"))
+        compaction = asyncio.create_task(store.compact())
+        await asyncio.to_thread(snapshot_started.wait, 10)
+        # Appended while the snapshot without it is being written
+        await store.ingest_documents(docs("charlie"))
+        finish_snapshot.set()
+        await compaction
+        results = await store.query_knowledge_base("notes about charlie", top_k=1)
+        assert results[0]["content"] == "notes about charlie"
+
+    asyncio.run(race())
+    store.close()
+    assert len(json.loads(kb_path.read_text(encoding="utf-8"))) == 2
+    assert store.log_path.exists()
+
+    store = JsonDocumentStore(str(kb_path), embedder)
+    assert contents(store) == ["notes about alpha", "notes about bravo", "notes about charlie"]
+    store.close()
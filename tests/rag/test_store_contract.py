@@ -0,0 +1,170 @@
+"""Behaviour shared by JsonDocumentStore and SQLiteDocumentStore."""
+
+import asyncio
+from collections.abc import Callable, Iterator
+
+import pytest
+
+from streamlored.rag.json_store import JsonDocumentStore
+from streamlored.rag.sqlite_store import SQLiteDocumentStore
+
+STORES = {
+    "json": (JsonDocumentStore, "kb.json"),
+    "sqlite": (SQLiteDocumentStore, "kb.db"),
+}
+
+DOCS = [
+    {"content": "The Slasher necromorph has long blade arms", "metadata": {"series": "dead_space", "path": "ds/enemies.md"}},
+    {"content": "Plasma cutter ammo is found in supply lockers", "metadata": {"series": "dead_space", "path": "ds/items.md"}},
+    {"content": "Nemesis chases Jill through Raccoon City", "metadata": {"series": "resident_evil", "path": "re/enemies.md"}},
+    {"content": "Ink ribbons let you save at a typewriter", "metadata": {"series": "resident_evil", "path": "re/items.md"}},
+]
+
+
+@pytest.fixture(params=sorted(STORES))
+def open_store(request, tmp_path, embedder) -> Iterator[Callable[..., JsonDocumentStore | SQLiteDocumentStore]]:
+    """Factory opening (another instance of) the same KB, closed after the test."""
+    store_class, filename = STORES[request.param]
+    opened = []
+
+    def open_store(**kwargs):
+        store = store_class(str(tmp_path / filename), embedder, **kwargs)
+        opened.append(store)
+        return store
+
+    yield open_store
+    for store in opened:
+        store.close()
+
+
+def search(store, query: str, top_k: int = 5, filters: dict | None = None) -> list[dict]:
+    """Vector-scored results of one query (no lexical shortcut)."""
+    return asyncio.run(store.query_many([query], top_k=top_k, filters=filters, lexical_shortcut=False))[0]
+
+
+def top(store, query: str, **kwargs) -> str:
+    return search(store, query, **kwargs)[0]["content"]
+
+
+def test_ingest_and_query(open_store):
+    store = open_store()
+    assert store.document_count() == 0
+    assert search(store, "plasma cutter") == []
+
+    asyncio.run(store.ingest_documents(DOCS))
+    assert store.document_count() == 4
+    results = search(store, "where is plasma cutter ammo", top_k=2)
+    assert len(results) == 2
+    assert results[0]["content"] == DOCS[1]["content"]
+    assert results[0]["metadata"] == DOCS[1]["metadata"]
+    assert 0 < results[0]["score"] <= 1.0
+
+
+def test_filters_fall_back_to_whole_kb(open_store):
+    store = open_store()
+    asyncio.run(store.ingest_documents(DOCS))
+
+    results = search(store, "plasma cutter ammo", filters={"series": "dead_space"})
+    assert [r["metadata"]["series"] for r in results] == ["dead_space", "dead_space"]
+    assert sorted(store.metadata_values("series")) == ["dead_space", "resident_evil"]
+
+    # Nothing matches the filter, or nothing that does is similar enough
+    assert top(store, "Nemesis chases Jill", filters={"series": "halo"}) == DOCS[2]["content"]
+    assert top(store, "Nemesis chases Jill", filters={"series": "dead_space"}) == DOCS[2]["content"]
+
+
+def test_replace_and_delete_leave_tombstones(open_store):
+    store = open_store()
+    asyncio.run(store.ingest_documents(DOCS))
+    old_ids = store.document_ids({"path": "ds/enemies.md"})
+    assert len(old_ids) == 1
+
+    brute = {"content": "The Brute charges with armored plates", "metadata": {"series": "dead_space", "path": "ds/enemies.md"}}
+    assert asyncio.run(store.replace_documents(old_ids, [brute])) == 1
+    new_ids = store.document_ids({"path": "ds/enemies.md"})
+    assert len(new_ids) == 1 and new_ids != old_ids
+    assert store.document_count() == 4
+    assert DOCS[0]["content"] not in [r["content"] for r in search(store, "slasher blade arms", top_k=4)]
+    assert top(store, "brute armored plates") == brute["content"]
+
+    # Deleting twice, or an unknown ID, deletes nothing more
+    assert asyncio.run(store.delete_documents(new_ids + ["no-such-id"])) == 1
+    assert asyncio.run(store.delete_documents(new_ids)) == 0
+    assert asyncio.run(store.replace_documents(old_ids, [])) == 0
+    assert store.document_count() == 3
+    assert store.document_ids({"path": "ds/enemies.md"}) == []
+    assert len(search(store, "brute armored plates")) == 3
+    assert len(store.embeddings()) == 3
+
+
+def test_compact_drops_deleted_documents(open_store):
+    store = open_store()
+    asyncio.run(store.ingest_documents(DOCS))
+    asyncio.run(store.delete_documents(store.document_ids({"series": "resident_evil"})))
+
+    asyncio.run(store.compact())
+    assert store.document_count() == 2
+    assert len(store.embeddings()) == 2
+    assert top(store, "plasma cutter ammo") == DOCS[1]["content"]
+    assert {r["metadata"]["series"] for r in search(store, "Nemesis chases Jill")} == {"dead_space"}
+
+
+def test_reopen_keeps_documents(open_store):
+    store = open_store()
+    asyncio.run(store.ingest_documents(DOCS))
+    asyncio.run(store.delete_documents(store.document_ids({"path": "re/items.md"})))
+    ids = sorted(store.document_ids({"series": ["dead_space", "resident_evil"]}))
+    store.close()
+
+    store = open_store()
+    assert store.document_count() == 3
+    assert sorted(store.document_ids({"series": ["dead_space", "resident_evil"]})) == ids
+    assert top(store, "Nemesis chases Jill") == DOCS[2]["content"]
+
+    store.clear()
+    assert store.document_count() == 0
+    store.close()
+    assert open_store().document_count() == 0
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_second_store_keeps_exact_vectors_intact(open_store, precision):
+    first = open_store(precision=precision)
+    asyncio.run(first.ingest_documents([
+        {"content": f"doc number {i}", "metadata": {"path": f"doc{i}.md"}} for i in range(10)
+    ]))
+    doomed = first.document_ids({"path": ["doc3.md", "doc4.md", "doc5.md"]})
+    asyncio.run(first.replace_documents(doomed, []))
+
+    # Another process opening the KB must not disturb the first one's float32 copies
+    open_store(precision=precision)
+    asyncio.run(first.ingest_documents([{"content": f"doc number {i}"} for i in (10, 11)]))
+
+    for i in (0, 6, 9, 10, 11):
+        result = search(first, f"doc number {i}", top_k=1)[0]
+        assert result["content"] == f"doc number {i}"
+        assert result["score"] == pytest.approx(1.0, abs=1e-5)
+
+    reference = open_store(precision="float32")
+    for exact, expected in zip(sorted(first.embeddings()), sorted(reference.embeddings())):
+        assert exact == pytest.approx(expected, abs=1e-6)
+
+
+def test_sqlite_connections_see_each_others_writes(tmp_path, embedder):
+    kb_path = str(tmp_path / "kb.db")
+    first = SQLiteDocumentStore(kb_path, embedder)
+    second = SQLiteDocumentStore(kb_path, embedder)
+    try:
+        asyncio.run(first.ingest_documents([{"content": "alpha notes", "metadata": {"path": "alpha.md"}}]))
+        assert top(second, "alpha notes") == "alpha notes"
+
+        # A write by one store must not swallow rows the other committed since its last load
+        asyncio.run(second.ingest_documents([{"content": "bravo notes", "metadata": {"path": "bravo.md"}}]))
+        alpha_ids = first.document_ids({"path": "alpha.md"})
+        asyncio.run(first.replace_documents(alpha_ids, [{"content": "alpha revised", "metadata": {"path": "alpha.md"}}]))
+        assert first.document_count() == 2
+        assert top(first, "bravo notes") == "bravo notes"
+        assert sorted(r["content"] for r in search(second, "notes")) == ["alpha revised", "bravo notes"]
+    finally:
+        first.close()
+        second.close()